@@ -0,0 +1,114 @@
+"""
+End-to-end offline benchmark of the retrieval path: chunking, embedding, indexing and
+querying on a synthetic review corpus, plus ranking quality on aspect-labelled queries.
+Runs with the deterministic hashing embedder by default, so no model download or API key
+is needed; pass --model to run the same workload against a real embedding model.
+
+Usage: python bench_embeddings_offline.py [--products 20] [--reviews 60] [--model hashing-ngram-768] [--backend memory] [--k 5]
+"""
+import os
+import time
+import shutil
+import random
+import argparse
+import statistics
+
+ASPECT_PHRASES = {
+    "battery": ["battery lasts about {n} hours", "needs charging every {n} days", "battery life drops fast with ANC on", "fast charge gives {n} hours from ten minutes"],
+    "comfort": ["comfortable for {n} hour flights", "ear cups press on my glasses", "clamping force is too tight", "padding feels soft even after {n} hours"],
+    "sound": ["bass is punchy but muddy", "treble sounds harsh at high volume", "soundstage is wide and detailed", "mids are warm and vocals are clear"],
+    "mic": ["microphone picks up wind noise on calls", "call quality is clear indoors", "people say my voice sounds distant on calls", "mic struggles in noisy cafes"],
+    "build": ["hinge cracked after {n} months", "plastic build feels cheap", "headband creaks when I move", "metal sliders feel sturdy and durable"],
+    "connectivity": ["bluetooth drops when my phone is in my pocket", "multipoint pairing switches between laptop and phone", "pairing takes {n} seconds", "latency is noticeable in games"],
+}
+
+FILLER = ["Bought these last month.", "Overall happy with the purchase.", "Compared to my old pair,", "Honestly,", "For the price,", "After a week of daily use,"]
+
+def synthetic_reviews(rng, product, count):
+    aspects = list(ASPECT_PHRASES)
+    documents = []
+    for i in range(count):
+        aspect = aspects[i % len(aspects)]
+        sentences = [rng.choice(FILLER)] + [rng.choice(ASPECT_PHRASES[aspect]).format(n=rng.randint(2, 40)) for _ in range(3)]
+        documents.append({
+            "text": f"{product} review: " + " ".join(sentences),
+            "source_type": "structured_content",
+            "evidence_id": f"{product}-r{i}",
+            "metadata": {"aspect": aspect}
+        })
+    return documents
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline chunk/embed/index/query benchmark")
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--reviews", type=int, default=60)
+    parser.add_argument("--model", default="hashing-ngram-768", help="Embedding model for every text usage")
+    parser.add_argument("--backend", default="memory", choices=["memory", "chroma"])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # Must be set before the clients are created
+    os.environ["SAGE_EMBEDDING_MODEL"] = args.model
+    from sage.utils.vector_db import VectorDBClient
+
+    rng = random.Random(args.seed)
+    db = VectorDBClient(persist_path="./sage_bench_db", backend=args.backend)
+    db.hybrid = False  # Dense ranking only, so the quality numbers measure the embeddings
+    timings = {"chunk": 0.0, "embed": 0.0, "index": 0.0}
+    query_latencies = []
+    chunk_count = 0
+    char_count = 0
+    precision = []
+    hit_at_1 = []
+
+    try:
+        for p in range(args.products):
+            product = f"bench-product-{p}"
+            documents = synthetic_reviews(rng, product, args.reviews)
+
+            start = time.perf_counter()
+            ids, texts, metadatas = db._chunk_documents(documents, product)
+            timings["chunk"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            embeddings = db.embedder.get_text_embedding(texts, "primary_retrieval")
+            timings["embed"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            db.backend.add(product, ids, embeddings, texts, metadatas)
+            timings["index"] += time.perf_counter() - start
+
+            chunk_count += len(texts)
+            char_count += sum(len(t) for t in texts)
+
+            for aspect, phrases in ASPECT_PHRASES.items():
+                query = rng.choice(phrases).format(n=rng.randint(2, 40))
+                start = time.perf_counter()
+                hits = db.query(query, top_k=args.k, product_id=product)
+                query_latencies.append(time.perf_counter() - start)
+                labels = [hit["metadata"].get("aspect") for hit in hits]
+                precision.append(sum(label == aspect for label in labels) / args.k)
+                hit_at_1.append(1.0 if labels and labels[0] == aspect else 0.0)
+
+            db.drop_product(product)
+    finally:
+        db.clear_all()
+        shutil.rmtree("./sage_bench_db", ignore_errors=True)
+
+    print(f"Model: {args.model}   backend: {args.backend}")
+    print(f"Corpus: {args.products} products x {args.reviews} reviews -> {chunk_count} chunks, {char_count / 1e6:.2f}M chars")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<6} {seconds * 1000:9.1f} ms total   {chunk_count / max(seconds, 1e-9):10.0f} chunks/s")
+    ms = [s * 1000 for s in query_latencies]
+    print(f"  query  mean {statistics.mean(ms):7.3f} ms   p50 {percentile(ms, 0.5):7.3f} ms   p95 {percentile(ms, 0.95):7.3f} ms   (n={len(ms)})")
+    print(f"\nRanking quality over {len(precision)} aspect queries (dense only):")
+    print(f"  precision@{args.k}  {statistics.mean(precision):.3f}   (random baseline {1 / len(ASPECT_PHRASES):.3f})")
+    print(f"  hit@1         {statistics.mean(hit_at_1):.3f}")
+
+if __name__ == "__main__":
+    main()
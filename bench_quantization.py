@@ -0,0 +1,92 @@
+"""
+Measure what quantized storage in the in-memory vector backend costs and saves:
+resident memory, recall@k against exact float32 search, and query latency,
+for float16 / int8 with and without full-precision rescoring.
+
+By default it uses synthetic clustered vectors shaped like our evidence sets (a few
+dozen chunks per product, many products). Pass --vectors with a .npy matrix of real
+evidence embeddings (one row per chunk) to measure on those instead.
+
+Usage: python bench_quantization.py [--vectors PATH.npy] [--products 50] [--chunks 40] [--dim 1536] [--top-k 5]
+"""
+import time
+import argparse
+import tempfile
+import numpy as np
+from sage.utils.vector_backends import InMemoryBackend
+
+def synthetic_products(rng, products, chunks, dim):
+    # Each product's chunks cluster around a product direction, with a few aspect sub-clusters
+    corpora = []
+    for _ in range(products):
+        center = rng.normal(size=dim)
+        aspects = center + rng.normal(scale=0.8, size=(6, dim))
+        rows = aspects[rng.integers(0, 6, size=chunks)] + rng.normal(scale=0.6, size=(chunks, dim))
+        corpora.append(rows.astype(np.float32))
+    return corpora
+
+def split_real(vectors, chunks):
+    return [vectors[i:i + chunks] for i in range(0, len(vectors), chunks) if len(vectors[i:i + chunks]) > 1]
+
+def run(corpora, queries, top_k, quantization, rescore_factor, full_precision_dir):
+    backend = InMemoryBackend(quantization=quantization, rescore_factor=rescore_factor, full_precision_dir=full_precision_dir)
+    for p, rows in enumerate(corpora):
+        backend.add(f"p{p}", [f"p{p}-{i}" for i in range(len(rows))], rows.tolist(), [""] * len(rows), [{}] * len(rows))
+
+    results, latencies = [], []
+    for p, product_queries in enumerate(queries):
+        start = time.perf_counter()
+        hits = backend.query(f"p{p}", product_queries.tolist(), top_k)
+        latencies.append((time.perf_counter() - start) / len(product_queries))
+        results.extend([h["id"] for h in query_hits] for query_hits in hits)
+
+    usage = backend.memory_usage()
+    backend.clear()
+    return results, usage, float(np.mean(latencies))
+
+def recall_at_k(results, expected):
+    return float(np.mean([len(set(r) & set(e)) / max(len(e), 1) for r, e in zip(results, expected)]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized vector storage")
+    parser.add_argument("--vectors", help=".npy matrix of real evidence embeddings")
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    if args.vectors:
+        corpora = split_real(np.load(args.vectors).astype(np.float32), args.chunks)
+    else:
+        corpora = synthetic_products(rng, args.products, args.chunks, args.dim)
+    # Queries: noisy copies of random chunks from each product
+    queries = [
+        rows[rng.integers(0, len(rows), size=args.queries)] + rng.normal(scale=0.5, size=(args.queries, rows.shape[1])).astype(np.float32)
+        for rows in corpora
+    ]
+    total = sum(len(rows) for rows in corpora)
+    print(f"Corpus: {len(corpora)} products, {total} chunks, dim={corpora[0].shape[1]}, top_k={args.top_k}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        expected, baseline, base_latency = run(corpora, queries, args.top_k, "none", 1, None)
+        print(f"\n{'mode':<22} {'resident MiB':>12} {'saved':>7} {'mapped MiB':>11} {'recall@k':>9} {'query ms':>9}")
+        print(f"{'float32 (exact)':<22} {baseline['resident_bytes'] / 2**20:>12.2f} {'-':>7} {0:>11.2f} {1.0:>9.4f} {base_latency * 1000:>9.3f}")
+
+        for quantization in ("float16", "int8"):
+            for rescore in (False, True):
+                results, usage, latency = run(
+                    corpora, queries, args.top_k, quantization,
+                    args.rescore_factor if rescore else 1,
+                    tmp if rescore else None
+                )
+                saved = 1 - usage["resident_bytes"] / baseline["resident_bytes"]
+                label = f"{quantization}{' + rescore' if rescore else ''}"
+                print(f"{label:<22} {usage['resident_bytes'] / 2**20:>12.2f} {saved:>6.0%} {usage['mapped_bytes'] / 2**20:>11.2f} "
+                      f"{recall_at_k(results, expected):>9.4f} {latency * 1000:>9.3f}")
+
+if __name__ == "__main__":
+    main()
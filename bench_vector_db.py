@@ -0,0 +1,80 @@
+"""
+Compare vector backends on a Sage-shaped workload: many small per-product indexes.
+For each product: add its chunks, run a handful of aspect queries, then drop the namespace.
+Uses random unit vectors, so no embedding API key is needed.
+
+Usage: python bench_vector_db.py [--products 20] [--chunks 40] [--queries 8] [--dim 1536]
+"""
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import numpy as np
+from sage.utils.vector_backends import create_backend
+
+def random_unit_vectors(rng, n, dim):
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).tolist()
+
+def bench_backend(name, args):
+    rng = np.random.default_rng(42)
+    persist_path = tempfile.mkdtemp(prefix="sage_bench_")
+    backend = create_backend(name, persist_path)
+    timings = {"add": [], "query": [], "clear": []}
+
+    try:
+        for p in range(args.products):
+            product_id = f"bench-product-{p}"
+            ids = [f"{product_id}-{i}" for i in range(args.chunks)]
+            documents = [f"chunk {i} of product {p}" for i in range(args.chunks)]
+            metadatas = [{"source_type": "pdp", "chunk_index": i} for i in range(args.chunks)]
+            embeddings = random_unit_vectors(rng, args.chunks, args.dim)
+            queries = random_unit_vectors(rng, args.queries, args.dim)
+
+            start = time.perf_counter()
+            backend.add(product_id, ids, embeddings, documents, metadatas)
+            timings["add"].append(time.perf_counter() - start)
+
+            for query in queries:
+                start = time.perf_counter()
+                backend.query(product_id, [query], 5)
+                timings["query"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            backend.drop_namespace(product_id)
+            timings["clear"].append(time.perf_counter() - start)
+    finally:
+        shutil.rmtree(persist_path, ignore_errors=True)
+
+    return timings
+
+def report(name, timings):
+    print(f"\n[{name}]")
+    for op, samples in timings.items():
+        ms = [s * 1000 for s in samples]
+        p95 = sorted(ms)[int(len(ms) * 0.95) - 1] if len(ms) > 1 else ms[0]
+        print(f"  {op:<6} mean {statistics.mean(ms):8.3f} ms   median {statistics.median(ms):8.3f} ms   p95 {p95:8.3f} ms   (n={len(ms)})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Sage vector backends")
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--backends", nargs="+", default=["chroma", "memory"])
+    args = parser.parse_args()
+
+    print(f"Workload: {args.products} products x {args.chunks} chunks, {args.queries} queries each, dim={args.dim}")
+    results = {name: bench_backend(name, args) for name in args.backends}
+    for name, timings in results.items():
+        report(name, timings)
+
+    if "chroma" in results and "memory" in results:
+        print("\nSpeedup (chroma mean / memory mean):")
+        for op in ("add", "query", "clear"):
+            speedup = statistics.mean(results["chroma"][op]) / max(statistics.mean(results["memory"][op]), 1e-9)
+            print(f"  {op:<6} {speedup:8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // --- State ---
     let currentProductContext = null;
+    let chatSessionId = null; // Server-side conversation for the current product
     const targetScore = 72; // Default, will be updated
 
     // --- Tab Switching ---
@@ -102,6 +103,7 @@ document.addEventListener('DOMContentLoaded', () => {
             const ingestData = await ingestRes.json();
             console.log('[SAGE] Ingest successful');
             currentProductContext = ingestData.product_context; // Store context for chat
+            chatSessionId = null;
 
             // 4. Call Backend Process
             console.log('[SAGE] Step 5: Calling backend /process...');
@@ -321,23 +323,33 @@ document.addEventListener('DOMContentLoaded', () => {
         const loadingId = addMessage("Thinking...", 'bot');
 
         try {
-            const res = await fetch('http://localhost:8001/chat', {
+            // Streamed answer: the loading bubble fills in token by token
+            const res = await fetch('http://localhost:8001/chat/stream', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
                     product_context: currentProductContext,
-                    message: message
+                    message: message,
+                    session_id: chatSessionId
                 })
             });
 
-            if (!res.ok) throw new Error("Chat request failed");
-            const data = await res.json();
-
-            // Remove loading
+            if (!res.ok || !res.body) throw new Error("Chat request failed");
             const loadingEl = document.querySelector(`[data-msg-id="${loadingId}"]`);
-            if (loadingEl) loadingEl.remove();
-
-            addMessage(data.response, 'bot');
+            let answer = '';
+
+            await readSSE(res.body, (event, data) => {
+                if (event === 'token') {
+                    answer += data.text;
+                    if (loadingEl) loadingEl.textContent = answer;
+                    chatHistory.scrollTop = chatHistory.scrollHeight;
+                } else if (event === 'done') {
+                    chatSessionId = data.session_id;
+                    if (loadingEl) loadingEl.textContent = data.response;
+                } else if (event === 'error') {
+                    throw new Error(data.detail);
+                }
+            });
 
         } catch (err) {
             console.error(err);
@@ -346,6 +358,30 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // Parses a text/event-stream body, calling onEvent(event, data) per message
+    async function readSSE(body, onEvent) {
+        const reader = body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const raw = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                raw.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+
     function addMessage(text, sender) {
         const msgDiv = document.createElement('div');
         msgDiv.className = `chat-message ${sender}`;
@@ -1,9 +1,17 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 import datetime
+import asyncio
+import json
+from contextlib import asynccontextmanager
 from sage.models.schemas import ProductContext
 from sage.pipeline import SagePipeline
+from sage.engine.job_queue import JobQueue, Job, QueueFullError
+from sage.utils.config import get_section, load_models_config
+from sage.utils.model_registry import get_model_registry, local_embedding_models
+from sage.utils.llm_client import get_llm_client
 
 from sage.utils.scraper import WebScraper
 
@@ -11,7 +19,15 @@ from sage.utils.scraper import WebScraper
 
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="Sage Assistant API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load local embedding models in the background so the first request doesn't pay for it
+    registry_config = get_section("model_registry")
+    if registry_config.get("warm_up", True):
+        get_model_registry(registry_config).warm_up(local_embedding_models(load_models_config()))
+    yield
+
+app = FastAPI(title="Sage Assistant API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +41,26 @@ app.add_middleware(
 pipeline = SagePipeline()
 scraper = WebScraper()
 
+def run_pipeline_job(job: Job):
+    def on_event(event: Dict):
+        if event["event"] == "stage_start":
+            job.stage = event["stage"]
+
+    return pipeline.run(
+        job.payload["product_context"],
+        use_cache=job.payload["use_cache"],
+        on_event=on_event,
+        cancel_event=job.cancel_event
+    )
+
+job_config = get_section("job_queue")
+job_queue = JobQueue(
+    handler=run_pipeline_job,
+    workers=job_config.get("workers", 2),
+    max_queued=job_config.get("max_queued", 100),
+    retention_seconds=job_config.get("retention_seconds", 3600)
+)
+
 # Request Models
 class WebIngestRequest(BaseModel):
     url: str
@@ -41,12 +77,16 @@ class ExtensionIngestRequest(BaseModel):
 
 class ProcessRequest(BaseModel):
     product_context: ProductContext
+    use_cache: bool = True  # False forces a fresh analysis
+    background: bool = False  # True queues a job and returns its ID immediately
+    priority: int = 0  # Background jobs only; higher runs first
 
 
 @app.post("/ingest/web")
 async def ingest_web(request: WebIngestRequest):
     try:
-        context = scraper.scrape(request.url)
+        # Scraping uses blocking requests; keep it off the event loop
+        context = await asyncio.to_thread(scraper.scrape, request.url)
         return {"status": "success", "product_context": context}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Scraping failed: {str(e)}")
@@ -88,75 +128,79 @@ async def ingest_extension(request: ExtensionIngestRequest):
 class ChatRequest(BaseModel):
     product_context: ProductContext
     message: str
+    # Continue a conversation; omit to start one (the new session_id is returned)
+    session_id: Optional[str] = None
 
 @app.post("/chat")
 async def chat(request: ChatRequest):
     try:
-        # Simple Chat Logic: Use Summarizer model to answer based on context
-        # In a real app, we might want a dedicated ChatAgent with history
-        
-        # Construct context from the product info
-        # We use the PDP HTML or text if available, but for efficiency we might just use metadata + summary if available
-        # For now, let's pass the raw text from the context if it's not too huge, or just the metadata
-        
-        # Extract text from PDP HTML for context
-        product_text = "No product details available."
-        if request.product_context.pdp_html:
-            try:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(request.product_context.pdp_html, 'html.parser')
-                # Remove script and style elements
-                for script in soup(["script", "style", "header", "footer", "nav"]):
-                    script.extract()
-                text = soup.get_text(separator='\n')
-                # Clean up whitespace
-                lines = (line.strip() for line in text.splitlines())
-                chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                text_clean = '\n'.join(chunk for chunk in chunks if chunk)
-                # Limit to first 15000 chars to fit in context
-                product_text = text_clean[:15000]
-            except Exception as e:
-                print(f"Error extracting text for chat: {e}")
-                product_text = "Error parsing product details."
-
-        context_str = f"""
-        Product: {request.product_context.product_id}
-        Title: {request.product_context.metadata.get('title', 'Unknown') if request.product_context.metadata else 'Unknown'}
-        URL: {request.product_context.url}
-        
-        Product Details:
-        {f"--- Structured Content ---\n{request.product_context.structured_content}\n--------------------------" if request.product_context.structured_content else ""}
-        
-        {product_text}
-        
-        User Question: {request.message}
-        """
-        
-        # We can reuse the LLMClient directly
-        from sage.utils.llm_client import LLMClient
-        llm_client = LLMClient()
-        
-        system_prompt = """You are Sage, a helpful product assistant.
-        Answer the user's question based ONLY on the provided product context.
-        If you don't know, say so. Keep answers concise and helpful."""
-        
-        response = llm_client.generate_response(
-            system_prompt=system_prompt,
-            user_content=context_str,
-            agent_name="chat"
-        )
-        
-        return {"response": response}
+        # Answer from the product chunks relevant to this message (indexed on first chat)
+        return await pipeline.chat.aanswer(request.product_context, request.message, session_id=request.session_id)
     except Exception as e:
         import traceback
         print(f"ERROR in /chat: {e}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Same answer as /chat, streamed as Server-Sent Events: a `token` event per text
+    chunk as the model generates it, then `done` with the full response, session_id,
+    sources, token usage and timings (ttft_ms = time to first token, total_ms), or `error`.
+    """
+    async def event_stream():
+        stats: Dict = {}
+        parts = []
+        try:
+            async for text in pipeline.chat.astream_answer(request.product_context, request.message, session_id=request.session_id, stats=stats):
+                parts.append(text)
+                yield format_sse("token", {"text": text})
+            print(f"[CHAT] Streamed {stats.get('chunks')} chunks, TTFT {stats.get('ttft_ms')} ms, total {stats.get('total_ms')} ms")
+            turn = {field: stats.pop(field, None) for field in ("session_id", "sources", "usage")}
+            yield format_sse("done", {"response": "".join(parts), **turn, "timings": stats})
+        except Exception as e:
+            import traceback
+            print(f"ERROR in /chat/stream: {e}")
+            print(traceback.format_exc())
+            yield format_sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/chat/sessions/{product_id}/{session_id}")
+async def chat_session(product_id: str, session_id: str):
+    """
+    Turn counts and per-turn token usage for a live chat session.
+    """
+    session = pipeline.chat.conversations.get(product_id, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    return session.describe()
+
+@app.delete("/chat/sessions/{product_id}/{session_id}")
+async def end_chat_session(product_id: str, session_id: str):
+    if not pipeline.chat.conversations.delete(product_id, session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    return {"status": "deleted"}
+
 @app.post("/process")
 async def process(request: ProcessRequest):
+    if request.background:
+        try:
+            job = job_queue.submit(
+                {"product_context": request.product_context, "use_cache": request.use_cache},
+                priority=request.priority
+            )
+        except QueueFullError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        return JSONResponse(status_code=202, content={"job_id": job.job_id, "status": job.status})
+
     try:
-        result = pipeline.run(request.product_context)
+        result = await pipeline.arun(request.product_context, use_cache=request.use_cache)
         return result
     except Exception as e:
         import traceback
@@ -164,6 +208,92 @@ async def process(request: ProcessRequest):
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    cancelled = job_queue.cancel(job_id)
+    return {"job_id": job_id, "cancelled": cancelled, "status": job.status}
+
+@app.get("/jobs")
+async def job_stats():
+    return job_queue.stats()
+
+@app.get("/ready")
+async def ready():
+    status = get_model_registry().describe()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.get("/stats/embeddings")
+async def embedding_stats():
+    embedder = pipeline.vector_db.embedder
+    query_cache = pipeline.vector_db.query_cache
+    return {
+        "dispatcher": embedder.dispatcher.stats() if embedder.dispatcher else {"enabled": False},
+        "cache": embedder.cache.stats() if embedder.cache else {"enabled": False},
+        "query_cache": query_cache.stats() if query_cache else {"enabled": False}
+    }
+
+@app.get("/stats/llm")
+async def llm_stats():
+    return get_llm_client().stats()
+
+def format_sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/process/stream")
+async def process_stream(request: ProcessRequest):
+    """
+    Same analysis as /process, streamed as Server-Sent Events:
+    stage_start / stage_complete (with timings and partial results) / stage_error,
+    then a final `result` (or `error`) event.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def on_event(event: Dict):
+        queue.put_nowait((event.pop("event"), event))
+
+    async def run_pipeline():
+        try:
+            result = await pipeline.arun(request.product_context, use_cache=request.use_cache, on_event=on_event)
+            queue.put_nowait(("result", result))
+        except Exception as e:
+            import traceback
+            print(f"ERROR in /process/stream: {e}")
+            print(traceback.format_exc())
+            queue.put_nowait(("error", {"detail": str(e)}))
+        finally:
+            queue.put_nowait(None)
+
+    task = asyncio.create_task(run_pipeline())
+
+    async def event_stream():
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                event, data = item
+                yield format_sse(event, data)
+        finally:
+            # Client went away before the run finished
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
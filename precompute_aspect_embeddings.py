@@ -0,0 +1,39 @@
+"""
+Precompute query embeddings for the common aspect vocabulary and write the warm table
+that VectorDBClient loads at startup (query_cache.warm_table_path).
+
+Re-run after editing config/aspect_vocabulary.json or changing the primary_retrieval model.
+
+Usage: python precompute_aspect_embeddings.py [--vocabulary PATH] [--output PATH]
+"""
+import os
+import json
+import argparse
+from sage.utils.config import get_section, load_models_config
+from sage.utils.embedding_client import EmbeddingClient
+from sage.utils.query_cache import WarmEmbeddingTable, normalize_query, REPO_ROOT
+
+def main():
+    config = get_section("query_cache")
+    parser = argparse.ArgumentParser(description="Build the warm aspect-query embedding table")
+    parser.add_argument("--vocabulary", default=config.get("vocabulary_path", "config/aspect_vocabulary.json"))
+    parser.add_argument("--output", default=config.get("warm_table_path", "config/aspect_embeddings.npz"))
+    args = parser.parse_args()
+
+    vocabulary_path = os.path.join(REPO_ROOT, args.vocabulary)
+    output_path = os.path.join(REPO_ROOT, args.output)
+
+    with open(vocabulary_path, "r") as f:
+        vocabulary = json.load(f)
+    # One entry per normalized query, in file order
+    texts = list(dict.fromkeys(normalize_query(term) for term in vocabulary if term.strip()))
+
+    model = load_models_config().get("embedding_models", {}).get("primary_retrieval", "bge-large-en")
+    print(f"Embedding {len(texts)} aspect queries with {model}...")
+    vectors = EmbeddingClient().get_text_embedding(texts, "primary_retrieval")
+
+    WarmEmbeddingTable.save(output_path, model, texts, vectors)
+    print(f"Wrote {output_path} ({os.path.getsize(output_path) / 1024:.1f} KiB, {len(vectors[0])} dims, float16)")
+
+if __name__ == "__main__":
+    main()
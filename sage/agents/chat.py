@@ -0,0 +1,302 @@
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, AsyncIterator, Tuple
+from sage.models.schemas import ProductContext
+from sage.utils.llm_client import get_llm_client
+from sage.utils.vector_db import VectorDBClient, content_fingerprint
+from sage.utils.chunking import clean_html_text
+from sage.utils.config import get_section
+from sage.utils.chat_sessions import ChatSession, ChatSessionStore, ChatTurn
+from sage.utils.tokens import count_tokens, truncate_to_tokens
+
+CHAT_SYSTEM_PROMPT = """You are Sage, a helpful product assistant.
+Answer the user's question based ONLY on the provided product context.
+The context is a set of excerpts retrieved from the product page for this question,
+plus the conversation so far, so follow-up questions can refer to earlier answers.
+If you don't know, say so. Keep answers concise and helpful."""
+
+SUMMARY_SYSTEM_PROMPT = """You maintain the running summary of a conversation between a shopper and Sage, a product assistant.
+Merge the earlier summary (if any) and the new turns into one short summary.
+Keep the shopper's needs, preferences and open questions, and the key facts Sage gave.
+Reply with the summary only, in plain text."""
+
+class ProductSession:
+    """
+    What chat remembers about one product version: whether it is indexed, and its
+    parsed page text (only built if retrieval ever comes back empty).
+    """
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.indexed = False
+        self.text: Optional[str] = None
+        self.last_used = time.time()
+
+class ChatAgent:
+    """
+    Retrieval-augmented product chat.
+    - The product is indexed on first chat (or reused if /process already indexed it),
+      through the same index function the pipeline uses.
+    - Each message retrieves only the top_k chunks relevant to it (hybrid dense + BM25),
+      so prompt size scales with the question rather than with the page.
+    - Per-product sessions remember the indexed version, so later messages skip the
+      index check; they expire after session_ttl_seconds.
+    - Conversations are keyed by (product_id, session_id): the last recent_turns turns
+      are sent verbatim and older ones are folded into a running summary (at most
+      summary_max_tokens) after the answer is returned, off the response path.
+    """
+    def __init__(self, vector_db: VectorDBClient, index_product: Callable[[ProductContext], Any]):
+        self.client = get_llm_client()
+        self.agent_name = "chat"
+        self.vector_db = vector_db
+        self.index_product = index_product
+
+        config = get_section("chat")
+        self.top_k = config.get("top_k", 6)
+        self.fallback_chars = config.get("fallback_chars", 4000)
+        self.session_ttl_seconds = config.get("session_ttl_seconds", 1800)
+        self.max_sessions = config.get("max_sessions", 256)
+        self.recent_turns = config.get("recent_turns", 4)
+        self.summary_max_tokens = config.get("summary_max_tokens", 300)
+        self.summary_agent_name = "chat_summary"
+
+        self._sessions: "OrderedDict[str, ProductSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.conversations = ChatSessionStore(
+            ttl_seconds=self.session_ttl_seconds,
+            max_sessions=config.get("max_conversations", 1000)
+        )
+
+    def _session(self, context: ProductContext) -> ProductSession:
+        fingerprint = content_fingerprint(context)
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(context.product_id)
+            expired = session is not None and now - session.last_used > self.session_ttl_seconds
+            if session is None or expired or session.fingerprint != fingerprint:
+                session = ProductSession(fingerprint)
+                self._sessions[context.product_id] = session
+            session.last_used = now
+            self._sessions.move_to_end(context.product_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session
+
+    def _ensure_indexed(self, context: ProductContext, session: ProductSession):
+        if not session.indexed:
+            self.index_product(context)
+            session.indexed = True
+
+    def _fallback_text(self, context: ProductContext, session: ProductSession) -> str:
+        if session.text is None:
+            text = clean_html_text(context.pdp_html) if context.pdp_html else ""
+            session.text = text[:self.fallback_chars]
+        return session.text
+
+    def _retrieve(self, context: ProductContext, message: str, session: ProductSession) -> List[Dict[str, Any]]:
+        self._ensure_indexed(context, session)
+        hits = self.vector_db.query(message, top_k=self.top_k, product_id=context.product_id)
+        if not hits and session.indexed:
+            # The namespace may have expired since this session indexed it
+            session.indexed = False
+            self._ensure_indexed(context, session)
+            hits = self.vector_db.query(message, top_k=self.top_k, product_id=context.product_id)
+        return hits
+
+    async def _aretrieve(self, context: ProductContext, message: str, session: ProductSession) -> List[Dict[str, Any]]:
+        # Indexing parses HTML and embeds chunks; keep it off the event loop
+        await asyncio.to_thread(self._ensure_indexed, context, session)
+        hits = await self.vector_db.aquery(message, top_k=self.top_k, product_id=context.product_id)
+        if not hits and session.indexed:
+            session.indexed = False
+            await asyncio.to_thread(self._ensure_indexed, context, session)
+            hits = await self.vector_db.aquery(message, top_k=self.top_k, product_id=context.product_id)
+        return hits
+
+    @staticmethod
+    def _retrieval_query(message: str, conversation: ChatSession) -> str:
+        # Follow-ups ("and the weight?") retrieve better with the previous question attached
+        previous = conversation.last_question()
+        return f"{previous}\n{message}" if previous else message
+
+    def _build_user_content(self, context: ProductContext, message: str, hits: List[Dict[str, Any]], session: ProductSession, history: str) -> str:
+        title = context.metadata.get("title", "Unknown") if context.metadata else "Unknown"
+        if hits:
+            excerpts = "\n\n".join(
+                f"[{i}] ({self._source_label(hit)})\n{hit['text']}"
+                for i, hit in enumerate(hits, 1)
+            )
+        else:
+            excerpts = self._fallback_text(context, session) or "No product details available."
+        conversation = f"Conversation So Far:\n{history}\n\n" if history else ""
+
+        return f"""Product: {context.product_id}
+Title: {title}
+URL: {context.url}
+
+Relevant Product Information:
+{excerpts}
+
+{conversation}User Question: {message}"""
+
+    @staticmethod
+    def _source_label(hit: Dict[str, Any]) -> str:
+        metadata = hit.get("metadata") or {}
+        source = metadata.get("source_type", "unknown")
+        return f"{source}: {metadata['section']}" if metadata.get("section") else source
+
+    @staticmethod
+    def _sources(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {"evidence_id": hit["evidence_id"], "source_type": (hit.get("metadata") or {}).get("source_type", "unknown")}
+            for hit in hits
+        ]
+
+    def prepare(self, context: ProductContext, message: str, conversation: ChatSession) -> Dict[str, Any]:
+        """
+        Retrieval and prompt for one message: {"user_content", "sources", "history_tokens"}.
+        """
+        session = self._session(context)
+        hits = self._retrieve(context, self._retrieval_query(message, conversation), session)
+        history = conversation.history_text()
+        return {
+            "user_content": self._build_user_content(context, message, hits, session, history),
+            "sources": self._sources(hits),
+            "history_tokens": count_tokens(history, self._model())
+        }
+
+    async def aprepare(self, context: ProductContext, message: str, conversation: ChatSession) -> Dict[str, Any]:
+        session = self._session(context)
+        hits = await self._aretrieve(context, self._retrieval_query(message, conversation), session)
+        history = conversation.history_text()
+        user_content = await asyncio.to_thread(self._build_user_content, context, message, hits, session, history)
+        return {
+            "user_content": user_content,
+            "sources": self._sources(hits),
+            "history_tokens": count_tokens(history, self._model())
+        }
+
+    def _model(self) -> str:
+        return self.client.get_model_name(self.agent_name)
+
+    def _record_turn(self, conversation: ChatSession, message: str, prepared: Dict[str, Any], response: str) -> Dict[str, int]:
+        """
+        Add the turn to the conversation and return its token usage
+        (counted with the chat model's tokenizer).
+        """
+        model = self._model()
+        prompt_tokens = count_tokens(CHAT_SYSTEM_PROMPT, model) + count_tokens(prepared["user_content"], model)
+        completion_tokens = count_tokens(response, model)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "history_tokens": prepared["history_tokens"],
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        conversation.add_turn(ChatTurn(message, response, usage))
+        print(f"[CHAT] Session {conversation.session_id[:8]} turn {conversation.total_turns}: {len(prepared['sources'])} chunks, {usage}")
+        return usage
+
+    def _result(self, conversation: ChatSession, response: str, prepared: Dict[str, Any], usage: Dict[str, int]) -> Dict[str, Any]:
+        return {"response": response, "session_id": conversation.session_id, "sources": prepared["sources"], "usage": usage}
+
+    def answer(self, context: ProductContext, message: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        conversation = self.conversations.get_or_create(context.product_id, session_id)
+        prepared = self.prepare(context, message, conversation)
+        response = self.client.generate_response(
+            system_prompt=CHAT_SYSTEM_PROMPT,
+            user_content=prepared["user_content"],
+            agent_name=self.agent_name
+        )
+        usage = self._record_turn(conversation, message, prepared, response)
+        self.fold_history(conversation)
+        return self._result(conversation, response, prepared, usage)
+
+    async def aanswer(self, context: ProductContext, message: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        conversation = self.conversations.get_or_create(context.product_id, session_id)
+        prepared = await self.aprepare(context, message, conversation)
+        response = await self.client.agenerate_response(
+            system_prompt=CHAT_SYSTEM_PROMPT,
+            user_content=prepared["user_content"],
+            agent_name=self.agent_name
+        )
+        usage = self._record_turn(conversation, message, prepared, response)
+        self._schedule_fold(conversation)
+        return self._result(conversation, response, prepared, usage)
+
+    async def astream_answer(self, context: ProductContext, message: str, session_id: Optional[str] = None, stats: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Streams the answer's text chunks. stats (if given) is filled with the
+        LLMClient stream timings plus session_id, sources and usage.
+        """
+        conversation = self.conversations.get_or_create(context.product_id, session_id)
+        prepared = await self.aprepare(context, message, conversation)
+        parts = []
+        async for text in self.client.astream_response(
+            system_prompt=CHAT_SYSTEM_PROMPT,
+            user_content=prepared["user_content"],
+            agent_name=self.agent_name,
+            stats=stats
+        ):
+            parts.append(text)
+            yield text
+
+        response = "".join(parts)
+        usage = self._record_turn(conversation, message, prepared, response)
+        self._schedule_fold(conversation)
+        if stats is not None:
+            result = self._result(conversation, response, prepared, usage)
+            del result["response"]
+            stats.update(result)
+
+    # ------------------------------------------------------------------
+    # History folding
+    # ------------------------------------------------------------------
+    def _fold_input(self, conversation: ChatSession) -> Optional[Tuple[int, str]]:
+        """
+        (number of oldest turns to fold, summarizer prompt), or None if the
+        verbatim history is within recent_turns.
+        """
+        count = len(conversation.turns) - self.recent_turns
+        if count <= 0:
+            return None
+        turns = "\n\n".join(f"User: {turn.user}\nSage: {turn.assistant}" for turn in conversation.turns[:count])
+        earlier = f"Earlier summary: {conversation.summary}\n\n" if conversation.summary else ""
+        return count, f"{earlier}New turns:\n{turns}"
+
+    def _fallback_summary(self, conversation: ChatSession, count: int) -> str:
+        # No summarizer available: keep what the shopper asked, which matters most for follow-ups
+        questions = "; ".join(turn.user for turn in conversation.turns[:count])
+        return f"{conversation.summary} Earlier questions: {questions}".strip()
+
+    def fold_history(self, conversation: ChatSession):
+        fold = self._fold_input(conversation)
+        if fold is None:
+            return
+        count, prompt = fold
+        try:
+            summary = self.client.generate_response(SUMMARY_SYSTEM_PROMPT, prompt, self.summary_agent_name)
+        except Exception as e:
+            print(f"[CHAT] History summary failed, keeping earlier questions only: {e}")
+            summary = self._fallback_summary(conversation, count)
+        conversation.fold(count, truncate_to_tokens(summary.strip(), self.summary_max_tokens))
+
+    async def afold_history(self, conversation: ChatSession):
+        fold = self._fold_input(conversation)
+        if fold is None:
+            return
+        count, prompt = fold
+        try:
+            summary = await self.client.agenerate_response(SUMMARY_SYSTEM_PROMPT, prompt, self.summary_agent_name)
+        except Exception as e:
+            print(f"[CHAT] History summary failed, keeping earlier questions only: {e}")
+            summary = self._fallback_summary(conversation, count)
+        conversation.fold(count, truncate_to_tokens(summary.strip(), self.summary_max_tokens))
+
+    def _schedule_fold(self, conversation: ChatSession):
+        # At most one fold per conversation at a time; the next one picks up any new overflow
+        if len(conversation.turns) <= self.recent_turns:
+            return
+        if conversation.folding is None or conversation.folding.done():
+            conversation.folding = asyncio.create_task(self.afold_history(conversation))
@@ -1,7 +1,8 @@
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from sage.models.schemas import TrustSummary, JudgeOutput
-from sage.utils.llm_client import LLMClient
+from sage.utils.llm_client import get_llm_client
+from sage.utils.prompt_packing import EvidencePacker, EvidencePack
 
 JUDGE_SYSTEM_PROMPT = """You are the Judge Agent for Sage.
 Your job is to:
@@ -21,16 +22,12 @@ Output JSON:
 
 class JudgeAgent:
     def __init__(self):
-        self.client = LLMClient()
+        self.client = get_llm_client()
         self.agent_name = "judge"
+        self.packer = EvidencePacker(self.agent_name)
 
     def judge(self, trust_summary: TrustSummary, evidence: List[Dict[str, Any]]) -> JudgeOutput:
-        user_content = f"""
-        Trust Summary Claims: {trust_summary.claims}
-        Evidence Bundle:
-        {json.dumps(evidence, indent=2)}
-        """
-        
+        user_content, pack = self._build_user_content(trust_summary, evidence)
         response_str = self.client.generate_response(
             system_prompt=JUDGE_SYSTEM_PROMPT,
             user_content=user_content,
@@ -38,9 +35,32 @@ class JudgeAgent:
             response_format=JudgeOutput,
             temperature=0.0
         )
-        
+        return self._parse_response(response_str, pack)
+
+    async def ajudge(self, trust_summary: TrustSummary, evidence: List[Dict[str, Any]]) -> JudgeOutput:
+        user_content, pack = self._build_user_content(trust_summary, evidence)
+        response_str = await self.client.agenerate_response(
+            system_prompt=JUDGE_SYSTEM_PROMPT,
+            user_content=user_content,
+            agent_name=self.agent_name,
+            response_format=JudgeOutput,
+            temperature=0.0
+        )
+        return self._parse_response(response_str, pack)
+
+    def _build_user_content(self, trust_summary: TrustSummary, evidence: List[Dict[str, Any]]) -> Tuple[str, EvidencePack]:
+        # Same bundle as the summarizer, so the same aliases; claims are quoted with them too
+        pack = self.packer.pack(evidence, self.client.get_model_name(self.agent_name))
+        print(f"[JUDGE] Evidence packing: {self.packer.describe(pack)}")
+        return f"""
+        Trust Summary Claims: {pack.alias_text(str(trust_summary.claims))}
+        Evidence Bundle (evidence_ids are the ids in brackets):
+        {pack.text}
+        """, pack
+
+    def _parse_response(self, response_str: str, pack: EvidencePack) -> JudgeOutput:
         try:
-            data = json.loads(response_str)
+            data = pack.expand(json.loads(response_str))
             return JudgeOutput(**data)
         except json.JSONDecodeError:
             raise ValueError("Failed to parse Judge response")
@@ -1,7 +1,7 @@
 import json
 from typing import Dict, Any
 from sage.models.schemas import ProductContext, PlannerOutput
-from sage.utils.llm_client import LLMClient
+from sage.utils.llm_client import get_llm_client
 
 PLANNER_SYSTEM_PROMPT = """You are the Planner Agent for Sage, a product truth engine.
 Your job is to:
@@ -28,26 +28,38 @@ Output (JSON):
 
 class PlannerAgent:
     def __init__(self):
-        self.client = LLMClient()
+        self.client = get_llm_client()
         self.agent_name = "planner"
 
     def plan(self, context: ProductContext) -> PlannerOutput:
+        response_str = self.client.generate_response(
+            system_prompt=PLANNER_SYSTEM_PROMPT,
+            user_content=self._build_user_content(context),
+            agent_name=self.agent_name,
+            response_format=PlannerOutput
+        )
+        return self._parse_response(response_str)
+
+    async def aplan(self, context: ProductContext) -> PlannerOutput:
+        response_str = await self.client.agenerate_response(
+            system_prompt=PLANNER_SYSTEM_PROMPT,
+            user_content=self._build_user_content(context),
+            agent_name=self.agent_name,
+            response_format=PlannerOutput
+        )
+        return self._parse_response(response_str)
+
+    def _build_user_content(self, context: ProductContext) -> str:
         # Construct the user content from the ProductContext
-        user_content = f"""
+        return f"""
         Product Context:
         Product ID: {context.product_id}
         URL: {context.url}
         Source: {context.source}
         User Question: {context.user_question}
         """
-        
-        response_str = self.client.generate_response(
-            system_prompt=PLANNER_SYSTEM_PROMPT,
-            user_content=user_content,
-            agent_name=self.agent_name,
-            response_format=PlannerOutput
-        )
-        
+
+    def _parse_response(self, response_str: str) -> PlannerOutput:
         # Parse the response into the Pydantic model
         try:
             data = json.loads(response_str)
@@ -1,8 +1,11 @@
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from sage.models.schemas import ProductContext, PlannerOutput, EvidenceUnit
-from sage.utils.llm_client import LLMClient
+from sage.utils.llm_client import get_llm_client
 from sage.utils.vector_db import VectorDBClient
+from sage.utils.config import get_section
+from sage.engine.evidence_ranker import EvidenceRanker
+from sage.utils.prompt_packing import EvidencePacker, EvidencePack
 
 RETRIEVER_SYSTEM_PROMPT = """You are the Retriever Agent for Sage.
 Your job is to:
@@ -22,7 +25,7 @@ Output JSON:
 
 class RetrieverAgent:
     def __init__(self, vector_db: VectorDBClient):
-        self.client = LLMClient()
+        self.client = get_llm_client()
         self.agent_name = "retriever_agent" # Will map to 'bge-large-en' in config for embedding, but here we need the LLM for ranking?
         # Actually, the PRD lists "Retriever Agent" under "Technology and AI capability matrix" as using "bge-large-en".
         # But it also has a System Prompt, which implies an LLM step for ranking/selection/diagnostics.
@@ -40,35 +43,179 @@ class RetrieverAgent:
 
         self.vector_db = vector_db
 
+        config = get_section("retrieval")
+        self.max_evidence = config.get("max_evidence", 10)
+        self.per_query_top_k = config.get("per_query_top_k", 5)
+        self.candidate_pool = config.get("candidate_pool", 20)
+        # "local": deterministic EvidenceRanker, no LLM call; "llm": rank with the retriever model
+        self.ranking_mode = config.get("ranking_mode", "local")
+        self.ranker = EvidenceRanker(config.get("ranker", {}))
+        self.packer = EvidencePacker(self.llm_agent_name)
+
     def retrieve(self, context: ProductContext, plan: PlannerOutput) -> Dict[str, Any]:
-        # 1. Execute retrieval based on plan
-        # In a real system, we'd generate embeddings here.
-        # For the mock, we just pass the text.
-        
-        query = f"{context.product_id} {context.user_question or ''} {' '.join(plan.aspects)}"
+        # 1. Execute retrieval based on plan: one sub-query per aspect, batched into one round-trip
+        query = self._build_query(context, plan)
+        sub_queries = self._build_sub_queries(context, plan)
         
         # Fetch raw chunks
-        raw_results = self.vector_db.query(query, top_k=10)
+        results = self.vector_db.query_many([text for _, text in sub_queries], top_k=self.per_query_top_k, product_id=context.product_id)
+        raw_results = self._merge_results(sub_queries, results, self._candidate_budget())
         
-        # 2. Use LLM to rank and format (as per System Prompt)
-        # We pass the raw results to the LLM and ask it to select/rank/diagnose.
+        # 2. Rank locally, or use LLM to rank and format (as per System Prompt)
+        if self.ranking_mode == "local":
+            return self._rank_locally(raw_results)
         
-        user_content = f"""
-        Query: {query}
-        Raw Retrieved Chunks:
-        {json.dumps(raw_results, indent=2)}
+        # We pass the raw results to the LLM and ask it to select/rank/diagnose.
+        user_content, pack = self._build_user_content(query, raw_results, plan)
+        response_str = self.client.generate_response(
+            system_prompt=RETRIEVER_SYSTEM_PROMPT,
+            user_content=user_content,
+            agent_name=self.llm_agent_name
+        )
+        return self._parse_response(response_str, raw_results, pack)
+
+    async def aretrieve(self, context: ProductContext, plan: PlannerOutput) -> Dict[str, Any]:
+        query = self._build_query(context, plan)
+        sub_queries = self._build_sub_queries(context, plan)
+        results = await self.vector_db.aquery_many([text for _, text in sub_queries], top_k=self.per_query_top_k, product_id=context.product_id)
+        raw_results = self._merge_results(sub_queries, results, self._candidate_budget())
         
-        Plan Aspects: {plan.aspects}
-        """
+        if self.ranking_mode == "local":
+            return self._rank_locally(raw_results)
         
-        response_str = self.client.generate_response(
+        user_content, pack = self._build_user_content(query, raw_results, plan)
+        response_str = await self.client.agenerate_response(
             system_prompt=RETRIEVER_SYSTEM_PROMPT,
             user_content=user_content,
             agent_name=self.llm_agent_name
         )
+        return self._parse_response(response_str, raw_results, pack)
+
+    def _candidate_budget(self) -> int:
+        # The local ranker picks max_evidence out of a deeper pool; the LLM sees max_evidence chunks as before
+        return self.candidate_pool if self.ranking_mode == "local" else self.max_evidence
+
+    def _rank_locally(self, raw_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        result = self.ranker.rank(raw_results, top_k=self.max_evidence)
+        return self._attach_diagnostics(result, raw_results)
+
+    def _build_query(self, context: ProductContext, plan: PlannerOutput) -> str:
+        return f"{context.product_id} {context.user_question or ''} {' '.join(plan.aspects)}"
+
+    def _build_sub_queries(self, context: ProductContext, plan: PlannerOutput) -> List[Tuple[str, str]]:
+        """
+        (label, query text) pairs: the user's question plus one query per planned aspect.
+        Aspect queries are the aspect text alone; the search is already scoped to the
+        product's namespace, so the product ID would only add noise.
+        """
+        sub_queries = []
+        seen = set()
+        candidates = [("question", context.user_question)] + [(aspect, aspect) for aspect in plan.aspects]
+        for label, text in candidates:
+            text = " ".join((text or "").split())
+            if text and text.lower() not in seen:
+                seen.add(text.lower())
+                sub_queries.append((label, text))
+        if not sub_queries:
+            sub_queries.append(("product", self._build_query(context, plan).strip()))
+        return sub_queries
+
+    def _merge_results(self, sub_queries: List[Tuple[str, str]], results: List[List[Dict[str, Any]]], budget: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Merge per-query hits into at most `budget` (default max_evidence) chunks, deduplicated by chunk ID.
+        Every sub-query first gets a quota of its best hits, so niche aspects are covered;
+        leftover slots go to the remaining hits round-robin by rank. Each chunk lists the
+        sub-queries that retrieved it under "aspects".
+        """
+        budget = budget or self.max_evidence
+        quota = max(1, budget // max(1, len(sub_queries)))
+        selected: Dict[str, Dict[str, Any]] = {}
+        cursors = [0] * len(results)
+
+        def take(q: int) -> bool:
+            # Advance sub-query q to its next hit; returns False when it is exhausted
+            hits = results[q]
+            while cursors[q] < len(hits):
+                hit = hits[cursors[q]]
+                cursors[q] += 1
+                label = sub_queries[q][0]
+                if hit["evidence_id"] in selected:
+                    aspects = selected[hit["evidence_id"]]["aspects"]
+                    if label not in aspects:
+                        aspects.append(label)
+                    continue
+                if len(selected) >= budget:
+                    return False
+                selected[hit["evidence_id"]] = {**hit, "aspects": [label]}
+                return True
+            return False
+
+        # 1. Per-aspect quotas
+        for q in range(len(results)):
+            for _ in range(quota):
+                if not take(q):
+                    break
+
+        # 2. Fill the remaining budget round-robin
+        active = [q for q in range(len(results)) if cursors[q] < len(results[q])]
+        while active and len(selected) < budget:
+            active = [q for q in active if take(q)]
+
+        return list(selected.values())
+
+    def _build_user_content(self, query: str, raw_results: List[Dict[str, Any]], plan: PlannerOutput) -> Tuple[str, EvidencePack]:
+        pack = self.packer.pack(raw_results, self.client.get_model_name(self.llm_agent_name))
+        print(f"[RETRIEVER] Evidence packing: {self.packer.describe(pack)}")
+        return f"""
+        Query: {query}
+        Raw Retrieved Chunks (refer to a chunk by its id in brackets, do not copy its text):
+        {pack.text}
         
+        Plan Aspects: {plan.aspects}
+        """, pack
+
+    def _parse_response(self, response_str: str, raw_results: List[Dict[str, Any]], pack: EvidencePack) -> Dict[str, Any]:
         try:
-            return json.loads(response_str)
+            result = json.loads(response_str)
+            if isinstance(result, dict) and isinstance(result.get("evidence"), list):
+                result["evidence"] = self._resolve_evidence(result["evidence"], raw_results, pack)
         except json.JSONDecodeError:
             # Fallback if LLM fails
-            return {"evidence": raw_results, "diagnostics": {"error": "LLM parsing failed"}}
+            result = {"evidence": raw_results, "diagnostics": {"error": "LLM parsing failed"}}
+        return self._attach_diagnostics(result, raw_results)
+
+    def _resolve_evidence(self, evidence: List[Any], raw_results: List[Dict[str, Any]], pack: EvidencePack) -> List[Any]:
+        """
+        The model picks chunks by alias; swap each pick for the original hit
+        (full text and metadata), keeping any fields the model added.
+        """
+        by_id = {hit["evidence_id"]: hit for hit in raw_results}
+        resolved = []
+        for item in evidence:
+            if isinstance(item, str):
+                item = {"evidence_id": item}
+            if isinstance(item, dict):
+                item = pack.expand(item)
+                hit = by_id.get(item.get("evidence_id"))
+                if hit is not None:
+                    item = {**hit, **{k: v for k, v in item.items() if k != "text"}}
+            resolved.append(item)
+        return resolved
+
+    def _attach_diagnostics(self, result: Dict[str, Any], raw_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Which index (dense / lexical) contributed each raw hit
+        if isinstance(result, dict):
+            diagnostics = result.get("diagnostics")
+            if not isinstance(diagnostics, dict):
+                diagnostics = result["diagnostics"] = {} if diagnostics is None else {"notes": diagnostics}
+            diagnostics.setdefault("ranking_mode", self.ranking_mode)
+            diagnostics["retrieval"] = VectorDBClient.describe_hits(raw_results)
+            diagnostics["retrieval"]["aspect_coverage"] = self._aspect_coverage(raw_results)
+        return result
+
+    def _aspect_coverage(self, raw_results: List[Dict[str, Any]]) -> Dict[str, int]:
+        coverage: Dict[str, int] = {}
+        for hit in raw_results:
+            for label in hit.get("aspects", []):
+                coverage[label] = coverage.get(label, 0) + 1
+        return coverage
@@ -1,7 +1,8 @@
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from sage.models.schemas import TrustSummary, EvidenceUnit
-from sage.utils.llm_client import LLMClient
+from sage.utils.llm_client import get_llm_client
+from sage.utils.prompt_packing import EvidencePacker, EvidencePack
 
 SUMMARIZER_SYSTEM_PROMPT = """You are the Summarizer Agent for Sage.
 Your job is to:
@@ -46,19 +47,12 @@ Output JSON:
 
 class SummarizerAgent:
     def __init__(self):
-        self.client = LLMClient()
+        self.client = get_llm_client()
         self.agent_name = "summarizer_trust"
+        self.packer = EvidencePacker(self.agent_name)
 
     def summarize(self, product_id: str, evidence: List[Dict[str, Any]]) -> TrustSummary:
-        print(f"[SUMMARIZER] Product ID: {product_id}")
-        print(f"[SUMMARIZER] Evidence count: {len(evidence)}")
-        print(f"[SUMMARIZER] Evidence preview: {evidence[:2] if evidence else 'No evidence'}")
-        
-        user_content = f"""
-        Product ID: {product_id}
-        Evidence Bundle:
-        {json.dumps(evidence, indent=2)}
-        """
+        user_content, pack = self._build_user_content(product_id, evidence)
         
         print(f"[SUMMARIZER] Calling LLM with {len(user_content)} chars of context...")
         response_str = self.client.generate_response(
@@ -68,12 +62,41 @@ class SummarizerAgent:
             response_format=TrustSummary,
             temperature=0.0
         )
+        return self._parse_response(response_str, pack)
+
+    async def asummarize(self, product_id: str, evidence: List[Dict[str, Any]]) -> TrustSummary:
+        user_content, pack = self._build_user_content(product_id, evidence)
+        
+        print(f"[SUMMARIZER] Calling LLM with {len(user_content)} chars of context...")
+        response_str = await self.client.agenerate_response(
+            system_prompt=SUMMARIZER_SYSTEM_PROMPT,
+            user_content=user_content,
+            agent_name=self.agent_name,
+            response_format=TrustSummary,
+            temperature=0.0
+        )
+        return self._parse_response(response_str, pack)
+
+    def _build_user_content(self, product_id: str, evidence: List[Dict[str, Any]]) -> Tuple[str, EvidencePack]:
+        print(f"[SUMMARIZER] Product ID: {product_id}")
+        print(f"[SUMMARIZER] Evidence count: {len(evidence)}")
+        print(f"[SUMMARIZER] Evidence preview: {evidence[:2] if evidence else 'No evidence'}")
         
+        pack = self.packer.pack(evidence, self.client.get_model_name(self.agent_name))
+        print(f"[SUMMARIZER] Evidence packing: {self.packer.describe(pack)}")
+        return f"""
+        Product ID: {product_id}
+        Evidence Bundle (cite evidence by its id in brackets):
+        {pack.text}
+        """, pack
+
+    def _parse_response(self, response_str: str, pack: EvidencePack) -> TrustSummary:
         print(f"[SUMMARIZER] LLM response length: {len(response_str)} chars")
         print(f"[SUMMARIZER] Response preview: {response_str[:500]}...")
         
         try:
-            data = json.loads(response_str)
+            # Claims cite the short evidence aliases; map them back to the real IDs
+            data = pack.expand(json.loads(response_str))
             # Ensure the data matches TrustSummary schema
             summary = TrustSummary(**data)
             print(f"[SUMMARIZER] Created TrustSummary with {len(summary.aspects)} aspects")
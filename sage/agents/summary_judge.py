@@ -0,0 +1,100 @@
+import json
+from typing import Dict, Any, List, Tuple
+from sage.models.schemas import SummaryJudgeOutput
+from sage.utils.llm_client import get_llm_client
+from sage.utils.prompt_packing import EvidencePacker, EvidencePack
+
+SUMMARY_JUDGE_SYSTEM_PROMPT = """You are the Summarizer and Judge Agent for Sage.
+Your job has two parts, answered in one response.
+
+Part 1 - trust_summary:
+- Produce a structured Trust Summary grounded ONLY in the evidence.
+- Write claims with explicit evidence_ids.
+- Provide aspect-wise summaries and dealbreakers, using aspects relevant to THIS product category
+  (e.g. Refrigerator: Cooling Performance, Energy Efficiency; Headphones: Sound Quality, ANC).
+- List conflicts (e.g., specs vs. user experience) and uncertainties (missing info).
+- If you don't have evidence for an aspect, DO NOT include it.
+- NO SPECULATION OR HALLUCINATION. Prefer consensus; highlight outliers.
+
+Part 2 - judge_output:
+- Judge EVERY claim from Part 1 strictly against the evidence, as an independent reviewer
+  would. Do not assume a claim is supported because you wrote it.
+- Detect contradictions between evidence sources (e.g., PDP says X, Reviews say Y).
+- Flag missing evidence or weak support. Mark doubtful cases as Unsupported.
+
+Output JSON:
+{
+"trust_summary": {
+    "product_id": "...",
+    "overall_verdict": "...",
+    "aspects": [
+        {"name": "...", "score_0_10": 8, "pros": ["..."], "cons": ["..."], "dealbreakers": ["..."]}
+    ],
+    "claims": ["..."],
+    "conflicts": ["..."],
+    "uncertainties": ["..."]
+},
+"judge_output": {
+    "claims_judgement": [
+        {"claim_text": "...", "evidence_ids": ["..."], "judge_label": "Supported|PartiallySupported|Unsupported|Contradicted", "reasoning": "..."}
+    ],
+    "conflicts": ["Conflict description..."],
+    "uncertainty_aspects": ["Aspect name..."]
+}
+}"""
+
+class SummaryJudgeAgent:
+    """
+    Fused analysis mode: one structured-output call returns both the TrustSummary
+    and the JudgeOutput for its claims, so the evidence is sent once and the
+    pipeline waits on one round-trip instead of two.
+    """
+    def __init__(self):
+        self.client = get_llm_client()
+        self.agent_name = "summarize_judge"
+        self.packer = EvidencePacker(self.agent_name)
+
+    def analyze(self, product_id: str, evidence: List[Dict[str, Any]]) -> SummaryJudgeOutput:
+        user_content, pack = self._build_user_content(product_id, evidence)
+        response_str = self.client.generate_response(
+            system_prompt=SUMMARY_JUDGE_SYSTEM_PROMPT,
+            user_content=user_content,
+            agent_name=self.agent_name,
+            response_format=SummaryJudgeOutput,
+            temperature=0.0
+        )
+        return self._parse_response(response_str, pack)
+
+    async def aanalyze(self, product_id: str, evidence: List[Dict[str, Any]]) -> SummaryJudgeOutput:
+        user_content, pack = self._build_user_content(product_id, evidence)
+        response_str = await self.client.agenerate_response(
+            system_prompt=SUMMARY_JUDGE_SYSTEM_PROMPT,
+            user_content=user_content,
+            agent_name=self.agent_name,
+            response_format=SummaryJudgeOutput,
+            temperature=0.0
+        )
+        return self._parse_response(response_str, pack)
+
+    def _build_user_content(self, product_id: str, evidence: List[Dict[str, Any]]) -> Tuple[str, EvidencePack]:
+        pack = self.packer.pack(evidence, self.client.get_model_name(self.agent_name))
+        print(f"[SUMMARY_JUDGE] Evidence count: {len(evidence)}")
+        print(f"[SUMMARY_JUDGE] Evidence packing: {self.packer.describe(pack)}")
+        return f"""
+        Product ID: {product_id}
+        Evidence Bundle (cite evidence by its id in brackets; evidence_ids are these ids):
+        {pack.text}
+        """, pack
+
+    def _parse_response(self, response_str: str, pack: EvidencePack) -> SummaryJudgeOutput:
+        print(f"[SUMMARY_JUDGE] LLM response length: {len(response_str)} chars")
+        try:
+            data = pack.expand(json.loads(response_str))
+        except json.JSONDecodeError:
+            raise ValueError("Failed to parse Summary+Judge response")
+        # Validates both halves against the TrustSummary and JudgeOutput schemas
+        output = SummaryJudgeOutput(**data)
+        judged = {j.claim_text for j in output.judge_output.claims_judgement}
+        unjudged = [claim for claim in output.trust_summary.claims if claim not in judged]
+        print(f"[SUMMARY_JUDGE] {len(output.trust_summary.claims)} claims, {len(output.judge_output.claims_judgement)} judged, {len(unjudged)} without a matching judgement")
+        return output
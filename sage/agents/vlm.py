@@ -1,7 +1,7 @@
 import json
 from typing import List, Dict, Any
 from sage.models.schemas import ProductContext
-from sage.utils.llm_client import LLMClient
+from sage.utils.llm_client import get_llm_client
 
 VLM_SYSTEM_PROMPT = """You are the VLM Image/OCR Agent for Sage.
 Your job is to:
@@ -22,35 +22,52 @@ Output JSON:
 
 class VLMAgent:
     def __init__(self):
-        self.client = LLMClient()
+        self.client = get_llm_client()
         self.agent_name = "vlm_ocr"
 
     def process_images(self, context: ProductContext) -> Dict[str, Any]:
         if not context.images:
-            return {
-                "captions": [],
-                "specs_detected": [],
-                "model_strings": [],
-                "ports": [],
-                "manual_text": None,
-                "confidence_scores": {}
-            }
+            return self._empty_result()
 
+        response_str = self.client.generate_response(
+            system_prompt=VLM_SYSTEM_PROMPT,
+            user_content=self._build_user_content(context),
+            agent_name=self.agent_name
+        )
+        return self._parse_response(response_str)
+
+    async def aprocess_images(self, context: ProductContext) -> Dict[str, Any]:
+        if not context.images:
+            return self._empty_result()
+
+        response_str = await self.client.agenerate_response(
+            system_prompt=VLM_SYSTEM_PROMPT,
+            user_content=self._build_user_content(context),
+            agent_name=self.agent_name
+        )
+        return self._parse_response(response_str)
+
+    def _empty_result(self) -> Dict[str, Any]:
+        return {
+            "captions": [],
+            "specs_detected": [],
+            "model_strings": [],
+            "ports": [],
+            "manual_text": None,
+            "confidence_scores": {}
+        }
+
+    def _build_user_content(self, context: ProductContext) -> str:
         # In a real implementation, we would pass image bytes/URLs to the VLM.
         # Here we simulate by passing a description of the images or just the list of URLs
         # and letting the mock LLM client handle it (or return a mock response).
         
-        user_content = f"""
+        return f"""
         Product ID: {context.product_id}
         Images to process: {context.images}
         """
-        
-        response_str = self.client.generate_response(
-            system_prompt=VLM_SYSTEM_PROMPT,
-            user_content=user_content,
-            agent_name=self.agent_name
-        )
-        
+
+    def _parse_response(self, response_str: str) -> Dict[str, Any]:
         try:
             return json.loads(response_str)
         except json.JSONDecodeError:
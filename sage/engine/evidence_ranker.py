@@ -0,0 +1,147 @@
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from sage.utils.lexical_index import tokenize
+
+DEFAULT_SOURCE_TRUST = {
+    "structured_content": 1.0,
+    "pdp": 0.8,
+    "pdf_text": 0.8,
+    "vlm_image": 0.7,
+    "youtube": 0.6,
+    "reddit": 0.5,
+    "unknown": 0.4
+}
+
+# Metadata fields checked (in order) for a publication time
+TIMESTAMP_FIELDS = ("published_at", "created_at", "timestamp", "date")
+
+class EvidenceRanker:
+    """
+    Deterministic, LLM-free evidence ranking for RetrieverAgent.
+
+    base = w_relevance * relevance + w_trust * trust + w_recency * recency, where
+    - relevance: RRF score (normalized to the best hit) when hybrid retrieval ran,
+      otherwise cosine similarity recovered from the dense distance
+    - trust: per-source_type weight, boosted for chunks marked priority: high
+    - recency: exponential decay with the given half-life; undated chunks score 0.5
+
+    Selection is MMR: each pick maximizes
+    mmr_lambda * base - (1 - mmr_lambda) * max token-overlap with chunks already picked.
+    Near-duplicates (overlap >= duplicate_threshold) are dropped.
+    """
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        weights = config.get("weights", {})
+        self.w_relevance = weights.get("relevance", 0.6)
+        self.w_trust = weights.get("trust", 0.25)
+        self.w_recency = weights.get("recency", 0.15)
+        self.source_trust = {**DEFAULT_SOURCE_TRUST, **config.get("source_trust", {})}
+        self.high_priority_boost = config.get("high_priority_boost", 0.2)
+        self.mmr_lambda = config.get("mmr_lambda", 0.7)
+        self.duplicate_threshold = config.get("duplicate_threshold", 0.9)
+        self.recency_half_life_days = config.get("recency_half_life_days", 365)
+
+    def rank(self, hits: List[Dict[str, Any]], top_k: int, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        hits are VectorDBClient results. Returns {"evidence": [...], "diagnostics": {...}},
+        the same shape the LLM ranking path produces.
+        """
+        now = now or time.time()
+        max_rrf = max((hit.get("rrf_score") or 0.0 for hit in hits), default=0.0)
+
+        candidates = []
+        for hit in hits:
+            metadata = hit.get("metadata") or {}
+            relevance = self._relevance(hit, max_rrf)
+            trust = self._trust(metadata)
+            recency = self._recency(metadata, now)
+            candidates.append({
+                "hit": hit,
+                "tokens": set(tokenize(hit.get("text", ""))),
+                "components": {"relevance": round(relevance, 4), "trust": round(trust, 4), "recency": round(recency, 4)},
+                "base": self.w_relevance * relevance + self.w_trust * trust + self.w_recency * recency
+            })
+
+        selected = []
+        duplicates = []
+        remaining = sorted(candidates, key=lambda c: (-c["base"], c["hit"]["evidence_id"]))
+        while remaining and len(selected) < top_k:
+            best, best_score, best_overlap = None, None, 0.0
+            for candidate in remaining:
+                overlap = max((self._overlap(candidate["tokens"], s["tokens"]) for s in selected), default=0.0)
+                score = self.mmr_lambda * candidate["base"] - (1 - self.mmr_lambda) * overlap
+                if best_score is None or score > best_score:
+                    best, best_score, best_overlap = candidate, score, overlap
+            remaining.remove(best)
+            if best_overlap >= self.duplicate_threshold:
+                duplicates.append(best["hit"]["evidence_id"])
+                continue
+            best["final"] = round(best_score, 4)
+            selected.append(best)
+
+        return {
+            "evidence": [self._evidence_unit(c) for c in selected],
+            "diagnostics": {
+                "ranking_mode": "local",
+                "candidates": len(hits),
+                "selected": len(selected),
+                "dropped_duplicates": duplicates,
+                "scores": {c["hit"]["evidence_id"]: {**c["components"], "final": c["final"]} for c in selected}
+            }
+        }
+
+    def _relevance(self, hit: Dict[str, Any], max_rrf: float) -> float:
+        if max_rrf > 0:
+            return (hit.get("rrf_score") or 0.0) / max_rrf
+        distance = hit.get("score")
+        if distance is None:
+            return 0.0
+        # Squared L2 between unit vectors: d = 2 - 2 * cosine
+        return min(1.0, max(0.0, 1.0 - distance / 2.0))
+
+    def _trust(self, metadata: Dict[str, Any]) -> float:
+        trust = self.source_trust.get(metadata.get("source_type", "unknown"), self.source_trust["unknown"])
+        if metadata.get("priority") == "high":
+            trust += self.high_priority_boost
+        return min(1.0, trust)
+
+    def _recency(self, metadata: Dict[str, Any], now: float) -> float:
+        published = None
+        for field in TIMESTAMP_FIELDS:
+            if metadata.get(field) is not None:
+                published = self._to_epoch(metadata[field])
+                if published is not None:
+                    break
+        if published is None:
+            return 0.5
+        age_days = max(0.0, (now - published) / 86400)
+        return 0.5 ** (age_days / self.recency_half_life_days)
+
+    @staticmethod
+    def _to_epoch(value: Any) -> Optional[float]:
+        if isinstance(value, (int, float)):
+            return float(value)
+        try:
+            return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _overlap(a: set, b: set) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
+
+    @staticmethod
+    def _evidence_unit(candidate: Dict[str, Any]) -> Dict[str, Any]:
+        hit = candidate["hit"]
+        metadata = hit.get("metadata") or {}
+        return {
+            "evidence_id": hit["evidence_id"],
+            "text": hit.get("text", ""),
+            "source_type": metadata.get("source_type", "unknown"),
+            "aspect_tags": hit.get("aspects", []),
+            "metadata": metadata,
+            "rank_score": candidate["final"]
+        }
@@ -0,0 +1,176 @@
+import time
+import uuid
+import heapq
+import itertools
+import threading
+from typing import Callable, Dict, Any, List, Optional
+from sage.engine.scheduler import StageCancelled
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+class QueueFullError(Exception):
+    """Raised by JobQueue.submit when max_queued jobs are already waiting."""
+
+class Job:
+    def __init__(self, payload: Any, priority: int = 0):
+        self.job_id = uuid.uuid4().hex
+        self.payload = payload
+        self.priority = priority
+        self.status = JobStatus.QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.stage: Optional[str] = None  # Last stage reported by the handler
+        self.cancel_event = threading.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "priority": self.priority,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == JobStatus.SUCCEEDED:
+            data["result"] = self.result
+        if self.error:
+            data["error"] = self.error
+        return data
+
+class JobQueue:
+    """
+    Priority queue of jobs served by a fixed pool of worker threads.
+    - Concurrency is bounded by `workers`; at most `max_queued` jobs may wait (backpressure).
+    - Higher priority runs first; equal priorities run in submission order.
+    - Queued jobs cancel immediately; running jobs are cancelled cooperatively through
+      job.cancel_event, which the handler is expected to honour.
+    - Finished jobs are kept for `retention_seconds` so clients can poll for results; they
+      are purged on access and by idle workers, so results do not pile up without traffic.
+    """
+    def __init__(self, handler: Callable[[Job], Any], workers: int = 2, max_queued: int = 100, retention_seconds: float = 3600):
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        # How often an idle worker wakes up to purge expired jobs
+        self.purge_interval = min(retention_seconds, 60) if retention_seconds else 60
+
+        self.jobs: Dict[str, Job] = {}
+        self._heap: List = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads: List[threading.Thread] = []
+
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"sage-job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, payload: Any, priority: int = 0) -> Job:
+        job = Job(payload, priority)
+        with self._cond:
+            self._purge_finished()
+            queued = sum(1 for j in self.jobs.values() if j.status == JobStatus.QUEUED)
+            if queued >= self.max_queued:
+                raise QueueFullError(f"Job queue is full ({queued} jobs waiting)")
+            self.jobs[job.job_id] = job
+            heapq.heappush(self._heap, (-priority, next(self._counter), job))
+            self._cond.notify()
+        print(f"[JOBS] Queued job {job.job_id} (priority {priority})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            self._purge_finished()
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Returns False if the job is unknown or already finished.
+        """
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in JobStatus.FINISHED:
+                return False
+            job.cancel_event.set()
+            if job.status == JobStatus.QUEUED:
+                # Left in the heap; the worker skips it when popped
+                job.status = JobStatus.CANCELLED
+                job.finished_at = time.time()
+        print(f"[JOBS] Cancel requested for job {job_id}")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            self._purge_finished()
+            counts = {status: 0 for status in (JobStatus.QUEUED, JobStatus.RUNNING) + JobStatus.FINISHED}
+            for job in self.jobs.values():
+                counts[job.status] += 1
+        return {"workers": self.workers, "max_queued": self.max_queued, **counts}
+
+    def shutdown(self, wait: bool = True):
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _purge_finished(self):
+        # Caller holds the lock
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.status in JobStatus.FINISHED and job.finished_at and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def _next_job(self) -> Optional[Job]:
+        with self._cond:
+            while True:
+                while not self._heap and not self._shutdown:
+                    self._cond.wait(timeout=self.purge_interval)
+                    self._purge_finished()
+                if self._shutdown:
+                    return None
+                _, _, job = heapq.heappop(self._heap)
+                if job.status == JobStatus.QUEUED:
+                    job.status = JobStatus.RUNNING
+                    job.started_at = time.time()
+                    return job
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            try:
+                result = self.handler(job)
+                status, error = JobStatus.SUCCEEDED, None
+            except StageCancelled:
+                result, status, error = None, JobStatus.CANCELLED, None
+            except Exception as e:
+                print(f"[JOBS] Job {job.job_id} failed: {e}")
+                result, status, error = None, JobStatus.FAILED, str(e)
+
+            with self._cond:
+                job.result = result
+                job.error = error
+                # A cancel that arrives after the handler returned does not discard its result
+                job.status = JobStatus.CANCELLED if job.cancel_event.is_set() and status != JobStatus.SUCCEEDED else status
+                job.finished_at = time.time()
+            print(f"[JOBS] Job {job.job_id} {job.status} in {job.finished_at - job.started_at:.2f}s")
@@ -0,0 +1,183 @@
+import time
+import asyncio
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Any, List, Optional
+
+EventCallback = Callable[[Dict[str, Any]], None]
+
+class StageCancelled(Exception):
+    """Raised when a run is cancelled via its cancel_event before all stages started."""
+
+class Stage:
+    def __init__(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: Optional[List[str]] = None):
+        self.name = name
+        self.fn = fn
+        self.deps = deps or []
+
+class StageScheduler:
+    """
+    Runs pipeline stages as a dependency graph.
+    Each stage function receives the results of all finished stages (keyed by stage name)
+    and starts as soon as its dependencies are done, so independent stages overlap.
+    Wall time of every stage is recorded in `timings`.
+
+    run() executes stages on a thread pool; arun() executes them as asyncio tasks,
+    in which case a stage function may return an awaitable (blocking work should be
+    wrapped in asyncio.to_thread by the caller).
+
+    If on_event is given it is called with a dict for every stage_start, stage_complete
+    (including the stage's raw "result") and stage_error. Under run() it is called from
+    worker threads; under arun() always from the event loop.
+
+    If cancel_event is set, no further stages are started and the run raises StageCancelled.
+    Stages already running are allowed to finish.
+    """
+    def __init__(self, max_workers: int = 4, on_event: Optional[EventCallback] = None, cancel_event: Optional[threading.Event] = None):
+        self.max_workers = max_workers
+        self.on_event = on_event
+        self.cancel_event = cancel_event
+        self.stages: Dict[str, Stage] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    def add_stage(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: Optional[List[str]] = None):
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        self.stages[name] = Stage(name, fn, deps)
+
+    def _validate(self):
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+
+        # Kahn's algorithm to reject cycles up front instead of deadlocking
+        remaining = {name: set(stage.deps) for name, stage in self.stages.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependency cycle between stages: {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def _is_cancelled(self) -> bool:
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def _emit(self, event: str, stage: str, **data):
+        if self.on_event is None:
+            return
+        try:
+            self.on_event({"event": event, "stage": stage, **data})
+        except Exception as e:
+            # A broken listener must never fail the pipeline
+            print(f"[SCHEDULER] Event listener error: {e}")
+
+    def _record(self, stage: Stage, start: float, t0: float):
+        self.timings[stage.name] = {
+            "start": round(start - t0, 4),
+            "duration": round(time.perf_counter() - start, 4)
+        }
+
+    def _timed(self, stage: Stage, results: Dict[str, Any], t0: float) -> Any:
+        start = time.perf_counter()
+        self._emit("stage_start", stage.name, elapsed=round(start - t0, 4))
+        try:
+            result = stage.fn(results)
+        except Exception as e:
+            self._record(stage, start, t0)
+            self._emit("stage_error", stage.name, error=str(e), **self.timings[stage.name])
+            raise
+        self._record(stage, start, t0)
+        self._emit("stage_complete", stage.name, result=result, **self.timings[stage.name])
+        return result
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Execute all stages. Returns {stage_name: result}.
+        The first stage failure cancels pending stages and is re-raised.
+        """
+        self._validate()
+        self.timings = {}
+        results: Dict[str, Any] = {}
+        pending = dict(self.stages)
+        running = {}
+        t0 = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                if pending and self._is_cancelled():
+                    for other in running:
+                        other.cancel()
+                    raise StageCancelled("Run cancelled")
+
+                # Submit every stage whose dependencies are satisfied
+                for name in list(pending):
+                    stage = pending[name]
+                    if all(dep in results for dep in stage.deps):
+                        del pending[name]
+                        # Pass a snapshot so stages never see a dict being mutated
+                        future = executor.submit(self._timed, stage, dict(results), t0)
+                        running[future] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+
+        self.timings["total"] = {"start": 0.0, "duration": round(time.perf_counter() - t0, 4)}
+        return results
+
+    async def _atimed(self, stage: Stage, results: Dict[str, Any], t0: float) -> Any:
+        start = time.perf_counter()
+        self._emit("stage_start", stage.name, elapsed=round(start - t0, 4))
+        try:
+            result = stage.fn(results)
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            self._record(stage, start, t0)
+            self._emit("stage_error", stage.name, error=str(e), **self.timings[stage.name])
+            raise
+        self._record(stage, start, t0)
+        self._emit("stage_complete", stage.name, result=result, **self.timings[stage.name])
+        return result
+
+    async def arun(self) -> Dict[str, Any]:
+        """
+        Async variant of run(). Every stage becomes a task that awaits its dependencies,
+        so independent stages overlap on a single event loop.
+        """
+        self._validate()
+        self.timings = {}
+        results: Dict[str, Any] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        t0 = time.perf_counter()
+
+        async def run_stage(stage: Stage) -> Any:
+            if stage.deps:
+                await asyncio.gather(*(tasks[dep] for dep in stage.deps))
+            if self._is_cancelled():
+                raise StageCancelled("Run cancelled")
+            results[stage.name] = await self._atimed(stage, dict(results), t0)
+            return results[stage.name]
+
+        for name, stage in self.stages.items():
+            tasks[name] = asyncio.ensure_future(run_stage(stage))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        self.timings["total"] = {"start": 0.0, "duration": round(time.perf_counter() - t0, 4)}
+        return results
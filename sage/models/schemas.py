@@ -65,3 +65,8 @@ class JudgeOutput(BaseModel):
     claims_judgement: List[ClaimJudgement]
     conflicts: List[str]
     uncertainty_aspects: List[str]
+
+# Fused analysis mode: summary and claim judgements from one call
+class SummaryJudgeOutput(BaseModel):
+    trust_summary: TrustSummary
+    judge_output: JudgeOutput
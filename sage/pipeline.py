@@ -1,42 +1,51 @@
-from typing import Dict, Any, List
-from sage.models.schemas import ProductContext, TCSComponents, TrustSummary
+import asyncio
+import threading
+from typing import Dict, Any, List, Optional, Callable
+from sage.models.schemas import ProductContext, TCSComponents, TrustSummary, PlannerOutput, JudgeOutput, SummaryJudgeOutput
 from sage.agents.planner import PlannerAgent
 from sage.agents.retriever import RetrieverAgent
 from sage.agents.vlm import VLMAgent
 from sage.agents.summarizer import SummarizerAgent
 from sage.agents.judge import JudgeAgent
+from sage.agents.summary_judge import SummaryJudgeAgent
+from sage.agents.chat import ChatAgent
 from sage.engine.tcs import TCSEngine
-from sage.engine.tcs import TCSEngine
-from sage.utils.vector_db import VectorDBClient
+from sage.engine.scheduler import StageScheduler, EventCallback
+from sage.utils.vector_db import VectorDBClient, content_fingerprint
 from sage.utils.external_search import ExternalSearch
+from sage.utils.config import get_section
+from sage.utils.result_cache import AnalysisCache
+
+ANALYSIS_MODES = ("two_stage", "fused")
 
 class SagePipeline:
     def __init__(self):
+        config = get_section("pipeline")
+        self.max_parallel_stages = config.get("max_parallel_stages", 4)
+        self.enable_external_search = config.get("enable_external_search", False)
+        # "two_stage": summarizer then judge; "fused": one call returns both (SummaryJudgeAgent)
+        self.analysis_mode = config.get("analysis_mode", "two_stage")
+        if self.analysis_mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown pipeline.analysis_mode {self.analysis_mode!r}, expected one of {ANALYSIS_MODES}")
+
         self.planner = PlannerAgent()
         self.vector_db = VectorDBClient() # In real app, this would be persistent
         self.retriever = RetrieverAgent(self.vector_db)
         self.vlm = VLMAgent()
         self.summarizer = SummarizerAgent()
         self.judge = JudgeAgent()
-        self.summarizer = SummarizerAgent()
-        self.judge = JudgeAgent()
+        self.summary_judge = SummaryJudgeAgent()
         self.tcs_engine = TCSEngine()
         self.external_search = ExternalSearch()
+        self.result_cache = AnalysisCache(analysis_mode=self.analysis_mode)
+        # Chat retrieves from the same per-product index, indexing on first use
+        self.chat = ChatAgent(self.vector_db, self._stage_index)
 
-    def run(self, context: ProductContext) -> Dict[str, Any]:
-        print(f"[PIPELINE] ========================================")
-        print(f"[PIPELINE] Starting NEW analysis")
-        print(f"[PIPELINE] Product ID: {context.product_id}")
-        print(f"[PIPELINE] URL: {context.url}")
-        print(f"[PIPELINE] ========================================")
-        
-        # 0. CRITICAL: Clear ALL old data to ensure complete isolation
-        print("[PIPELINE] Step 0: Clearing ALL old data from Vector DB...")
-        self.vector_db.clear_all()  # Clear everything, not just this product
-        
+    def _product_documents(self, context: ProductContext) -> List[Dict[str, Any]]:
+        documents = []
         # Add raw HTML (limited)
         if context.pdp_html:
-            self.vector_db.add_documents([{
+            documents.append({
                 "text": context.pdp_html[:50000],  # Limit to first 50k chars to avoid timeout
                 "source_type": "pdp",
                 "metadata": {
@@ -44,14 +53,14 @@ class SagePipeline:
                     "product_id": context.product_id,
                     "title": context.metadata.get("title", "") if context.metadata else ""
                 }
-            }])
+            })
         
         # Add structured content (HIGH PRIORITY)
         if context.structured_content:
             print(f"[PIPELINE] Adding structured content: {list(context.structured_content.keys())}")
             for section_name, section_content in context.structured_content.items():
                 if section_content:  # Only add non-null sections
-                    self.vector_db.add_documents([{
+                    documents.append({
                         "text": f"{section_name.replace('_', ' ').title()}: {section_content}",
                         "source_type": "structured_content",
                         "metadata": {
@@ -60,52 +69,105 @@ class SagePipeline:
                             "section": section_name,
                             "priority": "high"  # Mark as high priority
                         }
-                    }])
+                    })
                     print(f"[PIPELINE]   - Added {section_name}: {len(section_content)} chars")
-        
-        print("[PIPELINE] Step 0: Complete - Vector DB populated with ONLY current product data")
-        
-        # 1. Planner
+        return documents
+
+    def _index_product(self, context: ProductContext) -> Dict[str, int]:
+        # Diff against the stored chunks: only new chunks are embedded, removed ones are deleted
+        return self.vector_db.sync_documents(self._product_documents(context), product_id=context.product_id)
+
+    def _stage_index(self, context: ProductContext) -> bool:
+        """
+        Index evidence into this product's namespace (reused if already indexed).
+        Returns True if the existing index was reused.
+        """
+        print("[PIPELINE] Step 0: Indexing product evidence...")
+        self.vector_db.expire_stale()
+        fingerprint = content_fingerprint(context)
+        with self.vector_db.product_lock(context.product_id):
+            if self.vector_db.is_indexed(context.product_id, fingerprint):
+                print("[PIPELINE] Step 0: Complete - Reusing existing index for this product")
+                return True
+            # Stale or partial index: bring it up to date incrementally
+            stats = self._index_product(context)
+            self.vector_db.mark_indexed(context.product_id, fingerprint)
+            print(f"[PIPELINE] Step 0: Complete - Vector DB synced with current product data ({stats['added']} added, {stats['deleted']} removed)")
+            return False
+
+    def _stage_plan(self, context: ProductContext) -> PlannerOutput:
         print("[PIPELINE] Step 1: Planning...")
         plan = self.planner.plan(context)
         print(f"[PIPELINE] Step 1: Complete - Plan: {plan.mode}")
-        
-        # 2. Parallel Execution: Retriever + VLM
+        return plan
+
+    def _stage_retrieve(self, context: ProductContext, plan: PlannerOutput) -> Dict[str, Any]:
         print("[PIPELINE] Step 2: Retrieving evidence...")
         retrieval_result = self.retriever.retrieve(context, plan)
-        evidence = retrieval_result.get("evidence", [])
-        print(f"[PIPELINE] Step 2: Complete - Found {len(evidence)} evidence units")
-        
+        print(f"[PIPELINE] Step 2: Complete - Found {len(retrieval_result.get('evidence', []))} evidence units")
+        return retrieval_result
+
+    def _stage_vlm(self, context: ProductContext) -> List[Dict[str, Any]]:
         print("[PIPELINE] Step 3: Processing images...")
         vlm_result = self.vlm.process_images(context)
-        if vlm_result.get("specs_detected"):
+        print(f"[PIPELINE] Step 3: Complete")
+        return self._vlm_evidence(vlm_result)
+
+    def _vlm_evidence(self, vlm_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if not vlm_result.get("specs_detected"):
+            return []
+        return [{
+            "evidence_id": "vlm_1", 
+            "text": f"Specs from image: {vlm_result['specs_detected']}", 
+            "source_type": "vlm_image",
+            "aspect_tags": ["specs"]
+        }]
+
+    def _stage_external_search(self, context: ProductContext) -> List[Dict[str, Any]]:
+        # External Search (Reddit & YouTube) - off by default (pipeline.enable_external_search)
+        print("[PIPELINE] Step 4: Searching Reddit/YouTube...")
+        query = (context.metadata or {}).get("title", "") or context.product_id
+        results = self.external_search.search_reddit(query) + self.external_search.search_youtube(query)
+        evidence = self._external_evidence(results)
+        print(f"[PIPELINE] Step 4: Complete - {len(evidence)} external results")
+        return evidence
+
+    def _external_evidence(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        evidence = []
+        for i, result in enumerate(results):
             evidence.append({
-                "evidence_id": "vlm_1", 
-                "text": f"Specs from image: {vlm_result['specs_detected']}", 
-                "source_type": "vlm_image",
-                "aspect_tags": ["specs"]
+                "evidence_id": f"{result.get('source', 'external')}_{i + 1}",
+                "text": f"{result.get('title', '')}\n{result.get('text', '')}".strip(),
+                "source_type": result.get("source", "external"),
+                "metadata": {"url": result.get("url")}
             })
-        print(f"[PIPELINE] Step 3: Complete")
-            
-        # 2.5 External Search (Reddit & YouTube) - SKIP FOR NOW TO SPEED UP
-        print("[PIPELINE] Step 4: Skipping external search (Reddit/YouTube) for speed...")
-        # Commenting out to avoid timeout
-        # query = (context.metadata or {}).get("title", "") or context.product_id
-        # if query:
-        #     reddit_results = self.external_search.search_reddit(query)
-        #     ...
-            
-        # 3. Summarizer
+        return evidence
+
+    def _collect_evidence(self, results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        evidence = list(results["retrieve"].get("evidence", []))
+        evidence.extend(results["vlm"])
+        evidence.extend(results.get("external_search", []))
+        return evidence
+
+    def _stage_summarize(self, context: ProductContext, evidence: List[Dict[str, Any]]) -> TrustSummary:
         print("[PIPELINE] Step 5: Summarizing...")
         trust_summary = self.summarizer.summarize(context.product_id, evidence)
         print(f"[PIPELINE] Step 5: Complete")
-        
-        # 4. Judge
+        return trust_summary
+
+    def _stage_judge(self, trust_summary: TrustSummary, evidence: List[Dict[str, Any]]) -> JudgeOutput:
         print("[PIPELINE] Step 6: Judging claims...")
         judge_output = self.judge.judge(trust_summary, evidence)
         print(f"[PIPELINE] Step 6: Complete - {len(judge_output.claims_judgement)} claims judged")
-        
-        # 5. TCS Engine
+        return judge_output
+
+    def _stage_summarize_judge(self, context: ProductContext, evidence: List[Dict[str, Any]]) -> SummaryJudgeOutput:
+        print("[PIPELINE] Step 5-6: Summarizing and judging claims in one call...")
+        output = self.summary_judge.analyze(context.product_id, evidence)
+        print(f"[PIPELINE] Step 5-6: Complete - {len(output.judge_output.claims_judgement)} claims judged")
+        return output
+
+    def _stage_tcs(self, trust_summary: TrustSummary, judge_output: JudgeOutput, evidence: List[Dict[str, Any]]) -> TCSComponents:
         print("[PIPELINE] Step 7: Calculating TCS...")
         aspect_ontology = [a.name for a in trust_summary.aspects] if trust_summary.aspects else ["general"]
         
@@ -116,13 +178,228 @@ class SagePipeline:
             aspect_ontology=aspect_ontology
         )
         print(f"[PIPELINE] Step 7: Complete - TCS: {tcs_result.tcs_score}")
-        
-        print("[PIPELINE] Analysis complete!")
+        return tcs_result
+
+    def _partial_result(self, stage: str, result: Any) -> Optional[Dict[str, Any]]:
+        """
+        JSON-safe preview of a finished stage, streamed to clients before the run completes.
+        """
+        if stage == "plan":
+            return {"plan": result.model_dump()}
+        if stage == "retrieve":
+            return {"evidence_count": len(result.get("evidence", []))}
+        if stage == "evidence":
+            return {"evidence_count": len(result)}
+        if stage == "summarize":
+            return {"trust_summary": result.model_dump()}
+        if stage == "judge":
+            return {"claims_judged": len(result.claims_judgement)}
+        if stage == "tcs":
+            return {"tcs_score": result.tcs_score, "tcs_band": result.band, "tcs_components": result.model_dump()}
+        return None
+
+    def _stage_listener(self, on_event: Optional[EventCallback]) -> Optional[EventCallback]:
+        """
+        Adapts raw scheduler events (which carry stage result objects) into progress events.
+        """
+        if on_event is None:
+            return None
+
+        def listener(event: Dict[str, Any]):
+            event = dict(event)
+            result = event.pop("result", None)
+            if event["event"] == "stage_complete":
+                partial = self._partial_result(event["stage"], result)
+                if partial is not None:
+                    event["partial"] = partial
+            on_event(event)
+
+        return listener
+
+    def _build_scheduler(self, context: ProductContext, on_event: Optional[EventCallback] = None, cancel_event: Optional[threading.Event] = None) -> StageScheduler:
+        """
+        Stage graph:
+            index ──┐
+            plan ───┴─> retrieve ──┐
+            vlm ───────────────────┼─> summarize -> judge -> tcs
+            external_search ───────┘   (optional)
+
+        In fused analysis mode, summarize -> judge becomes
+            summarize_judge ─┬─> summarize ─┬─> tcs
+                             └─> judge ─────┘
+        """
+        scheduler = StageScheduler(
+            max_workers=self.max_parallel_stages,
+            on_event=self._stage_listener(on_event),
+            cancel_event=cancel_event
+        )
+        scheduler.add_stage("index", lambda r: self._stage_index(context))
+        scheduler.add_stage("plan", lambda r: self._stage_plan(context))
+        scheduler.add_stage("vlm", lambda r: self._stage_vlm(context))
+        scheduler.add_stage("retrieve", lambda r: self._stage_retrieve(context, r["plan"]), deps=["index", "plan"])
+
+        summarize_deps = ["retrieve", "vlm"]
+        if self.enable_external_search:
+            scheduler.add_stage("external_search", lambda r: self._stage_external_search(context))
+            summarize_deps.append("external_search")
+
+        scheduler.add_stage("evidence", self._collect_evidence, deps=summarize_deps)
+        self._add_analysis_stages(
+            scheduler,
+            summarize=lambda evidence: self._stage_summarize(context, evidence),
+            judge=self._stage_judge,
+            summarize_judge=lambda evidence: self._stage_summarize_judge(context, evidence)
+        )
+        scheduler.add_stage("tcs", lambda r: self._stage_tcs(r["summarize"], r["judge"], r["evidence"]), deps=["summarize", "judge"])
+        return scheduler
+
+    async def _astage_plan(self, context: ProductContext) -> PlannerOutput:
+        print("[PIPELINE] Step 1: Planning...")
+        plan = await self.planner.aplan(context)
+        print(f"[PIPELINE] Step 1: Complete - Plan: {plan.mode}")
+        return plan
+
+    async def _astage_retrieve(self, context: ProductContext, plan: PlannerOutput) -> Dict[str, Any]:
+        print("[PIPELINE] Step 2: Retrieving evidence...")
+        retrieval_result = await self.retriever.aretrieve(context, plan)
+        print(f"[PIPELINE] Step 2: Complete - Found {len(retrieval_result.get('evidence', []))} evidence units")
+        return retrieval_result
+
+    async def _astage_vlm(self, context: ProductContext) -> List[Dict[str, Any]]:
+        print("[PIPELINE] Step 3: Processing images...")
+        vlm_result = await self.vlm.aprocess_images(context)
+        print(f"[PIPELINE] Step 3: Complete")
+        return self._vlm_evidence(vlm_result)
+
+    async def _astage_summarize(self, context: ProductContext, evidence: List[Dict[str, Any]]) -> TrustSummary:
+        print("[PIPELINE] Step 5: Summarizing...")
+        trust_summary = await self.summarizer.asummarize(context.product_id, evidence)
+        print(f"[PIPELINE] Step 5: Complete")
+        return trust_summary
+
+    async def _astage_judge(self, trust_summary: TrustSummary, evidence: List[Dict[str, Any]]) -> JudgeOutput:
+        print("[PIPELINE] Step 6: Judging claims...")
+        judge_output = await self.judge.ajudge(trust_summary, evidence)
+        print(f"[PIPELINE] Step 6: Complete - {len(judge_output.claims_judgement)} claims judged")
+        return judge_output
+
+    async def _astage_summarize_judge(self, context: ProductContext, evidence: List[Dict[str, Any]]) -> SummaryJudgeOutput:
+        print("[PIPELINE] Step 5-6: Summarizing and judging claims in one call...")
+        output = await self.summary_judge.aanalyze(context.product_id, evidence)
+        print(f"[PIPELINE] Step 5-6: Complete - {len(output.judge_output.claims_judgement)} claims judged")
+        return output
+
+    def _add_analysis_stages(self, scheduler: StageScheduler, summarize: Callable, judge: Callable, summarize_judge: Callable):
+        """
+        summarize -> judge, or in fused mode one summarize_judge stage that both
+        summarize and judge unpack, so previews, TCS and the result are unchanged.
+        """
+        if self.analysis_mode == "fused":
+            scheduler.add_stage("summarize_judge", lambda r: summarize_judge(r["evidence"]), deps=["evidence"])
+            scheduler.add_stage("summarize", lambda r: r["summarize_judge"].trust_summary, deps=["summarize_judge"])
+            scheduler.add_stage("judge", lambda r: r["summarize_judge"].judge_output, deps=["summarize_judge"])
+        else:
+            scheduler.add_stage("summarize", lambda r: summarize(r["evidence"]), deps=["evidence"])
+            scheduler.add_stage("judge", lambda r: judge(r["summarize"], r["evidence"]), deps=["summarize"])
+
+    def _build_async_scheduler(self, context: ProductContext, on_event: Optional[EventCallback] = None) -> StageScheduler:
+        """
+        Same graph as _build_scheduler, with LLM stages on the async SDKs.
+        Indexing and external search are blocking (Chroma, requests) and run in worker threads.
+        """
+        scheduler = StageScheduler(on_event=self._stage_listener(on_event))
+        scheduler.add_stage("index", lambda r: asyncio.to_thread(self._stage_index, context))
+        scheduler.add_stage("plan", lambda r: self._astage_plan(context))
+        scheduler.add_stage("vlm", lambda r: self._astage_vlm(context))
+        scheduler.add_stage("retrieve", lambda r: self._astage_retrieve(context, r["plan"]), deps=["index", "plan"])
+
+        summarize_deps = ["retrieve", "vlm"]
+        if self.enable_external_search:
+            scheduler.add_stage("external_search", lambda r: asyncio.to_thread(self._stage_external_search, context))
+            summarize_deps.append("external_search")
+
+        scheduler.add_stage("evidence", self._collect_evidence, deps=summarize_deps)
+        self._add_analysis_stages(
+            scheduler,
+            summarize=lambda evidence: self._astage_summarize(context, evidence),
+            judge=self._astage_judge,
+            summarize_judge=lambda evidence: self._astage_summarize_judge(context, evidence)
+        )
+        scheduler.add_stage("tcs", lambda r: self._stage_tcs(r["summarize"], r["judge"], r["evidence"]), deps=["summarize", "judge"])
+        return scheduler
+
+    def _format_result(self, context: ProductContext, results: Dict[str, Any], timings: Dict[str, Any]) -> Dict[str, Any]:
+        tcs_result = results["tcs"]
         return {
             "product_id": context.product_id,
             "tcs_score": tcs_result.tcs_score,
             "tcs_band": tcs_result.band,
             "tcs_components": tcs_result.model_dump(),
-            "trust_summary": trust_summary.model_dump(),
-            "diagnostics": retrieval_result.get("diagnostics", {})
+            "trust_summary": results["summarize"].model_dump(),
+            "diagnostics": results["retrieve"].get("diagnostics", {}),
+            "analysis_mode": self.analysis_mode,
+            "stage_timings": timings
         }
+
+    def _log_start(self, context: ProductContext):
+        print(f"[PIPELINE] ========================================")
+        print(f"[PIPELINE] Starting NEW analysis")
+        print(f"[PIPELINE] Product ID: {context.product_id}")
+        print(f"[PIPELINE] URL: {context.url}")
+        print(f"[PIPELINE] ========================================")
+
+    def _log_timings(self, timings: Dict[str, Dict[str, float]]):
+        print(f"[PIPELINE] Analysis complete in {timings['total']['duration']}s")
+        for name, timing in timings.items():
+            print(f"[PIPELINE]   {name:<16} start={timing['start']:.2f}s duration={timing['duration']:.2f}s")
+
+    def _cache_lookup(self, context: ProductContext, use_cache: bool) -> Optional[Dict[str, Any]]:
+        if not use_cache or not self.result_cache.enabled:
+            return None
+        cached = self.result_cache.get(context)
+        if cached is not None:
+            print(f"[PIPELINE] Cache hit for product {context.product_id} - skipping analysis")
+            cached["cache_status"] = "hit"
+        return cached
+
+    def _cache_store(self, context: ProductContext, result: Dict[str, Any], use_cache: bool) -> Dict[str, Any]:
+        if not use_cache or not self.result_cache.enabled:
+            result["cache_status"] = "bypass"
+            return result
+        self.result_cache.set(context, result)
+        result["cache_status"] = "miss"
+        return result
+
+    def run(self, context: ProductContext, use_cache: bool = True, on_event: Optional[EventCallback] = None, cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Run the full analysis. on_event, if given, receives stage_start / stage_complete /
+        stage_error progress events (from worker threads). Setting cancel_event stops the
+        run before its next stage (raises StageCancelled).
+        """
+        cached = self._cache_lookup(context, use_cache)
+        if cached is not None:
+            return cached
+
+        self._log_start(context)
+        scheduler = self._build_scheduler(context, on_event, cancel_event)
+        results = scheduler.run()
+        self._log_timings(scheduler.timings)
+        result = self._format_result(context, results, scheduler.timings)
+        return self._cache_store(context, result, use_cache)
+
+    async def arun(self, context: ProductContext, use_cache: bool = True, on_event: Optional[EventCallback] = None) -> Dict[str, Any]:
+        """
+        Async variant of run(). Never blocks the event loop, so one worker can
+        serve many in-flight analyses. on_event is called on the event loop.
+        """
+        # HTML cleaning and SQLite access are blocking; keep them off the event loop
+        cached = await asyncio.to_thread(self._cache_lookup, context, use_cache)
+        if cached is not None:
+            return cached
+
+        self._log_start(context)
+        scheduler = self._build_async_scheduler(context, on_event)
+        results = await scheduler.arun()
+        self._log_timings(scheduler.timings)
+        result = self._format_result(context, results, scheduler.timings)
+        return await asyncio.to_thread(self._cache_store, context, result, use_cache)
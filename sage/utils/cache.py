@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+def stable_hash(payload: Any) -> str:
+    """
+    SHA-256 of a JSON-serializable payload, independent of dict key order.
+    """
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+class SQLiteCache:
+    """
+    Persistent key -> JSON value store backed by a single SQLite table.
+    - Entries older than ttl_seconds are treated as misses and removed.
+    - When more than max_entries are stored, or the stored values exceed max_bytes,
+      least recently used entries are evicted.
+    Safe to share across threads.
+    """
+    def __init__(self, path: str, table: str = "cache", ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table} (last_access)")
+        self.conn.commit()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and (now - created_at) > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if self._is_expired(created_at, now):
+                self.conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.conn.commit()
+                self.misses += 1
+                return None
+
+            self.conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+
+        return json.loads(value)
+
+    def set(self, key: str, value: Any):
+        encoded = json.dumps(value, default=str)
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now, now)
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self.conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self.conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute(f"DELETE FROM {self.table}")
+            self.conn.commit()
+
+    def _evict(self, now: float):
+        # Caller holds the lock
+        if self.ttl_seconds:
+            self.conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        if self.max_entries:
+            count = self.conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self.conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,)
+                )
+
+        if self.max_bytes:
+            total = self.conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+            if total > self.max_bytes:
+                evict = []
+                for key, size in self.conn.execute(f"SELECT key, size FROM {self.table} ORDER BY last_access ASC").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    evict.append((key,))
+                    total -= size
+                self.conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", evict)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self.conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "bytes": self.size_bytes(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
@@ -0,0 +1,126 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+class ChatTurn:
+    __slots__ = ("user", "assistant", "usage", "created_at")
+
+    def __init__(self, user: str, assistant: str, usage: Optional[Dict[str, int]] = None):
+        self.user = user
+        self.assistant = assistant
+        self.usage = usage or {}
+        self.created_at = time.time()
+
+class ChatSession:
+    """
+    One conversation about one product. The most recent turns are kept verbatim;
+    older turns are folded into `summary` by ChatAgent, so the history sent with
+    each message stays bounded however long the conversation gets.
+    """
+    def __init__(self, product_id: str, session_id: str):
+        self.product_id = product_id
+        self.session_id = session_id
+        self.turns: List[ChatTurn] = []
+        self.summary = ""
+        self.summarized_turns = 0
+        self.total_turns = 0
+        self.last_used = time.time()
+        self.folding = None  # asyncio.Task while older turns are being summarized
+
+    def add_turn(self, turn: ChatTurn):
+        self.turns.append(turn)
+        self.total_turns += 1
+
+    def fold(self, count: int, summary: str):
+        """
+        Replace the oldest `count` turns with a new running summary.
+        Turns added meanwhile are at the end, so they are kept.
+        """
+        del self.turns[:count]
+        self.summary = summary
+        self.summarized_turns += count
+
+    def history_text(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of earlier conversation: {self.summary}")
+        for turn in self.turns:
+            parts.append(f"User: {turn.user}\nSage: {turn.assistant}")
+        return "\n\n".join(parts)
+
+    def last_question(self) -> Optional[str]:
+        return self.turns[-1].user if self.turns else None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "product_id": self.product_id,
+            "turns": self.total_turns,
+            "verbatim_turns": len(self.turns),
+            "summarized_turns": self.summarized_turns,
+            "usage": [turn.usage for turn in self.turns]
+        }
+
+class ChatSessionStore:
+    """
+    In-process chat sessions keyed by (product_id, session_id).
+    Sessions idle for longer than ttl_seconds expire; beyond max_sessions the least
+    recently used are dropped. Safe to share across threads.
+    """
+    def __init__(self, ttl_seconds: Optional[float] = 1800, max_sessions: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[Tuple[str, str], ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, product_id: str, session_id: Optional[str] = None) -> ChatSession:
+        """
+        The live session for (product_id, session_id), or a new one if it is
+        missing or expired. A new session ID is generated when none is given.
+        """
+        session_id = session_id or uuid.uuid4().hex
+        key = (product_id, session_id)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            session = self._live(key, now)
+            if session is None:
+                session = ChatSession(product_id, session_id)
+                self._sessions[key] = session
+            session.last_used = now
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session
+
+    def get(self, product_id: str, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            return self._live((product_id, session_id), time.time())
+
+    def delete(self, product_id: str, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop((product_id, session_id), None) is not None
+
+    def _live(self, key: Tuple[str, str], now: float) -> Optional[ChatSession]:
+        # Caller holds the lock
+        session = self._sessions.get(key)
+        if session is not None and self.ttl_seconds and now - session.last_used > self.ttl_seconds:
+            del self._sessions[key]
+            return None
+        return session
+
+    def _expire(self, now: float):
+        # Caller holds the lock; least recently used sessions are at the front
+        if not self.ttl_seconds:
+            return
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.ttl_seconds:
+                break
+            del self._sessions[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
@@ -1,5 +1,55 @@
 from typing import List, Dict, Any, Union
 import re
+import zlib
+
+def clean_html_text(html: str) -> str:
+    """
+    Extract visible text from HTML: drops script/style/header/footer/nav
+    and collapses whitespace to one phrase per line.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Remove script and style elements
+    for script in soup(["script", "style", "header", "footer", "nav"]):
+        script.extract()
+        
+    # Get text
+    text = soup.get_text(separator='\n')
+    
+    # Break into lines and remove leading/trailing space on each
+    lines = (line.strip() for line in text.splitlines())
+    # Break multi-headlines into a line each
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    # Drop blank lines
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+# Content-defined chunk boundaries for page text: a chunk ends after a line whose
+# checksum hits the boundary mask once it holds min_size characters, or at max_size.
+# Boundaries depend only on nearby lines, so an edit in one section of a page
+# leaves the chunks of the other sections (and their content-hash IDs) unchanged.
+CHUNK_MIN_SIZE = 1000
+CHUNK_MAX_SIZE = 2000
+CHUNK_BOUNDARY_MASK = 0x3
+
+def content_defined_chunks(lines: List[str], min_size: int = CHUNK_MIN_SIZE, max_size: int = CHUNK_MAX_SIZE) -> List[str]:
+    chunks = []
+    current, size = [], 0
+    for line in lines:
+        # Lines longer than a chunk are split into max_size pieces
+        pieces = [line[i:i + max_size] for i in range(0, len(line), max_size)]
+        for piece in pieces:
+            if current and size + len(piece) > max_size:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+            if size >= min_size and zlib.crc32(piece.encode("utf-8")) & CHUNK_BOUNDARY_MASK == 0:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
 
 class Chunker:
     def chunk(self, data: Any, source_type: str) -> List[str]:
@@ -21,33 +71,8 @@ class Chunker:
         Extract text from HTML and chunk it into manageable segments.
         """
         try:
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style", "header", "footer", "nav"]):
-                script.extract()
-                
-            # Get text
-            text = soup.get_text(separator='\n')
-            
-            # Break into lines and remove leading/trailing space on each
-            lines = (line.strip() for line in text.splitlines())
-            # Break multi-headlines into a line each
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            # Drop blank lines
-            text_clean = '\n'.join(chunk for chunk in chunks if chunk)
-            
-            # Now split into chunks of approx 1000 characters (approx 250 tokens)
-            # This is a simple character-based chunker
-            chunk_size = 2000
-            overlap = 200
-            
-            final_chunks = []
-            for i in range(0, len(text_clean), chunk_size - overlap):
-                final_chunks.append(text_clean[i:i + chunk_size])
-                
-            return final_chunks
+            text_clean = clean_html_text(html)
+            return content_defined_chunks(text_clean.split("\n"))
             
         except ImportError:
             # Fallback if bs4 not available (though it should be)
@@ -0,0 +1,16 @@
+import os
+import json
+from typing import Dict, Any
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "../../config/models_config.json")
+
+def load_models_config() -> Dict[str, Any]:
+    """
+    Load config/models_config.json. Sections other than the model maps
+    (vector_db, pipeline, caches, ...) are read by the components that own them.
+    """
+    with open(CONFIG_PATH, "r") as f:
+        return json.load(f)
+
+def get_section(name: str) -> Dict[str, Any]:
+    return load_models_config().get(name, {}) or {}
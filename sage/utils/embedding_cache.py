@@ -0,0 +1,224 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from typing import Dict, Any, List, Optional
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (embedding model name, SHA-256 of the text).
+
+    Layout under `directory`:
+    - index.sqlite3: (model, text_sha) -> row slot, plus last-used time for LRU eviction
+    - one memory-mapped array per model (<model>.<dim>.<dtype>.bin) holding the vectors
+
+    Each model keeps at most max_entries vectors; when full, the least recently used
+    slots are reused. Safe to share across threads.
+    """
+    def __init__(self, directory: str = ".sage_cache/embeddings", max_entries: int = 200000, dtype: str = "float16"):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._arrays: Dict[str, np.memmap] = {}
+        self.conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "model TEXT NOT NULL, text_sha TEXT NOT NULL, slot INTEGER NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (model, text_sha))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (model, last_used)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS models ("
+            "model TEXT PRIMARY KEY, dim INTEGER NOT NULL, capacity INTEGER NOT NULL, used INTEGER NOT NULL)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _array_path(self, model: str, dim: int) -> str:
+        safe_model = re.sub(r"[^a-zA-Z0-9._-]", "_", model)
+        return os.path.join(self.directory, f"{safe_model}.{dim}.{self.dtype.name}.bin")
+
+    def _array(self, model: str, dim: int, capacity: int) -> np.memmap:
+        # Caller holds the lock
+        array = self._arrays.get(model)
+        if array is not None and array.shape[0] >= capacity:
+            return array
+
+        path = self._array_path(model, dim)
+        needed_bytes = capacity * dim * self.dtype.itemsize
+        if array is not None:
+            array.flush()
+        if not os.path.exists(path) or os.path.getsize(path) < needed_bytes:
+            with open(path, "ab") as f:
+                f.truncate(needed_bytes)
+
+        array = np.memmap(path, dtype=self.dtype, mode="r+", shape=(capacity, dim))
+        self._arrays[model] = array
+        return array
+
+    def _model_info(self, model: str):
+        # Caller holds the lock
+        return self.conn.execute("SELECT dim, capacity, used FROM models WHERE model = ?", (model,)).fetchone()
+
+    def _lookup_slots(self, model: str, keys: List[str]) -> Dict[str, int]:
+        # Caller holds the lock. Batched to stay under SQLite's bound-parameter limit.
+        slots = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT text_sha, slot FROM entries WHERE model = ? AND text_sha IN ({placeholders})",
+                [model] + batch
+            ).fetchall()
+            slots.update(rows)
+        return slots
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Returns a vector (or None on miss) for each text, in order.
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        keys = [self.text_key(text) for text in texts]
+
+        with self._lock:
+            info = self._model_info(model)
+            if info is None:
+                self.misses += len(texts)
+                return results
+            dim, capacity, _ = info
+
+            slots = self._lookup_slots(model, list(set(keys)))
+            if slots:
+                array = self._array(model, dim, capacity)
+                for i, key in enumerate(keys):
+                    slot = slots.get(key)
+                    if slot is not None:
+                        results[i] = array[slot].astype(np.float32).tolist()
+
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE model = ? AND text_sha = ?",
+                    [(now, model, key) for key in slots]
+                )
+                self.conn.commit()
+
+            found = sum(1 for r in results if r is not None)
+            self.hits += found
+            self.misses += len(texts) - found
+
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        if not texts:
+            return
+
+        # Deduplicate within the batch; last write wins
+        batch = {self.text_key(text): vector for text, vector in zip(texts, vectors)}
+        matrix = np.asarray(list(batch.values()), dtype=np.float32)
+        dim = matrix.shape[1]
+
+        with self._lock:
+            info = self._model_info(model)
+            if info is None:
+                capacity, used = min(1024, self.max_entries), 0
+                self.conn.execute(
+                    "INSERT INTO models (model, dim, capacity, used) VALUES (?, ?, ?, ?)",
+                    (model, dim, capacity, used)
+                )
+            else:
+                stored_dim, capacity, used = info
+                if stored_dim != dim:
+                    print(f"[EmbeddingCache] Dimension mismatch for {model} ({dim} vs {stored_dim}), not caching")
+                    return
+
+            keys = list(batch.keys())
+            existing = self._lookup_slots(model, keys)
+
+            new_keys = [key for key in keys if key not in existing]
+            slots = dict(existing)
+
+            # 1. Fresh slots while below max_entries (growing the file geometrically)
+            fresh = min(len(new_keys), self.max_entries - used)
+            if fresh > 0:
+                if used + fresh > capacity:
+                    capacity = min(self.max_entries, max(capacity * 2, used + fresh))
+                for offset, key in enumerate(new_keys[:fresh]):
+                    slots[key] = used + offset
+                used += fresh
+
+            # 2. Reuse least recently used slots once full (never a slot this batch writes to)
+            overflow = new_keys[fresh:]
+            if overflow:
+                candidates = self.conn.execute(
+                    "SELECT text_sha, slot FROM entries WHERE model = ? ORDER BY last_used ASC LIMIT ?",
+                    (model, len(overflow) + len(existing))
+                ).fetchall()
+                victims = [(key, slot) for key, slot in candidates if key not in existing][:len(overflow)]
+                self.conn.executemany(
+                    "DELETE FROM entries WHERE model = ? AND text_sha = ?",
+                    [(model, victim_key) for victim_key, _ in victims]
+                )
+                for key, (_, slot) in zip(overflow, victims):
+                    slots[key] = slot
+
+            array = self._array(model, dim, capacity)
+            now = time.time()
+            rows = []
+            for i, key in enumerate(keys):
+                if key in slots:
+                    array[slots[key]] = matrix[i]
+                    rows.append((model, key, slots[key], now))
+            array.flush()
+
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO entries (model, text_sha, slot, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self.conn.execute(
+                "UPDATE models SET capacity = ?, used = ? WHERE model = ?",
+                (capacity, used, model)
+            )
+            self.conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+_shared_cache: Optional[EmbeddingCache] = None
+_shared_cache_lock = threading.Lock()
+
+def get_embedding_cache(config: Dict[str, Any]) -> Optional[EmbeddingCache]:
+    """
+    Process-wide cache instance, so every EmbeddingClient shares one index and one set of maps.
+    Returns None when embedding_cache.enabled is false.
+    """
+    global _shared_cache
+    if not config.get("enabled", True):
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache(
+                directory=config.get("path", ".sage_cache/embeddings"),
+                max_entries=config.get("max_entries", 200000),
+                dtype=config.get("dtype", "float16")
+            )
+        return _shared_cache
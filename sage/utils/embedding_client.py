@@ -1,67 +1,230 @@
 import os
 import json
-from typing import List, Union
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Union, Optional
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+from sage.utils.embedding_cache import get_embedding_cache
+from sage.utils.embedding_dispatcher import get_embedding_dispatcher
+from sage.utils.tokens import count_tokens, truncate_to_tokens
 
-# Try importing sentence_transformers, handle if missing
-try:
-    from sentence_transformers import SentenceTransformer
-    HAS_SENTENCE_TRANSFORMERS = True
-except ImportError:
-    HAS_SENTENCE_TRANSFORMERS = False
+from sage.utils.model_registry import get_model_registry, HAS_SENTENCE_TRANSFORMERS
+from sage.utils.hashing_embedder import HashingEmbedder
 
 load_dotenv()
 
 class EmbeddingClient:
     def __init__(self):
         self.models_config = self._load_models_config()
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY")) if os.getenv("OPENAI_API_KEY") else None
+        self.openai_api_key = os.getenv("OPENAI_API_KEY")
+        self.openai_client = OpenAI(api_key=self.openai_api_key) if self.openai_api_key else None
+        # Async clients are bound to the event loop that first uses their connection pool,
+        # so one is created per running loop (as in LLMClient)
+        self._async_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+        self._guard = threading.Lock()
         
-        # Initialize local models if available
-        self.local_models = {}
+        # Local models are loaded once per process and shared by every client
+        self.model_registry = get_model_registry(self.models_config.get("model_registry", {}))
+        # Offline, deterministic embeddings ("hashing-ngram-<dim>"), keyed by dimension
+        self.hashing_embedders = {}
+
+        # Shared on-disk cache; only misses reach OpenAI / the local model
+        self.cache = get_embedding_cache(self.models_config.get("embedding_cache", {}))
+
+        # Provider request limits (OpenAI: 2048 inputs, 300k tokens per request, 8191 tokens per input)
+        batching = self.models_config.get("embedding_batching", {})
+        self.max_tokens_per_batch = batching.get("max_tokens_per_batch", 100000)
+        self.max_inputs_per_batch = batching.get("max_inputs_per_batch", 2048)
+        self.max_input_tokens = batching.get("max_input_tokens", 8000)
+        self.max_concurrency = batching.get("max_concurrency", 4)
+
+        # Shared micro-batcher: concurrent callers' cache misses are embedded together,
+        # each through the embed function of the client that submitted it
+        self.dispatcher = get_embedding_dispatcher(self.models_config.get("embedding_dispatcher", {}))
         
     def _load_models_config(self):
         config_path = os.path.join(os.path.dirname(__file__), "../../config/models_config.json")
         with open(config_path, "r") as f:
             return json.load(f)
 
+    @property
+    def async_openai_client(self) -> Optional[AsyncOpenAI]:
+        """
+        AsyncOpenAI client for the running event loop.
+        """
+        if not self.openai_api_key:
+            return None
+        loop = asyncio.get_running_loop()
+        with self._guard:
+            client = self._async_openai_clients.get(loop)
+            if client is None:
+                client = self._async_openai_clients[loop] = AsyncOpenAI(api_key=self.openai_api_key)
+            return client
+
     def get_text_embedding(self, text: Union[str, List[str]], model_usage: str = "primary_retrieval") -> List[List[float]]:
         """
         Get embeddings for text.
         model_usage: 'primary_retrieval' (BGE) or 'redundancy_layer' (OpenAI)
         """
-        model_name = self.models_config.get("embedding_models", {}).get(model_usage, "bge-large-en")
+        model_name = self._model_name(model_usage)
         
         if isinstance(text, str):
             text = [text]
 
-        if "openai" in model_name.lower() or "text-embedding" in model_name.lower():
-            return self._get_openai_embedding(text, model_name)
+        embeddings, missing = self._lookup_cache(text, model_name)
+        if missing:
+            fresh = self._embed([text[i] for i in missing], model_name)
+            self._fill_misses(text, model_name, embeddings, missing, fresh)
+        return embeddings
+
+    async def aget_text_embedding(self, text: Union[str, List[str]], model_usage: str = "primary_retrieval") -> List[List[float]]:
+        """
+        Async variant of get_text_embedding. OpenAI misses go straight to the async SDK
+        (token-bounded batches, concurrent requests); local models go through the shared
+        dispatcher, or a worker thread, so encoding never blocks the event loop.
+        """
+        model_name = self._model_name(model_usage)
+        
+        if isinstance(text, str):
+            text = [text]
+
+        embeddings, missing = await asyncio.to_thread(self._lookup_cache, text, model_name)
+        if missing:
+            misses = [text[i] for i in missing]
+            if self._is_openai_model(model_name):
+                fresh = await self._aget_openai_embedding_batched(misses, model_name)
+            elif self.dispatcher is not None:
+                fresh = await asyncio.wrap_future(self.dispatcher.submit(model_name, misses, self._embed_direct))
+            else:
+                fresh = await asyncio.to_thread(self._embed_direct, model_name, misses)
+            await asyncio.to_thread(self._fill_misses, text, model_name, embeddings, missing, fresh)
+        return embeddings
+
+    def _model_name(self, model_usage: str) -> str:
+        # SAGE_EMBEDDING_MODEL overrides every text model, e.g. "hashing-ngram-768" for offline runs
+        override = os.getenv("SAGE_EMBEDDING_MODEL")
+        if override:
+            return override
+        return self.models_config.get("embedding_models", {}).get(model_usage, "bge-large-en")
+
+    def _is_hashing_model(self, model_name: str) -> bool:
+        return model_name.lower().startswith("hashing")
+
+    def _is_openai_model(self, model_name: str) -> bool:
+        return "openai" in model_name.lower() or "text-embedding" in model_name.lower()
+
+    def _token_batches(self, texts: List[str], model_name: str) -> List[List[str]]:
+        """
+        Split texts into request-sized batches bounded by input count and total tokens.
+        Over-long inputs are truncated (for embedding only) to the per-input limit.
+        """
+        batches = []
+        current, current_tokens = [], 0
+        for text in texts:
+            tokens = count_tokens(text, model_name)
+            if tokens > self.max_input_tokens:
+                text = truncate_to_tokens(text, self.max_input_tokens, model_name)
+                tokens = self.max_input_tokens
+            if current and (len(current) >= self.max_inputs_per_batch or current_tokens + tokens > self.max_tokens_per_batch):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _get_openai_embedding_batched(self, texts: List[str], model_name: str) -> List[List[float]]:
+        batches = self._token_batches(texts, model_name)
+        if len(batches) == 1:
+            return self._get_openai_embedding(batches[0], model_name)
+
+        print(f"[Embedding] {len(texts)} texts in {len(batches)} batches (concurrency {self.max_concurrency})")
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            results = executor.map(lambda batch: self._get_openai_embedding(batch, model_name), batches)
+            return [vector for batch_vectors in results for vector in batch_vectors]
+
+    async def _aget_openai_embedding_batched(self, texts: List[str], model_name: str) -> List[List[float]]:
+        batches = self._token_batches(texts, model_name)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self._aget_openai_embedding(batch, model_name)
+
+        results = await asyncio.gather(*(run(batch) for batch in batches))
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+    def _embed(self, texts: List[str], model_name: str) -> List[List[float]]:
+        if self.dispatcher is not None:
+            return self.dispatcher.embed(model_name, texts, self._embed_direct)
+        return self._embed_direct(model_name, texts)
+
+    def _embed_direct(self, model_name: str, texts: List[str]) -> List[List[float]]:
+        if self._is_hashing_model(model_name):
+            return self._get_hashing_embedding(texts, model_name)
+        elif self._is_openai_model(model_name):
+            return self._get_openai_embedding_batched(texts, model_name)
         else:
             # Assume local model (e.g., BGE)
-            return self._get_local_embedding(text, model_name)
+            return self._get_local_embedding(texts, model_name)
+
+    def _is_cacheable(self, model_name: str) -> bool:
+        # Hashing vectors are cheaper to recompute than to look up; never persist the
+        # hashing fallback used for local models when sentence-transformers is missing
+        if self.cache is None or self._is_hashing_model(model_name):
+            return False
+        return self._is_openai_model(model_name) or HAS_SENTENCE_TRANSFORMERS
+
+    def _lookup_cache(self, texts: List[str], model_name: str):
+        """
+        Returns (embeddings with None for misses, indices of the misses).
+        """
+        if not self._is_cacheable(model_name):
+            return [None] * len(texts), list(range(len(texts)))
+        embeddings = self.cache.get_many(model_name, texts)
+        return embeddings, [i for i, e in enumerate(embeddings) if e is None]
+
+    def _fill_misses(self, texts: List[str], model_name: str, embeddings: List[Optional[List[float]]], missing: List[int], fresh: List[List[float]]):
+        for i, vector in zip(missing, fresh):
+            embeddings[i] = vector
+        if self._is_cacheable(model_name):
+            self.cache.put_many(model_name, [texts[i] for i in missing], fresh)
 
     def _get_openai_embedding(self, texts: List[str], model: str) -> List[List[float]]:
         if not self.openai_client:
             raise ValueError("OpenAI API key not found for embeddings.")
         
-        # OpenAI handles batching, but robust code might batch manually if list is huge
+        # Callers go through _get_openai_embedding_batched, which keeps requests within limits
         response = self.openai_client.embeddings.create(input=texts, model=model)
         return [data.embedding for data in response.data]
 
+    async def _aget_openai_embedding(self, texts: List[str], model: str) -> List[List[float]]:
+        client = self.async_openai_client
+        if not client:
+            raise ValueError("OpenAI API key not found for embeddings.")
+        
+        response = await client.embeddings.create(input=texts, model=model)
+        return [data.embedding for data in response.data]
+
     def _get_local_embedding(self, texts: List[str], model_name: str) -> List[List[float]]:
-        if not HAS_SENTENCE_TRANSFORMERS:
-            print(f"Warning: sentence-transformers not installed. Returning mock embeddings for {model_name}.")
-            return [[0.1] * 768 for _ in texts] # Mock 768-dim embedding
+        model = self.model_registry.get(model_name)
+        if model is None:
+            print(f"Warning: sentence-transformers not installed. Using hashing n-gram embeddings for {model_name}.")
+            return self._get_hashing_embedding(texts, "hashing-ngram-768")
             
-        if model_name not in self.local_models:
-            print(f"Loading local model: {model_name}...")
-            self.local_models[model_name] = SentenceTransformer(model_name)
-            
-        embeddings = self.local_models[model_name].encode(texts)
+        embeddings = model.encode(texts)
         return embeddings.tolist()
 
+    def _get_hashing_embedding(self, texts: List[str], model_name: str) -> List[List[float]]:
+        dim = HashingEmbedder.model_dim(model_name)
+        if dim not in self.hashing_embedders:
+            self.hashing_embedders[dim] = HashingEmbedder(dim=dim)
+        return self.hashing_embedders[dim].embed(texts)
+
     def get_image_embedding(self, image_paths: List[str]) -> List[List[float]]:
         """
         Get embeddings for images using OpenCLIP or similar.
@@ -0,0 +1,162 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+# embed_fn(model_name, texts) -> one vector per text
+EmbedFn = Callable[[str, List[str]], List[List[float]]]
+
+class _Request:
+    __slots__ = ("model_name", "texts", "embed_fn", "future", "enqueued_at")
+
+    def __init__(self, model_name: str, texts: List[str], embed_fn: EmbedFn):
+        self.model_name = model_name
+        self.texts = texts
+        self.embed_fn = embed_fn
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+class EmbeddingDispatcher:
+    """
+    Coalesces embedding requests from concurrent callers into shared batches.
+    - A collector thread takes the first waiting request, then keeps gathering until the
+      batch holds max_batch_size texts or max_wait_ms has passed since it started.
+    - Requests are never split; one larger than max_batch_size runs as its own batch.
+    - Each batch is grouped by (embed_fn, model) and embedded with one embed_fn call per
+      group on a small worker pool; results are fanned back out through each request's future.
+    A request is always embedded by the embed_fn it was submitted with (default: the
+    dispatcher's), so one shared dispatcher can serve clients with different backends.
+    """
+    def __init__(self, embed_fn: Optional[EmbedFn] = None, max_batch_size: int = 256, max_wait_ms: float = 10, workers: int = 2):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sage-embed")
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._texts = 0
+        self._requests = 0
+        self._max_batch = 0
+        self._waits: List[float] = []  # Recent queue waits (seconds), bounded
+
+        self._thread = threading.Thread(target=self._collect, name="sage-embed-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, model_name: str, texts: List[str], embed_fn: Optional[EmbedFn] = None) -> Future:
+        embed_fn = embed_fn or self.embed_fn
+        if embed_fn is None:
+            raise ValueError("EmbeddingDispatcher.submit needs an embed_fn (none set on the dispatcher)")
+        request = _Request(model_name, list(texts), embed_fn)
+        if not request.texts:
+            request.future.set_result([])
+            return request.future
+        self._queue.put(request)
+        return request.future
+
+    def embed(self, model_name: str, texts: List[str], embed_fn: Optional[EmbedFn] = None) -> List[List[float]]:
+        return self.submit(model_name, texts, embed_fn).result()
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _collect(self):
+        pending: Optional[_Request] = None
+        while True:
+            first = pending or self._queue.get()
+            pending = None
+            if first is None:
+                return
+
+            batch = [first]
+            size = len(first.texts)
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._queue.put(None)  # Stop after this batch
+                    break
+                if size + len(request.texts) > self.max_batch_size:
+                    pending = request  # Starts the next batch
+                    break
+                batch.append(request)
+                size += len(request.texts)
+
+            self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch: List[_Request]):
+        started = time.perf_counter()
+        groups: Dict[Tuple[EmbedFn, str], List[_Request]] = {}
+        for request in batch:
+            groups.setdefault((request.embed_fn, request.model_name), []).append(request)
+
+        for (embed_fn, model_name), requests in groups.items():
+            texts = [text for request in requests for text in request.texts]
+            try:
+                vectors = embed_fn(model_name, texts)
+            except Exception as e:
+                for request in requests:
+                    request.future.set_exception(e)
+                continue
+            offset = 0
+            for request in requests:
+                request.future.set_result(vectors[offset:offset + len(request.texts)])
+                offset += len(request.texts)
+
+        self._record(batch, started)
+
+    def _record(self, batch: List[_Request], started: float):
+        texts = sum(len(request.texts) for request in batch)
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._texts += texts
+            self._max_batch = max(self._max_batch, texts)
+            self._waits.extend(started - request.enqueued_at for request in batch)
+            del self._waits[:-1000]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            waits = sorted(self._waits)
+            return {
+                "batches": self._batches,
+                "requests": self._requests,
+                "texts": self._texts,
+                "avg_batch_size": round(self._texts / self._batches, 2) if self._batches else 0.0,
+                "max_batch_size": self._max_batch,
+                "avg_requests_per_batch": round(self._requests / self._batches, 2) if self._batches else 0.0,
+                "queue_wait_ms_avg": round(1000 * sum(waits) / len(waits), 3) if waits else 0.0,
+                "queue_wait_ms_p95": round(1000 * waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+                "queued": self._queue.qsize()
+            }
+
+_shared_dispatcher: Optional[EmbeddingDispatcher] = None
+_shared_dispatcher_lock = threading.Lock()
+
+def get_embedding_dispatcher(config: Dict[str, Any]) -> Optional[EmbeddingDispatcher]:
+    """
+    Process-wide dispatcher, so concurrent pipelines share batching windows.
+    It has no default embed_fn: callers submit with their own. Returns None
+    when embedding_dispatcher.enabled is false.
+    """
+    global _shared_dispatcher
+    if not config.get("enabled", True):
+        return None
+    with _shared_dispatcher_lock:
+        if _shared_dispatcher is None:
+            _shared_dispatcher = EmbeddingDispatcher(
+                max_batch_size=config.get("max_batch_size", 256),
+                max_wait_ms=config.get("max_wait_ms", 10),
+                workers=config.get("workers", 2)
+            )
+        return _shared_dispatcher
@@ -0,0 +1,76 @@
+import re
+import zlib
+import numpy as np
+from typing import List
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:[-./+][a-z0-9]+)*")
+
+class HashingEmbedder:
+    """
+    Deterministic, dependency-free text embeddings by feature hashing (NumPy only).
+
+    Features, hashed into `dim` signed buckets:
+    - character n-grams (ngram_min..ngram_max) of the lowercased, space-padded text,
+      which give fuzzy matching across inflections and typos
+    - whole words and adjacent word pairs, weighted higher, which carry most of the topic
+    Counts are log-scaled and the vector is L2-normalized, so cosine similarity behaves
+    like a TF-weighted n-gram overlap. Same text -> same vector, across processes.
+
+    Not a semantic model: synonyms don't match. It exists so chunking, indexing and
+    retrieval can be exercised and benchmarked offline with meaningful rankings.
+    """
+    def __init__(self, dim: int = 768, ngram_min: int = 3, ngram_max: int = 5, word_weight: float = 2.0):
+        self.dim = dim
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+        self.word_weight = word_weight
+
+    @staticmethod
+    def model_dim(model_name: str, default: int = 768) -> int:
+        """
+        Dimension from a model name like "hashing-ngram-384".
+        """
+        match = re.search(r"(\d+)$", model_name)
+        return int(match.group(1)) if match else default
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_matrix(texts).tolist()
+
+    def embed_matrix(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            matrix[i] = self._embed_one(text)
+        return matrix
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        normalized = " ".join(text.lower().split())
+        counts = np.zeros(self.dim, dtype=np.float32)
+
+        # Character n-grams: a rolling polynomial hash over the UTF-8 bytes, vectorized per n
+        data = np.frombuffer(f" {normalized} ".encode("utf-8"), dtype=np.uint8).astype(np.uint32)
+        for n in range(self.ngram_min, self.ngram_max + 1):
+            if len(data) < n:
+                break
+            windows = len(data) - n + 1
+            hashes = np.full(windows, n, dtype=np.uint32)
+            for j in range(n):
+                hashes = hashes * np.uint32(16777619) ^ data[j:j + windows]
+            self._accumulate(counts, hashes, 1.0)
+
+        # Words and word pairs
+        words = WORD_PATTERN.findall(normalized)
+        terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        if terms:
+            hashes = np.fromiter((zlib.crc32(term.encode("utf-8")) for term in terms), dtype=np.uint32, count=len(terms))
+            self._accumulate(counts, hashes, self.word_weight)
+
+        vector = np.sign(counts) * np.log1p(np.abs(counts))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _accumulate(self, counts: np.ndarray, hashes: np.ndarray, weight: float):
+        # Mix the bits (Knuth multiplicative hash); low bits pick the bucket, the top bit the sign
+        mixed = hashes * np.uint32(2654435761)
+        buckets = (mixed >> np.uint32(8)) % np.uint32(self.dim)
+        signs = np.where(mixed >> np.uint32(31), -weight, weight).astype(np.float32)
+        counts += np.bincount(buckets, weights=signs, minlength=self.dim).astype(np.float32)
@@ -0,0 +1,181 @@
+import re
+import math
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+from sage.utils.vector_backends import matches_where
+
+# Alphanumeric runs joined by "-", ".", "/" or "+" stay one token, so model numbers
+# (WH-1000XM5), ratings (IP68), versions (5.3) and sizes (1/2.3) survive intact.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-./+][a-z0-9]+)*")
+PART_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i in is it its of on or so that the "
+    "this to was were what when which who will with you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased tokens for BM25. Compound tokens are kept whole and also split into their
+    parts, so "WH-1000XM5" matches queries for "wh-1000xm5" and for "1000xm5".
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part not in STOPWORDS)
+    return tokens
+
+class BM25Index:
+    """
+    Incrementally maintained Okapi BM25 index over one namespace's chunks.
+    Documents are tokenized once at add(); delete() and re-add() keep the postings exact.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.documents: Dict[str, str] = {}
+        self.metadatas: Dict[str, Dict[str, Any]] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
+        for doc_id, text, metadata in zip(ids, texts, metadatas):
+            if doc_id in self.doc_lengths:
+                self.delete([doc_id])
+            counts = Counter(tokenize(text))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            length = sum(counts.values())
+            self.doc_lengths[doc_id] = length
+            self.documents[doc_id] = text
+            self.metadatas[doc_id] = metadata
+            self.total_length += length
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        for doc_id, metadata in zip(ids, metadatas):
+            if doc_id in self.metadatas:
+                self.metadatas[doc_id] = metadata
+
+    def delete(self, ids: List[str]):
+        for doc_id in ids:
+            length = self.doc_lengths.pop(doc_id, None)
+            if length is None:
+                continue
+            for term in set(tokenize(self.documents.pop(doc_id))):
+                docs = self.postings.get(term)
+                if docs is not None:
+                    docs.pop(doc_id, None)
+                    if not docs:
+                        del self.postings[term]
+            self.metadatas.pop(doc_id, None)
+            self.total_length -= length
+
+    def search(self, query: str, top_k: int, where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """
+        Returns [(doc_id, bm25_score)] best first. Documents matching no query term are omitted.
+        """
+        n = len(self.doc_lengths)
+        if n == 0:
+            return []
+        avg_length = self.total_length / n
+
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if where:
+            ranked = [item for item in ranked if matches_where(self.metadatas[item[0]], where)]
+        return ranked[:top_k]
+
+class LexicalIndex:
+    """
+    BM25 indexes keyed by vector-store namespace (product_id, or None for the shared store).
+    Namespaces the process has not seen yet (e.g. persisted in Chroma before a restart) are
+    rebuilt from the backend on first use.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self._indexes: Dict[Optional[str], BM25Index] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, namespace: Optional[str]) -> BM25Index:
+        # Caller holds the lock
+        index = self._indexes.get(namespace)
+        if index is None:
+            index = BM25Index()
+            stored = self.backend.get(namespace)
+            if stored["ids"]:
+                index.add(stored["ids"], stored["documents"], stored["metadatas"])
+            self._indexes[namespace] = index
+        return index
+
+    def add(self, namespace: Optional[str], ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
+        with self._lock:
+            self._index(namespace).add(ids, texts, metadatas)
+
+    def update_metadata(self, namespace: Optional[str], ids: List[str], metadatas: List[Dict[str, Any]]):
+        with self._lock:
+            if namespace in self._indexes:
+                self._indexes[namespace].update_metadata(ids, metadatas)
+
+    def delete(self, namespace: Optional[str], ids: List[str]):
+        with self._lock:
+            if namespace in self._indexes:
+                self._indexes[namespace].delete(ids)
+
+    def drop(self, namespace: Optional[str]):
+        with self._lock:
+            self._indexes.pop(namespace, None)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def search(self, namespace: Optional[str], query: str, top_k: int, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Hits in the backend's shape: {"id", "document", "metadata", "bm25"}.
+        """
+        with self._lock:
+            index = self._index(namespace)
+            return [{
+                "id": doc_id,
+                "document": index.documents[doc_id],
+                "metadata": index.metadatas[doc_id],
+                "bm25": round(score, 4)
+            } for doc_id, score in index.search(query, top_k, where)]
+
+def reciprocal_rank_fusion(ranked_lists: Dict[str, List[Dict[str, Any]]], top_k: int, k: int = 60) -> List[Dict[str, Any]]:
+    """
+    Merge ranked hit lists (name -> hits, each with an "id") by RRF: score = sum(1 / (k + rank)).
+    Each fused hit records its rank in every list that retrieved it under "ranks".
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for name, hits in ranked_lists.items():
+        for rank, hit in enumerate(hits, start=1):
+            entry = fused.get(hit["id"])
+            if entry is None:
+                entry = fused[hit["id"]] = {**hit, "rrf": 0.0, "ranks": {}}
+            else:
+                for key, value in hit.items():
+                    entry.setdefault(key, value)
+            entry["rrf"] += 1.0 / (k + rank)
+            entry["ranks"][name] = rank
+
+    ranked = sorted(fused.values(), key=lambda hit: (-hit["rrf"], min(hit["ranks"].values()), hit["id"]))
+    return ranked[:top_k]
@@ -0,0 +1,81 @@
+import hashlib
+from typing import Dict, Any, Optional
+from sage.utils.cache import SQLiteCache, stable_hash
+
+# Bump when the request sent for the same inputs changes, so stale responses are never served
+CACHE_VERSION = 1
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    """
+    Persistent cache of LLM responses for deterministic calls, keyed by
+    (provider, model, system prompt hash, user content hash, response_format, temperature).
+    Only calls at or below max_temperature are cached (0.0 by default, i.e. greedy decoding).
+    Backed by SQLiteCache: entries expire after ttl_seconds, and least recently used
+    entries are evicted beyond max_entries or max_bytes.
+    """
+    def __init__(self, path: str = ".sage_cache/llm_cache.sqlite3", ttl_seconds: Optional[float] = 7 * 86400, max_entries: Optional[int] = 10000, max_bytes: Optional[int] = 256 * 1024 * 1024, max_temperature: float = 0.0):
+        self.store = SQLiteCache(path=path, table="llm_responses", ttl_seconds=ttl_seconds, max_entries=max_entries, max_bytes=max_bytes)
+        self.max_temperature = max_temperature
+        self.bypassed = 0
+        self.uncacheable = 0
+
+    @staticmethod
+    def _format_name(response_format: Optional[Any]) -> Optional[str]:
+        if response_format is None:
+            return None
+        return getattr(response_format, "__name__", None) or str(response_format)
+
+    def key_for(self, provider: str, model: str, system_prompt: str, user_content: str, response_format: Optional[Any], temperature: float) -> str:
+        return stable_hash({
+            "version": CACHE_VERSION,
+            "provider": provider,
+            "model": model,
+            "system": _sha256(system_prompt),
+            "user": _sha256(user_content),
+            "response_format": self._format_name(response_format),
+            "temperature": temperature
+        })
+
+    def lookup_key(self, provider: str, model: str, system_prompt: str, user_content: str, response_format: Optional[Any], temperature: float, use_cache: bool = True) -> Optional[str]:
+        """
+        The cache key for a call, or None if the call must go to the provider
+        (bypassed by the caller, or sampled above max_temperature).
+        """
+        if not use_cache:
+            self.bypassed += 1
+            return None
+        if temperature > self.max_temperature:
+            self.uncacheable += 1
+            return None
+        return self.key_for(provider, model, system_prompt, user_content, response_format, temperature)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.store.get(key)
+        return entry["response"] if entry else None
+
+    def set(self, key: str, response: str):
+        if response:
+            self.store.set(key, {"response": response})
+
+    def clear(self):
+        self.store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.store.stats(), "bypassed": self.bypassed, "uncacheable": self.uncacheable}
+
+def create_llm_response_cache(config: Dict[str, Any]) -> Optional[LLMResponseCache]:
+    """
+    Build the cache from the llm_cache config section. Opt-in: None unless enabled.
+    """
+    if not config.get("enabled", False):
+        return None
+    return LLMResponseCache(
+        path=config.get("path", ".sage_cache/llm_cache.sqlite3"),
+        ttl_seconds=config.get("ttl_seconds", 7 * 86400),
+        max_entries=config.get("max_entries", 10000),
+        max_bytes=config.get("max_bytes", 256 * 1024 * 1024),
+        max_temperature=config.get("max_temperature", 0.0)
+    )
@@ -1,124 +1,613 @@
 import os
 import json
-from typing import Dict, Any, Optional
+import time
+import asyncio
+import threading
+import weakref
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, Optional, Iterator, AsyncIterator, List
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
-from anthropic import Anthropic
+import openai
+import anthropic
+from openai import OpenAI, AsyncOpenAI
+from anthropic import Anthropic, AsyncAnthropic
 import google.generativeai as genai
+from sage.utils.llm_cache import LLMResponseCache, create_llm_response_cache
+
+# httpx only negotiates HTTP/2 when the h2 package is installed
+try:
+    import h2  # noqa: F401
+    HAS_H2 = True
+except ImportError:
+    HAS_H2 = False
 
 load_dotenv()
 
+DEFAULT_CONCURRENCY = {"openai": 16, "anthropic": 8, "gemini": 8}
+
 class LLMClient:
-    def __init__(self):
+    """
+    LLM access for every agent. Use get_llm_client() for the process-wide instance:
+    - OpenAI and Anthropic SDK clients share pooled keep-alive httpx connections
+      (HTTP/2 when h2 is installed and llm_clients.http2 is on).
+    - Gemini model handles are built once per model name.
+    - With llm_cache enabled, temperature-0 responses are served from a persistent cache.
+    - stream_response/astream_response yield text as it is generated and report
+      time-to-first-token separately from total time.
+    - Calls per provider are capped by llm_clients.concurrency: across threads for
+      generate_response, per event loop for agenerate_response.
+    Async SDK clients and semaphores are bound to the event loop that first uses them,
+    so each loop gets its own set.
+    """
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
         self.models_config = self._load_models_config()
-        
+        config = config if config is not None else self.models_config.get("llm_clients", {})
+
+        self.http2 = bool(config.get("http2", True)) and HAS_H2
+        self.timeout = config.get("timeout_seconds", 60)
+        self.limits = httpx.Limits(
+            max_connections=config.get("max_connections", 100),
+            max_keepalive_connections=config.get("max_keepalive_connections", 20),
+            keepalive_expiry=config.get("keepalive_expiry_seconds", 30)
+        )
+        self.concurrency = {**DEFAULT_CONCURRENCY, **config.get("concurrency", {})}
+
         # Initialize OpenAI Client
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.openai_client = None
         if self.openai_api_key:
-            self.openai_client = OpenAI(api_key=self.openai_api_key)
-            
+            self.openai_client = OpenAI(
+                api_key=self.openai_api_key,
+                timeout=self.timeout,
+                http_client=openai.DefaultHttpxClient(http2=self.http2, limits=self.limits)
+            )
+
         # Initialize Anthropic Client
         self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
         self.anthropic_client = None
         if self.anthropic_api_key:
-            self.anthropic_client = Anthropic(api_key=self.anthropic_api_key)
+            self.anthropic_client = Anthropic(
+                api_key=self.anthropic_api_key,
+                timeout=self.timeout,
+                http_client=anthropic.DefaultHttpxClient(http2=self.http2, limits=self.limits)
+            )
 
         # Initialize Gemini Client
         self.gemini_api_key = os.getenv("GEMINI_API_KEY")
         if self.gemini_api_key:
             genai.configure(api_key=self.gemini_api_key)
+        self._gemini_models: Dict[str, Any] = {}
+
+        # Opt-in cache of deterministic (temperature 0) responses
+        self.response_cache: Optional[LLMResponseCache] = create_llm_response_cache(self.models_config.get("llm_cache", {}))
+
+        self._semaphores = {provider: threading.BoundedSemaphore(n) for provider, n in self.concurrency.items()}
+        self._loop_state: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        self._guard = threading.Lock()
+        self._in_flight = {provider: 0 for provider in self.concurrency}
+        self._waiting = {provider: 0 for provider in self.concurrency}
+        self._calls = {provider: 0 for provider in self.concurrency}
+        self._stream_timings: List[Dict[str, float]] = []  # Recent streams, bounded
 
     def _load_models_config(self) -> Dict[str, str]:
         config_path = os.path.join(os.path.dirname(__file__), "../../config/models_config.json")
         with open(config_path, "r") as f:
             return json.load(f)
 
+    def _async_state(self) -> Dict[str, Any]:
+        """
+        Async SDK clients and semaphores for the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._guard:
+            state = self._loop_state.get(loop)
+            if state is None:
+                state = {"semaphores": {provider: asyncio.Semaphore(n) for provider, n in self.concurrency.items()}}
+                if self.openai_api_key:
+                    state["openai"] = AsyncOpenAI(
+                        api_key=self.openai_api_key,
+                        timeout=self.timeout,
+                        http_client=openai.DefaultAsyncHttpxClient(http2=self.http2, limits=self.limits)
+                    )
+                if self.anthropic_api_key:
+                    state["anthropic"] = AsyncAnthropic(
+                        api_key=self.anthropic_api_key,
+                        timeout=self.timeout,
+                        http_client=anthropic.DefaultAsyncHttpxClient(http2=self.http2, limits=self.limits)
+                    )
+                self._loop_state[loop] = state
+            return state
+
+    @property
+    def async_openai_client(self) -> Optional[AsyncOpenAI]:
+        return self._async_state().get("openai")
+
+    @property
+    def async_anthropic_client(self) -> Optional[AsyncAnthropic]:
+        return self._async_state().get("anthropic")
+
+    def _track(self, provider: str, field: Dict[str, int], delta: int):
+        with self._guard:
+            field[provider] += delta
+
+    @contextmanager
+    def _slot(self, provider: str):
+        semaphore = self._semaphores[provider]
+        self._track(provider, self._waiting, 1)
+        semaphore.acquire()
+        self._track(provider, self._waiting, -1)
+        self._track(provider, self._in_flight, 1)
+        try:
+            yield
+        finally:
+            self._track(provider, self._in_flight, -1)
+            self._track(provider, self._calls, 1)
+            semaphore.release()
+
+    @asynccontextmanager
+    async def _aslot(self, provider: str):
+        semaphore = self._async_state()["semaphores"][provider]
+        self._track(provider, self._waiting, 1)
+        try:
+            await semaphore.acquire()
+        finally:
+            self._track(provider, self._waiting, -1)
+        self._track(provider, self._in_flight, 1)
+        try:
+            yield
+        finally:
+            self._track(provider, self._in_flight, -1)
+            self._track(provider, self._calls, 1)
+            semaphore.release()
+
+    def _gemini_model(self, model: str):
+        gemini_model = self._gemini_models.get(model)
+        if gemini_model is None:
+            with self._guard:
+                gemini_model = self._gemini_models.setdefault(model, genai.GenerativeModel(model))
+        return gemini_model
+
+    def stats(self) -> Dict[str, Any]:
+        with self._guard:
+            return {
+                "http2": self.http2,
+                "providers": {
+                    provider: {
+                        "limit": self.concurrency[provider],
+                        "in_flight": self._in_flight[provider],
+                        "waiting": self._waiting[provider],
+                        "calls": self._calls[provider]
+                    }
+                    for provider in self.concurrency
+                },
+                "response_cache": self.response_cache.stats() if self.response_cache else {"enabled": False},
+                "streams": self._stream_summary()
+            }
+
+    def _stream_summary(self) -> Dict[str, Any]:
+        # Caller holds the guard
+        timings = self._stream_timings
+        if not timings:
+            return {"recent": 0}
+        ttft = sorted(t["ttft_ms"] for t in timings)
+        total = sorted(t["total_ms"] for t in timings)
+        return {
+            "recent": len(timings),
+            "ttft_ms_avg": round(sum(ttft) / len(ttft), 1),
+            "ttft_ms_p95": ttft[int(0.95 * (len(ttft) - 1))],
+            "total_ms_avg": round(sum(total) / len(total), 1),
+            "total_ms_p95": total[int(0.95 * (len(total) - 1))]
+        }
+
     def get_model_name(self, agent_name: str) -> str:
         llm_models = self.models_config.get("llm_models", {})
         return llm_models.get(agent_name, "gpt-4o")
 
-    def generate_response(self, system_prompt: str, user_content: str, agent_name: str, response_format: Optional[Any] = None, temperature: float = 0.0) -> str:
-        model = self.get_model_name(agent_name)
-        
+    @staticmethod
+    def get_provider(model: str) -> str:
         if "gpt" in model.lower():
-            return self._call_openai(model, system_prompt, user_content, response_format, temperature)
+            return "openai"
         elif "claude" in model.lower():
-            return self._call_anthropic(model, system_prompt, user_content, temperature)
+            return "anthropic"
         elif "gemini" in model.lower():
-            return self._call_gemini(model, system_prompt, user_content, response_format, temperature)
+            return "gemini"
         else:
             # Fallback or other providers
             raise ValueError(f"Unsupported model provider for model: {model}")
 
-    def _call_openai(self, model: str, system_prompt: str, user_content: str, response_format: Optional[Any] = None, temperature: float = 0.0) -> str:
-        if not self.openai_client:
-            raise ValueError("OpenAI API key not found.")
-            
+    def _cache_key(self, provider: str, model: str, system_prompt: str, user_content: str, response_format: Optional[Any], temperature: float, use_cache: bool) -> Optional[str]:
+        if self.response_cache is None:
+            return None
+        return self.response_cache.lookup_key(provider, model, system_prompt, user_content, response_format, temperature, use_cache)
+
+    def generate_response(self, system_prompt: str, user_content: str, agent_name: str, response_format: Optional[Any] = None, temperature: float = 0.0, use_cache: bool = True) -> str:
+        """
+        use_cache=False bypasses the response cache for this call; the fresh response is not stored either.
+        """
+        model = self.get_model_name(agent_name)
+        provider = self.get_provider(model)
+
+        key = self._cache_key(provider, model, system_prompt, user_content, response_format, temperature, use_cache)
+        if key:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+
+        if provider == "openai":
+            response = self._call_openai(model, system_prompt, user_content, response_format, temperature)
+        elif provider == "anthropic":
+            response = self._call_anthropic(model, system_prompt, user_content, temperature)
+        else:
+            response = self._call_gemini(model, system_prompt, user_content, response_format, temperature)
+
+        if key:
+            self.response_cache.set(key, response)
+        return response
+
+    async def agenerate_response(self, system_prompt: str, user_content: str, agent_name: str, response_format: Optional[Any] = None, temperature: float = 0.0, use_cache: bool = True) -> str:
+        """
+        Async variant of generate_response. Uses the providers' async SDKs so the
+        event loop is never blocked on network I/O.
+        """
+        model = self.get_model_name(agent_name)
+        provider = self.get_provider(model)
+
+        key = self._cache_key(provider, model, system_prompt, user_content, response_format, temperature, use_cache)
+        if key:
+            # SQLite access is blocking; keep it off the event loop
+            cached = await asyncio.to_thread(self.response_cache.get, key)
+            if cached is not None:
+                return cached
+
+        if provider == "openai":
+            response = await self._acall_openai(model, system_prompt, user_content, response_format, temperature)
+        elif provider == "anthropic":
+            response = await self._acall_anthropic(model, system_prompt, user_content, temperature)
+        else:
+            response = await self._acall_gemini(model, system_prompt, user_content, response_format, temperature)
+
+        if key:
+            await asyncio.to_thread(self.response_cache.set, key, response)
+        return response
+
+    def stream_response(self, system_prompt: str, user_content: str, agent_name: str, temperature: float = 0.0, stats: Optional[Dict[str, Any]] = None, use_cache: bool = True) -> Iterator[str]:
+        """
+        Yields the response text in chunks as the provider generates it.
+        If stats is a dict, it is filled in when the stream ends with
+        provider, model, ttft_ms (time to first token), total_ms, chunks and cached.
+        A cached response is yielded as a single chunk.
+        """
+        model = self.get_model_name(agent_name)
+        provider = self.get_provider(model)
+        timer = _StreamTimer(provider, model)
+
+        key = self._cache_key(provider, model, system_prompt, user_content, None, temperature, use_cache)
+        cached = self.response_cache.get(key) if key else None
+        if cached is not None:
+            timer.tick()
+            yield cached
+            self._finish_stream(timer, stats, cached=True)
+            return
+
+        if provider == "openai":
+            chunks = self._stream_openai(model, system_prompt, user_content, temperature)
+        elif provider == "anthropic":
+            chunks = self._stream_anthropic(model, system_prompt, user_content, temperature)
+        else:
+            chunks = self._stream_gemini(model, system_prompt, user_content, temperature)
+
+        parts = []
+        for text in chunks:
+            if text:
+                timer.tick()
+                parts.append(text)
+                yield text
+
+        if key:
+            self.response_cache.set(key, "".join(parts))
+        self._finish_stream(timer, stats)
+
+    async def astream_response(self, system_prompt: str, user_content: str, agent_name: str, temperature: float = 0.0, stats: Optional[Dict[str, Any]] = None, use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Async variant of stream_response.
+        """
+        model = self.get_model_name(agent_name)
+        provider = self.get_provider(model)
+        timer = _StreamTimer(provider, model)
+
+        key = self._cache_key(provider, model, system_prompt, user_content, None, temperature, use_cache)
+        cached = await asyncio.to_thread(self.response_cache.get, key) if key else None
+        if cached is not None:
+            timer.tick()
+            yield cached
+            self._finish_stream(timer, stats, cached=True)
+            return
+
+        if provider == "openai":
+            chunks = self._astream_openai(model, system_prompt, user_content, temperature)
+        elif provider == "anthropic":
+            chunks = self._astream_anthropic(model, system_prompt, user_content, temperature)
+        else:
+            chunks = self._astream_gemini(model, system_prompt, user_content, temperature)
+
+        parts = []
+        async for text in chunks:
+            if text:
+                timer.tick()
+                parts.append(text)
+                yield text
+
+        if key:
+            await asyncio.to_thread(self.response_cache.set, key, "".join(parts))
+        self._finish_stream(timer, stats)
+
+    def _finish_stream(self, timer: "_StreamTimer", stats: Optional[Dict[str, Any]], cached: bool = False):
+        result = timer.result(cached)
+        if stats is not None:
+            stats.update(result)
+        if not cached:
+            with self._guard:
+                self._stream_timings.append({"ttft_ms": result["ttft_ms"], "total_ms": result["total_ms"]})
+                del self._stream_timings[:-1000]
+
+    def _openai_kwargs(self, model: str, system_prompt: str, user_content: str, response_format: Optional[Any] = None, temperature: float = 0.0) -> Dict[str, Any]:
         # If JSON mode is requested, ensure the prompt mentions JSON
         if response_format:
             user_content = f"{user_content}\n\nPlease respond with valid JSON."
-            
+
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_content}
         ]
-        
+
         kwargs = {
             "model": model,
             "messages": messages,
             "temperature": temperature,
         }
-        
+
         if response_format:
             kwargs["response_format"] = {"type": "json_object"}
-            
+        return kwargs
+
+    def _call_openai(self, model: str, system_prompt: str, user_content: str, response_format: Optional[Any] = None, temperature: float = 0.0) -> str:
+        if not self.openai_client:
+            raise ValueError("OpenAI API key not found.")
+
+        kwargs = self._openai_kwargs(model, system_prompt, user_content, response_format, temperature)
+        try:
+            with self._slot("openai"):
+                response = self.openai_client.chat.completions.create(**kwargs)
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"Error calling OpenAI: {e}")
+            raise e
+
+    async def _acall_openai(self, model: str, system_prompt: str, user_content: str, response_format: Optional[Any] = None, temperature: float = 0.0) -> str:
+        if not self.async_openai_client:
+            raise ValueError("OpenAI API key not found.")
+
+        kwargs = self._openai_kwargs(model, system_prompt, user_content, response_format, temperature)
         try:
-            response = self.openai_client.chat.completions.create(**kwargs)
+            async with self._aslot("openai"):
+                response = await self.async_openai_client.chat.completions.create(**kwargs)
             return response.choices[0].message.content
         except Exception as e:
             print(f"Error calling OpenAI: {e}")
             raise e
 
+    def _anthropic_kwargs(self, model: str, system_prompt: str, user_content: str, temperature: float = 0.0) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "system": system_prompt,
+            "messages": [
+                {"role": "user", "content": user_content}
+            ],
+            "max_tokens": 4096,
+            "temperature": temperature
+        }
+
     def _call_anthropic(self, model: str, system_prompt: str, user_content: str, temperature: float = 0.0) -> str:
         if not self.anthropic_client:
             raise ValueError("Anthropic API key not found.")
-            
+
         try:
-            response = self.anthropic_client.messages.create(
-                model=model,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": user_content}
-                ],
-                max_tokens=4096,
-                temperature=temperature
-            )
+            with self._slot("anthropic"):
+                response = self.anthropic_client.messages.create(
+                    **self._anthropic_kwargs(model, system_prompt, user_content, temperature)
+                )
+            return response.content[0].text
+        except Exception as e:
+            print(f"Error calling Anthropic: {e}")
+            raise e
+
+    async def _acall_anthropic(self, model: str, system_prompt: str, user_content: str, temperature: float = 0.0) -> str:
+        if not self.async_anthropic_client:
+            raise ValueError("Anthropic API key not found.")
+
+        try:
+            async with self._aslot("anthropic"):
+                response = await self.async_anthropic_client.messages.create(
+                    **self._anthropic_kwargs(model, system_prompt, user_content, temperature)
+                )
             return response.content[0].text
         except Exception as e:
             print(f"Error calling Anthropic: {e}")
             raise e
 
+    def _gemini_request(self, system_prompt: str, user_content: str, response_format: Optional[Any] = None, temperature: float = 0.0):
+        # Construct prompt with system instruction (if supported by model/lib version) or prepend it
+        full_prompt = f"System Instruction: {system_prompt}\n\nUser Request: {user_content}"
+
+        generation_config = {"temperature": temperature}
+        if response_format:
+            generation_config["response_mime_type"] = "application/json"
+        return full_prompt, generation_config
+
     def _call_gemini(self, model: str, system_prompt: str, user_content: str, response_format: Optional[Any] = None, temperature: float = 0.0) -> str:
         if not self.gemini_api_key:
             raise ValueError("Gemini API key not found.")
-            
+
         try:
             # Gemini implementation details might vary by version, using generic approach
-            gemini_model = genai.GenerativeModel(model)
-            
-            # Construct prompt with system instruction (if supported by model/lib version) or prepend it
-            full_prompt = f"System Instruction: {system_prompt}\n\nUser Request: {user_content}"
-            
-            generation_config = {"temperature": temperature}
-            if response_format:
-                generation_config["response_mime_type"] = "application/json"
-
-            response = gemini_model.generate_content(
-                full_prompt,
-                generation_config=generation_config
-            )
+            gemini_model = self._gemini_model(model)
+            full_prompt, generation_config = self._gemini_request(system_prompt, user_content, response_format, temperature)
+
+            with self._slot("gemini"):
+                response = gemini_model.generate_content(
+                    full_prompt,
+                    generation_config=generation_config
+                )
             return response.text
         except Exception as e:
             print(f"Error calling Gemini: {e}")
             raise e
+
+    async def _acall_gemini(self, model: str, system_prompt: str, user_content: str, response_format: Optional[Any] = None, temperature: float = 0.0) -> str:
+        if not self.gemini_api_key:
+            raise ValueError("Gemini API key not found.")
+
+        try:
+            gemini_model = self._gemini_model(model)
+            full_prompt, generation_config = self._gemini_request(system_prompt, user_content, response_format, temperature)
+
+            async with self._aslot("gemini"):
+                response = await gemini_model.generate_content_async(
+                    full_prompt,
+                    generation_config=generation_config
+                )
+            return response.text
+        except Exception as e:
+            print(f"Error calling Gemini: {e}")
+            raise e
+
+    def _stream_openai(self, model: str, system_prompt: str, user_content: str, temperature: float = 0.0) -> Iterator[str]:
+        if not self.openai_client:
+            raise ValueError("OpenAI API key not found.")
+
+        kwargs = self._openai_kwargs(model, system_prompt, user_content, None, temperature)
+        try:
+            with self._slot("openai"):
+                for chunk in self.openai_client.chat.completions.create(**kwargs, stream=True):
+                    if chunk.choices:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            print(f"Error streaming from OpenAI: {e}")
+            raise e
+
+    async def _astream_openai(self, model: str, system_prompt: str, user_content: str, temperature: float = 0.0) -> AsyncIterator[str]:
+        if not self.async_openai_client:
+            raise ValueError("OpenAI API key not found.")
+
+        kwargs = self._openai_kwargs(model, system_prompt, user_content, None, temperature)
+        try:
+            async with self._aslot("openai"):
+                stream = await self.async_openai_client.chat.completions.create(**kwargs, stream=True)
+                async for chunk in stream:
+                    if chunk.choices:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            print(f"Error streaming from OpenAI: {e}")
+            raise e
+
+    def _stream_anthropic(self, model: str, system_prompt: str, user_content: str, temperature: float = 0.0) -> Iterator[str]:
+        if not self.anthropic_client:
+            raise ValueError("Anthropic API key not found.")
+
+        try:
+            with self._slot("anthropic"):
+                with self.anthropic_client.messages.stream(
+                    **self._anthropic_kwargs(model, system_prompt, user_content, temperature)
+                ) as stream:
+                    yield from stream.text_stream
+        except Exception as e:
+            print(f"Error streaming from Anthropic: {e}")
+            raise e
+
+    async def _astream_anthropic(self, model: str, system_prompt: str, user_content: str, temperature: float = 0.0) -> AsyncIterator[str]:
+        if not self.async_anthropic_client:
+            raise ValueError("Anthropic API key not found.")
+
+        try:
+            async with self._aslot("anthropic"):
+                async with self.async_anthropic_client.messages.stream(
+                    **self._anthropic_kwargs(model, system_prompt, user_content, temperature)
+                ) as stream:
+                    async for text in stream.text_stream:
+                        yield text
+        except Exception as e:
+            print(f"Error streaming from Anthropic: {e}")
+            raise e
+
+    def _stream_gemini(self, model: str, system_prompt: str, user_content: str, temperature: float = 0.0) -> Iterator[str]:
+        if not self.gemini_api_key:
+            raise ValueError("Gemini API key not found.")
+
+        try:
+            gemini_model = self._gemini_model(model)
+            full_prompt, generation_config = self._gemini_request(system_prompt, user_content, None, temperature)
+
+            with self._slot("gemini"):
+                for chunk in gemini_model.generate_content(full_prompt, generation_config=generation_config, stream=True):
+                    yield chunk.text
+        except Exception as e:
+            print(f"Error streaming from Gemini: {e}")
+            raise e
+
+    async def _astream_gemini(self, model: str, system_prompt: str, user_content: str, temperature: float = 0.0) -> AsyncIterator[str]:
+        if not self.gemini_api_key:
+            raise ValueError("Gemini API key not found.")
+
+        try:
+            gemini_model = self._gemini_model(model)
+            full_prompt, generation_config = self._gemini_request(system_prompt, user_content, None, temperature)
+
+            async with self._aslot("gemini"):
+                response = await gemini_model.generate_content_async(full_prompt, generation_config=generation_config, stream=True)
+                async for chunk in response:
+                    yield chunk.text
+        except Exception as e:
+            print(f"Error streaming from Gemini: {e}")
+            raise e
+
+class _StreamTimer:
+    """
+    Time to first token and total time for one streamed response.
+    """
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+        self.start = time.perf_counter()
+        self.first: Optional[float] = None
+        self.chunks = 0
+
+    def tick(self):
+        if self.first is None:
+            self.first = time.perf_counter()
+        self.chunks += 1
+
+    def result(self, cached: bool = False) -> Dict[str, Any]:
+        end = time.perf_counter()
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "ttft_ms": round(1000 * ((self.first or end) - self.start), 1),
+            "total_ms": round(1000 * (end - self.start), 1),
+            "chunks": self.chunks,
+            "cached": cached
+        }
+
+_shared_client: Optional[LLMClient] = None
+_shared_client_lock = threading.Lock()
+
+def get_llm_client() -> LLMClient:
+    """
+    Process-wide LLMClient shared by every agent and endpoint, so connection pools,
+    model handles and concurrency limits are shared too.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = LLMClient()
+        return _shared_client
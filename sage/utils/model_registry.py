@@ -0,0 +1,164 @@
+import time
+import threading
+from typing import Dict, Any, List, Optional
+
+# Try importing sentence_transformers, handle if missing
+try:
+    from sentence_transformers import SentenceTransformer
+    HAS_SENTENCE_TRANSFORMERS = True
+except ImportError:
+    HAS_SENTENCE_TRANSFORMERS = False
+
+class ModelStatus:
+    PENDING = "pending"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+    UNAVAILABLE = "unavailable"  # sentence-transformers is not installed
+
+class ModelRegistry:
+    """
+    Process-wide registry of local embedding models.
+    - Each model is loaded once and shared by every EmbeddingClient.
+    - warm_up() loads the configured models in a background thread at startup;
+      a request for a model that is still loading waits for that load instead of
+      starting a second one.
+    - Optionally pins torch's intra-op thread count for predictable CPU throughput.
+    """
+    def __init__(self, torch_num_threads: Optional[int] = None):
+        self.models: Dict[str, Any] = {}
+        self.status: Dict[str, str] = {}
+        self.errors: Dict[str, str] = {}
+        self.load_seconds: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
+        self.expected: List[str] = []
+
+        if torch_num_threads:
+            self._set_num_threads(torch_num_threads)
+
+    @staticmethod
+    def _set_num_threads(n: int):
+        try:
+            import torch
+            torch.set_num_threads(n)
+            print(f"[Models] torch intra-op threads set to {n}")
+        except ImportError:
+            print("[Models] torch not installed, ignoring torch_num_threads")
+
+    def _lock_for(self, model_name: str) -> threading.Lock:
+        with self._guard:
+            if model_name not in self._locks:
+                self._locks[model_name] = threading.Lock()
+                self.status.setdefault(model_name, ModelStatus.PENDING)
+            return self._locks[model_name]
+
+    def get(self, model_name: str):
+        """
+        The loaded model, loading it on first use. None if sentence-transformers is missing.
+        Raises if the model fails to load.
+        """
+        model = self.models.get(model_name)
+        if model is not None:
+            return model
+        if not HAS_SENTENCE_TRANSFORMERS:
+            self.status[model_name] = ModelStatus.UNAVAILABLE
+            return None
+
+        with self._lock_for(model_name):
+            if model_name in self.models:
+                return self.models[model_name]
+            self.status[model_name] = ModelStatus.LOADING
+            print(f"Loading local model: {model_name}...")
+            start = time.perf_counter()
+            try:
+                model = SentenceTransformer(model_name)
+            except Exception as e:
+                self.status[model_name] = ModelStatus.FAILED
+                self.errors[model_name] = str(e)
+                raise
+            self.models[model_name] = model
+            self.load_seconds[model_name] = round(time.perf_counter() - start, 3)
+            self.status[model_name] = ModelStatus.READY
+            print(f"[Models] Loaded {model_name} in {self.load_seconds[model_name]}s")
+            return model
+
+    def warm_up(self, model_names: List[str], background: bool = True):
+        """
+        Load model_names (once). In background mode this returns immediately;
+        is_ready() reports when every model has finished loading.
+        """
+        self.expected = list(dict.fromkeys(self.expected + model_names))
+        for name in model_names:
+            self._lock_for(name)
+
+        def load_all():
+            for name in model_names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"[Models] Failed to load {name}: {e}")
+
+        if not background:
+            load_all()
+            return
+        self._warmup_thread = threading.Thread(target=load_all, name="sage-model-warmup", daemon=True)
+        self._warmup_thread.start()
+
+    def is_ready(self) -> bool:
+        """
+        True once every warmed-up model is loaded (or can never be, because
+        sentence-transformers is missing and the caller falls back).
+        """
+        return all(
+            self.status.get(name) in (ModelStatus.READY, ModelStatus.UNAVAILABLE)
+            for name in self.expected
+        )
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "ready": self.is_ready(),
+            "models": {
+                name: {
+                    "status": self.status.get(name, ModelStatus.PENDING),
+                    "load_seconds": self.load_seconds.get(name),
+                    "error": self.errors.get(name)
+                }
+                for name in dict.fromkeys(self.expected + list(self.status))
+            }
+        }
+
+_shared_registry: Optional[ModelRegistry] = None
+_shared_registry_lock = threading.Lock()
+
+def get_model_registry(config: Optional[Dict[str, Any]] = None) -> ModelRegistry:
+    """
+    Process-wide registry. config (the model_registry section) is only used by the
+    call that creates it.
+    """
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            config = config or {}
+            _shared_registry = ModelRegistry(torch_num_threads=config.get("torch_num_threads"))
+        return _shared_registry
+
+def local_embedding_models(models_config: Dict[str, Any]) -> List[str]:
+    """
+    Configured text embedding models that run locally through sentence-transformers
+    (everything that is not an OpenAI or hashing model), or model_registry.preload if set explicitly.
+    """
+    registry_config = models_config.get("model_registry", {})
+    if registry_config.get("preload") is not None:
+        return list(registry_config["preload"])
+    names = []
+    for usage, name in models_config.get("embedding_models", {}).items():
+        if usage == "image_embeddings":
+            continue  # Image embeddings are not served by sentence-transformers
+        if "openai" in name.lower() or "text-embedding" in name.lower():
+            continue
+        if name.lower().startswith("hashing"):
+            continue  # Computed in-process by HashingEmbedder, nothing to load
+        names.append(name)
+    return list(dict.fromkeys(names))
@@ -0,0 +1,191 @@
+import re
+import json
+from typing import Dict, Any, List, Optional, Sequence
+from sage.utils.tokens import count_tokens, truncate_to_tokens
+from sage.utils.config import get_section
+
+# Metadata worth spending prompt tokens on; IDs, URLs, chunk indexes and scores are not
+DEFAULT_METADATA_FIELDS = ("section", "priority", "published_at", "date", "rating")
+
+# A bracketed citation such as [e1] or [e1, e3]; only these are mapped inside free text
+CITATION_PATTERN = re.compile(r"\[([^\[\]]+)\]")
+
+def _map_citations(text: str, mapping: Dict[str, str]) -> str:
+    def replace(match):
+        ids = [part.strip() for part in match.group(1).split(",")]
+        if not any(i in mapping for i in ids):
+            return match.group(0)
+        return "[" + ", ".join(mapping.get(i, i) for i in ids) + "]"
+    return CITATION_PATTERN.sub(replace, text)
+
+class EvidencePack:
+    """
+    An evidence bundle rendered for an LLM prompt.
+
+    compact (default): one line per unit, `[e1] source_type (section=..., priority=...): text`,
+    with whitespace collapsed and only metadata_fields kept. Evidence IDs become short
+    aliases e1, e2, ... in bundle order, so the same bundle gets the same aliases in every
+    agent; expand()/resolve_ids() map the model's output back to the real IDs.
+    Each unit is cut to max_item_tokens, then units are dropped until the whole block fits
+    budget_tokens: the lowest-ranked unit of whichever source type has the most units left
+    goes first, so VLM and external evidence appended after the ranked retrieval hits are
+    not always the first to go.
+
+    compact=False renders the bundle as indented JSON with real IDs (the previous format).
+    """
+    def __init__(self, evidence: List[Dict[str, Any]], model: Optional[str] = None, budget_tokens: Optional[int] = None,
+                 max_item_tokens: Optional[int] = None, metadata_fields: Sequence[str] = DEFAULT_METADATA_FIELDS, compact: bool = True):
+        self.evidence = evidence
+        self.model = model
+        self.budget_tokens = budget_tokens
+        self.compact = compact
+        self.aliases: Dict[str, str] = {}   # alias -> evidence_id
+        self.alias_of: Dict[str, str] = {}  # evidence_id -> alias
+        self.truncated = 0
+        self.dropped: List[str] = []
+        self.json_tokens: Optional[int] = None
+
+        if not compact:
+            self.text = json.dumps(evidence, indent=2, default=str)
+            self.tokens = count_tokens(self.text, model)
+            return
+
+        lines = []
+        for i, unit in enumerate(evidence, 1):
+            alias = f"e{i}"
+            evidence_id = str(unit.get("evidence_id", alias))
+            self.aliases[alias] = evidence_id
+            self.alias_of.setdefault(evidence_id, alias)
+            lines.append(self._line(alias, unit, max_item_tokens, metadata_fields))
+        self.text = self._fit(lines, self._drop_order(evidence))
+        self.tokens = count_tokens(self.text, model)
+
+    def _line(self, alias: str, unit: Dict[str, Any], max_item_tokens: Optional[int], metadata_fields: Sequence[str]) -> str:
+        metadata = unit.get("metadata") or {}
+        source_type = unit.get("source_type") or metadata.get("source_type", "unknown")
+        attributes = [f"{field}={metadata[field]}" for field in metadata_fields if metadata.get(field) not in (None, "")]
+        aspects = unit.get("aspect_tags") or unit.get("aspects")
+        if aspects:
+            attributes.append(f"aspects={'/'.join(aspects)}")
+
+        text = " ".join(str(unit.get("text", "")).split())
+        if max_item_tokens:
+            short = truncate_to_tokens(text, max_item_tokens, self.model)
+            if short != text:
+                self.truncated += 1
+                text = short + " ..."
+        label = f"{source_type} ({', '.join(attributes)})" if attributes else source_type
+        return f"[{alias}] {label}: {text}"
+
+    @staticmethod
+    def _drop_order(evidence: List[Dict[str, Any]]) -> List[int]:
+        """
+        Unit indexes, first to drop first: the bundle interleaved round-robin by
+        source type (keeping rank order within a type), read from the end.
+        """
+        groups: Dict[str, List[int]] = {}
+        for i, unit in enumerate(evidence):
+            source_type = unit.get("source_type") or (unit.get("metadata") or {}).get("source_type", "unknown")
+            groups.setdefault(source_type, []).append(i)
+        interleaved = []
+        for rank in range(max((len(g) for g in groups.values()), default=0)):
+            interleaved.extend(g[rank] for g in groups.values() if rank < len(g))
+        return interleaved[::-1]
+
+    def _fit(self, lines: List[str], drop_order: List[int]) -> str:
+        if not self.budget_tokens:
+            return "\n".join(lines)
+        # +1 per line for the newline
+        sizes = [count_tokens(line, self.model) + 1 for line in lines]
+        total = sum(sizes)
+        kept = set(range(len(lines)))
+        for i in drop_order:
+            if len(kept) <= 1 or total <= self.budget_tokens:
+                break
+            kept.discard(i)
+            total -= sizes[i]
+            self.dropped.append(f"e{i + 1}")
+        text = "\n".join(line for i, line in enumerate(lines) if i in kept)
+        if kept and total > self.budget_tokens:
+            # A single unit larger than the budget
+            self.truncated += 1
+            text = truncate_to_tokens(text, self.budget_tokens, self.model)
+        return text
+
+    def resolve_ids(self, ids: List[str]) -> List[str]:
+        """
+        Real evidence IDs for a list of aliases (unknown values pass through).
+        """
+        return [self.aliases.get(i, i) for i in ids]
+
+    def expand(self, value: Any, key: Optional[str] = None) -> Any:
+        """
+        Map aliases back to real evidence IDs in a parsed LLM response: whole values of
+        evidence_id / evidence_ids, and bracketed citations like [e1] in other strings.
+        Other text is left alone, so a product named "Moto e7" stays "Moto e7".
+        """
+        if not self.aliases:
+            return value
+        if isinstance(value, str):
+            if key in ("evidence_id", "evidence_ids"):
+                return self.aliases.get(value.strip(), value)
+            return _map_citations(value, self.aliases)
+        if isinstance(value, list):
+            return [self.expand(v, key) for v in value]
+        if isinstance(value, dict):
+            return {k: self.expand(v, k) for k, v in value.items()}
+        return value
+
+    def alias_text(self, text: str) -> str:
+        """
+        Replace real evidence IDs with their aliases in bracketed citations,
+        e.g. in claims quoted back to a model.
+        """
+        return _map_citations(text, self.alias_of)
+
+    def describe(self, include_json_tokens: bool = False) -> Dict[str, Any]:
+        """
+        Packing stats. include_json_tokens also counts what the same bundle costs as
+        indented JSON; that re-serializes the whole bundle, so it is for debugging only.
+        """
+        stats = {
+            "evidence": len(self.evidence),
+            "packed": len(self.evidence) - len(self.dropped),
+            "dropped": self.dropped,
+            "truncated": self.truncated,
+            "tokens": self.tokens,
+            "budget_tokens": self.budget_tokens
+        }
+        if include_json_tokens:
+            if self.json_tokens is None:
+                self.json_tokens = count_tokens(json.dumps(self.evidence, indent=2, default=str), self.model)
+            stats["json_tokens"] = self.json_tokens
+            stats["saved_pct"] = round(100 * (1 - self.tokens / self.json_tokens), 1) if self.json_tokens else 0.0
+        return stats
+
+class EvidencePacker:
+    """
+    Per-agent packing settings from the prompt_packing config section:
+    budgets[agent_name] caps the evidence block in tokens (no cap if absent);
+    debug adds the indented-JSON token count to the logged stats.
+    """
+    def __init__(self, agent_name: str, config: Optional[Dict[str, Any]] = None):
+        config = get_section("prompt_packing") if config is None else config
+        self.compact = config.get("enabled", True)
+        self.budget_tokens = config.get("budgets", {}).get(agent_name)
+        self.max_item_tokens = config.get("max_item_tokens", 400)
+        self.metadata_fields = config.get("metadata_fields", DEFAULT_METADATA_FIELDS)
+        self.debug = config.get("debug", False)
+
+    def pack(self, evidence: List[Dict[str, Any]], model: Optional[str] = None) -> EvidencePack:
+        return EvidencePack(
+            evidence,
+            model=model,
+            budget_tokens=self.budget_tokens,
+            max_item_tokens=self.max_item_tokens,
+            metadata_fields=self.metadata_fields,
+            compact=self.compact
+        )
+
+    def describe(self, pack: EvidencePack) -> Dict[str, Any]:
+        return pack.describe(include_json_tokens=self.debug)
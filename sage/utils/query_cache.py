@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+def normalize_query(text: str) -> str:
+    """
+    Cache key for a query: case and whitespace do not change what is retrieved.
+    """
+    return " ".join(text.split()).lower()
+
+class WarmEmbeddingTable:
+    """
+    Read-only table of precomputed query embeddings (the common aspect vocabulary),
+    loaded from a compact .npz written by precompute_aspect_embeddings.py:
+    - model: embedding model name the vectors came from
+    - texts: normalized query strings
+    - vectors: float16 matrix, one row per text
+    """
+    def __init__(self, model: str, texts: List[str], vectors: np.ndarray):
+        self.model = model
+        self.vectors = vectors
+        self.rows = {text: i for i, text in enumerate(texts)}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["WarmEmbeddingTable"]:
+        if not path or not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            return cls(str(data["model"]), [str(t) for t in data["texts"]], data["vectors"])
+
+    @staticmethod
+    def save(path: str, model: str, texts: List[str], vectors: List[List[float]]):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(
+            path,
+            model=np.array(model),
+            texts=np.array([normalize_query(t) for t in texts]),
+            vectors=np.asarray(vectors, dtype=np.float16)
+        )
+
+    def get(self, model: str, key: str) -> Optional[List[float]]:
+        if model != self.model:
+            return None
+        row = self.rows.get(key)
+        return self.vectors[row].astype(np.float32).tolist() if row is not None else None
+
+class QueryEmbeddingCache:
+    """
+    In-process LRU of query embeddings with size and TTL limits, in front of the
+    embedding API (and the on-disk EmbeddingCache). Queries found in the warm table
+    never expire and never take an LRU slot. Safe to share across threads.
+    """
+    def __init__(self, max_entries: int = 4096, ttl_seconds: Optional[float] = 3600, warm_table: Optional[WarmEmbeddingTable] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.warm_table = warm_table
+        self.hits = 0
+        self.warm_hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Returns a vector (or None on miss) for each query text, in order.
+        """
+        now = time.time()
+        results: List[Optional[List[float]]] = []
+        with self._lock:
+            for text in texts:
+                key = normalize_query(text)
+                vector = self.warm_table.get(model, key) if self.warm_table else None
+                if vector is not None:
+                    self.warm_hits += 1
+                    results.append(vector)
+                    continue
+
+                entry = self._entries.get((model, key))
+                if entry is not None and self.ttl_seconds and now - entry[0] > self.ttl_seconds:
+                    del self._entries[(model, key)]
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self._entries.move_to_end((model, key))
+                    self.hits += 1
+                    results.append(entry[1])
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        now = time.time()
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = (model, normalize_query(text))
+                self._entries[key] = (now, vector)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        total = self.hits + self.warm_hits + self.misses
+        return {
+            "entries": entries,
+            "warm_entries": len(self.warm_table) if self.warm_table else 0,
+            "hits": self.hits,
+            "warm_hits": self.warm_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.warm_hits) / total, 4) if total else 0.0
+        }
+
+_shared_cache: Optional[QueryEmbeddingCache] = None
+_shared_cache_lock = threading.Lock()
+
+def get_query_embedding_cache(config: Dict[str, Any]) -> Optional[QueryEmbeddingCache]:
+    """
+    Process-wide query cache, with the warm table loaded once at first use.
+    Returns None when query_cache.enabled is false.
+    """
+    global _shared_cache
+    if not config.get("enabled", True):
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            warm_table = None
+            path = config.get("warm_table_path", "config/aspect_embeddings.npz")
+            if not os.path.isabs(path):
+                # Optional table built offline by precompute_aspect_embeddings.py under the
+                # repo root; resolve against it rather than the CWD. Missing means no warm hits.
+                path = os.path.join(REPO_ROOT, path)
+            try:
+                warm_table = WarmEmbeddingTable.load(path)
+            except Exception as e:
+                print(f"[QueryCache] Could not load warm embedding table: {e}")
+            if warm_table is not None:
+                print(f"[QueryCache] Loaded {len(warm_table)} precomputed query embeddings ({warm_table.model})")
+            _shared_cache = QueryEmbeddingCache(
+                max_entries=config.get("max_entries", 4096),
+                ttl_seconds=config.get("ttl_seconds", 3600),
+                warm_table=warm_table
+            )
+        return _shared_cache
@@ -0,0 +1,76 @@
+from typing import Dict, Any, Optional
+from sage.models.schemas import ProductContext
+from sage.utils.cache import SQLiteCache, stable_hash
+from sage.utils.chunking import clean_html_text
+from sage.utils.config import load_models_config
+
+# Bump when the pipeline output changes shape, so stale results are never served
+CACHE_VERSION = 1
+
+class AnalysisCache:
+    """
+    Persistent cache of full pipeline results, keyed by a normalized content hash
+    of the ProductContext. Reopening an unchanged product page is a cache hit even
+    though the extension re-posts the whole DOM.
+    """
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None, enabled: Optional[bool] = None, analysis_mode: Optional[str] = None):
+        models_config = load_models_config()
+        config = models_config.get("result_cache", {})
+
+        self.enabled = config.get("enabled", True) if enabled is None else enabled
+        # Results depend on which models produced them, and on whether summary and judgement were fused
+        self.models_fingerprint = stable_hash(models_config.get("llm_models", {}))
+        self.analysis_mode = analysis_mode or models_config.get("pipeline", {}).get("analysis_mode", "two_stage")
+        self.store = None
+        if self.enabled:
+            self.store = SQLiteCache(
+                path=path or config.get("path", ".sage_cache/analysis_cache.sqlite3"),
+                table="analysis_results",
+                ttl_seconds=ttl_seconds if ttl_seconds is not None else config.get("ttl_seconds", 86400),
+                max_entries=max_entries if max_entries is not None else config.get("max_entries", 1000)
+            )
+
+    def normalize(self, context: ProductContext) -> Dict[str, Any]:
+        """
+        The parts of a ProductContext that determine the analysis.
+        Markup, whitespace, dict order and duplicate images do not change the key.
+        """
+        text = clean_html_text(context.pdp_html) if context.pdp_html else ""
+        structured = {
+            name: " ".join(content.split())
+            for name, content in (context.structured_content or {}).items()
+            if content
+        }
+        images = sorted({url.strip() for url in context.images if url and url.strip()})
+        question = " ".join((context.user_question or "").split()).lower()
+        return {
+            "version": CACHE_VERSION,
+            "models": self.models_fingerprint,
+            "analysis_mode": self.analysis_mode,
+            "text": text,
+            "structured_content": structured,
+            "images": images,
+            "user_question": question
+        }
+
+    def key_for(self, context: ProductContext) -> str:
+        return stable_hash(self.normalize(context))
+
+    def get(self, context: ProductContext, key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        if self.store is None:
+            return None
+        result = self.store.get(key or self.key_for(context))
+        if result is not None:
+            # Same content can be reached under a different URL / product_id
+            result["product_id"] = context.product_id
+        return result
+
+    def set(self, context: ProductContext, result: Dict[str, Any], key: Optional[str] = None):
+        if self.store is None:
+            return
+        self.store.set(key or self.key_for(context), result)
+
+    def stats(self) -> Dict[str, Any]:
+        if self.store is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.store.stats()}
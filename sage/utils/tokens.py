@@ -0,0 +1,37 @@
+from typing import Optional
+
+# tiktoken gives exact counts for OpenAI models; fall back to ~4 chars/token otherwise
+try:
+    import tiktoken
+    HAS_TIKTOKEN = True
+except ImportError:
+    HAS_TIKTOKEN = False
+
+_encodings = {}
+
+def _encoding_for(model: Optional[str]):
+    key = model or "default"
+    if key not in _encodings:
+        try:
+            _encodings[key] = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encodings[key] = tiktoken.get_encoding("cl100k_base")
+    return _encodings[key]
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Token count for text under the given model's tokenizer (approximate if tiktoken is missing).
+    """
+    if not text:
+        return 0
+    if HAS_TIKTOKEN:
+        return len(_encoding_for(model).encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    if HAS_TIKTOKEN:
+        encoding = _encoding_for(model)
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    return text[:max_tokens * 4]
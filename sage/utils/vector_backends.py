@@ -0,0 +1,552 @@
+import os
+import time
+import uuid
+import atexit
+import shutil
+import tempfile
+import hashlib
+import threading
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+
+# A namespace is a product_id, or None for the shared (un-namespaced) store
+Namespace = Optional[str]
+
+class VectorBackend:
+    """
+    Storage interface behind VectorDBClient. Implementations hold vectors, documents and
+    metadata per namespace, plus a small metadata dict per namespace (indexing time,
+    content fingerprint, ...).
+    """
+    def add(self, namespace: Namespace, ids: List[str], embeddings: List[List[float]], documents: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Upsert: entries with an existing ID are replaced.
+        """
+        raise NotImplementedError
+
+    def query(self, namespace: Namespace, query_embeddings: List[List[float]], top_k: int, where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        One result list per query embedding; each hit is {"id", "document", "metadata", "distance"}.
+        """
+        raise NotImplementedError
+
+    def get(self, namespace: Namespace, where: Optional[Dict[str, Any]] = None, ids: Optional[List[str]] = None) -> Dict[str, List[Any]]:
+        """
+        Returns {"ids", "documents", "metadatas"} for all matching entries,
+        restricted to `ids` if given (unknown IDs are skipped).
+        """
+        raise NotImplementedError
+
+    def update_metadata(self, namespace: Namespace, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Replace the metadata of existing entries, keeping their vectors and documents.
+        """
+        raise NotImplementedError
+
+    def delete(self, namespace: Namespace, ids: List[str]):
+        raise NotImplementedError
+
+    def count(self, namespace: Namespace) -> int:
+        raise NotImplementedError
+
+    def namespace_metadata(self, namespace: str) -> Optional[Dict[str, Any]]:
+        """
+        None if the namespace does not exist.
+        """
+        raise NotImplementedError
+
+    def set_namespace_metadata(self, namespace: str, metadata: Dict[str, Any]):
+        """
+        Creates the namespace if needed.
+        """
+        raise NotImplementedError
+
+    def list_namespaces(self) -> List[Tuple[str, Dict[str, Any]]]:
+        raise NotImplementedError
+
+    def drop_namespace(self, namespace: str) -> bool:
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+NAMESPACE_PREFIX = "sage_evidence_"
+
+class ChromaBackend(VectorBackend):
+    """
+    Persistent backend: one Chroma collection per product namespace.
+    Distances are Chroma's default squared L2.
+    """
+    def __init__(self, persist_path: str = "./sage_chroma_db"):
+        import chromadb
+        self.client = chromadb.PersistentClient(path=persist_path)
+        # Shared collection, used when no product namespace is given (legacy callers / tests)
+        self.collection = self.client.get_or_create_collection(name="sage_evidence")
+
+    def _collection_name(self, namespace: str) -> str:
+        # Chroma collection names are restricted to [a-zA-Z0-9._-], so hash the product ID
+        digest = hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:16]
+        return f"{NAMESPACE_PREFIX}{digest}"
+
+    def _collection(self, namespace: Namespace, create: bool = False):
+        if namespace is None:
+            return self.collection
+        name = self._collection_name(namespace)
+        if create:
+            now = time.time()
+            return self.client.get_or_create_collection(
+                name=name,
+                metadata={"product_id": namespace, "created_at": now, "indexed_at": now}
+            )
+        try:
+            return self.client.get_collection(name=name)
+        except Exception:
+            return None
+
+    def add(self, namespace, ids, embeddings, documents, metadatas):
+        # Upsert: chunk IDs are content hashes, so an existing ID is the same chunk
+        self._collection(namespace, create=True).upsert(
+            documents=documents,
+            embeddings=embeddings,
+            metadatas=metadatas,
+            ids=ids
+        )
+
+    def query(self, namespace, query_embeddings, top_k, where=None):
+        collection = self._collection(namespace)
+        if collection is None:
+            return [[] for _ in query_embeddings]
+
+        results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=top_k,
+            where=where # Chroma filters format
+        )
+
+        hits = []
+        for q in range(len(query_embeddings)):
+            query_hits = []
+            if results["ids"]:
+                for i in range(len(results["ids"][q])):
+                    query_hits.append({
+                        "id": results["ids"][q][i],
+                        "document": results["documents"][q][i],
+                        "metadata": results["metadatas"][q][i],
+                        "distance": results["distances"][q][i] if results.get("distances") else 0.0
+                    })
+            hits.append(query_hits)
+        return hits
+
+    def get(self, namespace, where=None, ids=None):
+        collection = self._collection(namespace)
+        if collection is None:
+            return {"ids": [], "documents": [], "metadatas": []}
+        results = collection.get(where=where, ids=ids)
+        return {"ids": results["ids"], "documents": results["documents"], "metadatas": results["metadatas"]}
+
+    def update_metadata(self, namespace, ids, metadatas):
+        collection = self._collection(namespace)
+        if collection is not None and ids:
+            collection.update(ids=ids, metadatas=metadatas)
+
+    def delete(self, namespace, ids):
+        collection = self._collection(namespace)
+        if collection is not None and ids:
+            collection.delete(ids=ids)
+
+    def count(self, namespace):
+        collection = self._collection(namespace)
+        return collection.count() if collection is not None else 0
+
+    def namespace_metadata(self, namespace):
+        collection = self._collection(namespace)
+        if collection is None:
+            return None
+        return dict(collection.metadata or {})
+
+    def set_namespace_metadata(self, namespace, metadata):
+        collection = self._collection(namespace, create=True)
+        merged = dict(collection.metadata or {})
+        merged.update(metadata)
+        collection.modify(metadata=merged)
+
+    def list_namespaces(self):
+        namespaces = []
+        for collection in self.client.list_collections():
+            if collection.name.startswith(NAMESPACE_PREFIX):
+                metadata = dict(collection.metadata or {})
+                namespaces.append((metadata.get("product_id", collection.name), metadata))
+        return namespaces
+
+    def drop_namespace(self, namespace):
+        try:
+            self.client.delete_collection(name=self._collection_name(namespace))
+            return True
+        except Exception:
+            return False  # Namespace did not exist
+
+    def clear(self):
+        for collection in self.client.list_collections():
+            if collection.name.startswith(NAMESPACE_PREFIX):
+                self.client.delete_collection(name=collection.name)
+        results = self.collection.get()
+        if results and results["ids"]:
+            self.collection.delete(ids=results["ids"])
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate a Chroma-style metadata filter: {"field": value}, {"field": {"$op": value}},
+    {"$and": [...]}, {"$or": [...]}. Supported ops: $eq $ne $gt $gte $lt $lte $in $nin.
+    """
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, sub) for sub in condition):
+                return False
+        else:
+            value = metadata.get(key)
+            if isinstance(condition, dict):
+                for op, expected in condition.items():
+                    if op == "$eq" and value != expected:
+                        return False
+                    if op == "$ne" and value == expected:
+                        return False
+                    if op == "$in" and value not in expected:
+                        return False
+                    if op == "$nin" and value in expected:
+                        return False
+                    if op in ("$gt", "$gte", "$lt", "$lte"):
+                        if value is None:
+                            return False
+                        if op == "$gt" and not value > expected:
+                            return False
+                        if op == "$gte" and not value >= expected:
+                            return False
+                        if op == "$lt" and not value < expected:
+                            return False
+                        if op == "$lte" and not value <= expected:
+                            return False
+            elif value != condition:
+                return False
+    return True
+
+QUANTIZATION_DTYPES = {"none": np.float32, "float16": np.float16, "int8": np.int8}
+
+class _MemoryNamespace:
+    """
+    Vectors for one namespace in a contiguous, L2-normalized matrix.
+    Rows [0, size) are live; capacity grows geometrically; deletes swap the last row in.
+
+    quantization:
+    - "none": float32 rows, exact scores
+    - "float16": half-precision rows
+    - "int8": rows scaled to [-127, 127] with one float32 scale per row
+    Quantized rows are scored first; when full_precision_dir is set, float32 copies live
+    in a memory-mapped file there and the best rescore_factor * top_k candidates are
+    rescored exactly from it (only those rows are paged in).
+    """
+    def __init__(self, metadata: Optional[Dict[str, Any]] = None, quantization: str = "none", rescore_factor: int = 4, full_precision_dir: Optional[str] = None):
+        if quantization not in QUANTIZATION_DTYPES:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.metadata: Dict[str, Any] = dict(metadata or {})
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.full_precision_dir = full_precision_dir if quantization != "none" else None
+        self.matrix: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None  # int8 only
+        self.full: Optional[np.memmap] = None     # float32 copies for rescoring
+        self.full_path: Optional[str] = None
+        self.size = 0
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.rows: Dict[str, int] = {}
+
+    def _reserve(self, extra: int, dim: int):
+        needed = self.size + extra
+        capacity = self.matrix.shape[0] if self.matrix is not None else 0
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 64)
+
+        grown = np.zeros((capacity, dim), dtype=QUANTIZATION_DTYPES[self.quantization])
+        if self.matrix is not None:
+            grown[:self.size] = self.matrix[:self.size]
+        self.matrix = grown
+
+        if self.quantization == "int8":
+            scales = np.zeros(capacity, dtype=np.float32)
+            if self.scales is not None:
+                scales[:self.size] = self.scales[:self.size]
+            self.scales = scales
+
+        if self.full_precision_dir:
+            if self.full_path is None:
+                self.full_path = os.path.join(self.full_precision_dir, f"{uuid.uuid4().hex}.f32")
+            if self.full is not None:
+                self.full.flush()
+            with open(self.full_path, "ab") as f:
+                f.truncate(capacity * dim * 4)
+            self.full = np.memmap(self.full_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+
+    def _write_row(self, row: int, vector: np.ndarray):
+        if self.quantization == "int8":
+            scale = float(np.abs(vector).max()) / 127.0 or 1.0
+            self.matrix[row] = np.round(vector / scale).astype(np.int8)
+            self.scales[row] = scale
+        else:
+            self.matrix[row] = vector
+        if self.full is not None:
+            self.full[row] = vector
+
+    def _move_row(self, src: int, dst: int):
+        self.matrix[dst] = self.matrix[src]
+        if self.scales is not None:
+            self.scales[dst] = self.scales[src]
+        if self.full is not None:
+            self.full[dst] = self.full[src]
+
+    def add(self, ids, embeddings, documents, metadatas):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+        self._reserve(len(ids), vectors.shape[1])
+
+        for i, chunk_id in enumerate(ids):
+            row = self.rows.get(chunk_id)
+            if row is None:
+                row = self.size
+                self.size += 1
+                self.rows[chunk_id] = row
+                self.ids.append(chunk_id)
+                self.documents.append(documents[i])
+                self.metadatas.append(dict(metadatas[i]))
+            else:
+                self.documents[row] = documents[i]
+                self.metadatas[row] = dict(metadatas[i])
+            self._write_row(row, vectors[i])
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            row = self.rows.pop(chunk_id, None)
+            if row is None:
+                continue
+            last = self.size - 1
+            if row != last:
+                # Move the last row into the hole to keep rows contiguous
+                self._move_row(last, row)
+                self.ids[row] = self.ids[last]
+                self.documents[row] = self.documents[last]
+                self.metadatas[row] = self.metadatas[last]
+                self.rows[self.ids[row]] = row
+            self.ids.pop()
+            self.documents.pop()
+            self.metadatas.pop()
+            self.size -= 1
+
+    def close(self):
+        """
+        Release the full-precision file. The namespace must not be used afterwards.
+        """
+        self.full = None
+        if self.full_path and os.path.exists(self.full_path):
+            os.remove(self.full_path)
+        self.full_path = None
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Bytes held in process memory vs. in the memory-mapped full-precision file.
+        """
+        resident = self.matrix.nbytes if self.matrix is not None else 0
+        if self.scales is not None:
+            resident += self.scales.nbytes
+        return {"resident_bytes": resident, "mapped_bytes": self.full.nbytes if self.full is not None else 0}
+
+    def mask(self, where) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        return np.fromiter((matches_where(m, where) for m in self.metadatas), dtype=bool, count=self.size)
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        # One matrix multiply for every query: (q, d) @ (d, n) -> (q, n) cosine similarities
+        matrix = self.matrix[:self.size]
+        if self.quantization == "int8":
+            return (queries @ matrix.T.astype(np.float32)) * self.scales[:self.size]
+        return queries @ matrix.T.astype(np.float32, copy=False)
+
+    def query(self, query_embeddings, top_k, where=None):
+        if self.size == 0:
+            return [[] for _ in query_embeddings]
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        scores = self._scores(queries)
+
+        mask = self.mask(where)
+        candidates = self.size
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+            candidates = int(mask.sum())
+        k = min(top_k, candidates)
+        if k <= 0:
+            return [[] for _ in query_embeddings]
+
+        # Quantized scores pick a wider pool, rescored exactly from the full-precision rows
+        rescore = self.full is not None and self.rescore_factor > 1
+        pool = min(candidates, k * self.rescore_factor) if rescore else k
+
+        hits = []
+        for q in range(scores.shape[0]):
+            row_scores = scores[q]
+            if pool < self.size:
+                top = np.argpartition(-row_scores, pool - 1)[:pool]
+            else:
+                top = np.arange(self.size)
+            if rescore:
+                top = np.sort(top)  # Sequential reads from the memory map
+                top_scores = self.full[top] @ queries[q]
+            else:
+                top_scores = row_scores[top]
+            order = np.argsort(-top_scores)[:k]
+            hits.append([{
+                "id": self.ids[top[i]],
+                "document": self.documents[top[i]],
+                "metadata": self.metadatas[top[i]],
+                # Squared L2 between unit vectors, the same scale Chroma reports
+                "distance": float(2.0 - 2.0 * top_scores[i])
+            } for i in order])
+        return hits
+
+class InMemoryBackend(VectorBackend):
+    """
+    Ephemeral backend for per-request corpora: NumPy matrix per namespace, exact
+    normalized-dot-product top-k via argpartition, Chroma-style metadata filters.
+    No HNSW maintenance. Distances are squared L2 between normalized vectors
+    (2 - 2 * cosine), matching Chroma's default for normalized embeddings.
+    Optional float16 / int8 storage with exact rescoring; see _MemoryNamespace.
+    """
+    def __init__(self, quantization: str = "none", rescore_factor: int = 4, full_precision_dir: Optional[str] = None):
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.full_precision_dir = None
+        if full_precision_dir and quantization != "none":
+            # Private directory per backend instance, removed when the process exits
+            os.makedirs(full_precision_dir, exist_ok=True)
+            self.full_precision_dir = tempfile.mkdtemp(prefix="vectors-", dir=full_precision_dir)
+            atexit.register(shutil.rmtree, self.full_precision_dir, True)
+        self._namespaces: Dict[Namespace, _MemoryNamespace] = {None: self._new_namespace()}
+        self._lock = threading.RLock()
+
+    def _new_namespace(self, metadata: Optional[Dict[str, Any]] = None) -> _MemoryNamespace:
+        return _MemoryNamespace(metadata, self.quantization, self.rescore_factor, self.full_precision_dir)
+
+    def _namespace(self, namespace: Namespace, create: bool = False) -> Optional[_MemoryNamespace]:
+        store = self._namespaces.get(namespace)
+        if store is None and create:
+            now = time.time()
+            store = self._new_namespace({"product_id": namespace, "created_at": now, "indexed_at": now})
+            self._namespaces[namespace] = store
+        return store
+
+    def add(self, namespace, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        with self._lock:
+            self._namespace(namespace, create=True).add(ids, embeddings, documents, metadatas)
+
+    def query(self, namespace, query_embeddings, top_k, where=None):
+        with self._lock:
+            store = self._namespace(namespace)
+            if store is None:
+                return [[] for _ in query_embeddings]
+            return store.query(query_embeddings, top_k, where)
+
+    def get(self, namespace, where=None, ids=None):
+        with self._lock:
+            store = self._namespace(namespace)
+            if store is None:
+                return {"ids": [], "documents": [], "metadatas": []}
+            rows = range(store.size) if ids is None else [store.rows[i] for i in ids if i in store.rows]
+            mask = store.mask(where)
+            if mask is not None:
+                rows = [row for row in rows if mask[row]]
+            return {
+                "ids": [store.ids[row] for row in rows],
+                "documents": [store.documents[row] for row in rows],
+                "metadatas": [store.metadatas[row] for row in rows]
+            }
+
+    def update_metadata(self, namespace, ids, metadatas):
+        with self._lock:
+            store = self._namespace(namespace)
+            if store is None:
+                return
+            for chunk_id, metadata in zip(ids, metadatas):
+                row = store.rows.get(chunk_id)
+                if row is not None:
+                    store.metadatas[row] = dict(metadata)
+
+    def delete(self, namespace, ids):
+        with self._lock:
+            store = self._namespace(namespace)
+            if store is not None:
+                store.delete(ids)
+
+    def count(self, namespace):
+        with self._lock:
+            store = self._namespace(namespace)
+            return store.size if store is not None else 0
+
+    def namespace_metadata(self, namespace):
+        with self._lock:
+            store = self._namespace(namespace)
+            return dict(store.metadata) if store is not None else None
+
+    def set_namespace_metadata(self, namespace, metadata):
+        with self._lock:
+            self._namespace(namespace, create=True).metadata.update(metadata)
+
+    def list_namespaces(self):
+        with self._lock:
+            return [(ns, dict(store.metadata)) for ns, store in self._namespaces.items() if ns is not None]
+
+    def drop_namespace(self, namespace):
+        with self._lock:
+            store = self._namespaces.pop(namespace, None)
+            if store is None:
+                return False
+            store.close()
+            return True
+
+    def clear(self):
+        with self._lock:
+            for store in self._namespaces.values():
+                store.close()
+            self._namespaces = {None: self._new_namespace()}
+
+    def memory_usage(self) -> Dict[str, int]:
+        with self._lock:
+            usage = {"resident_bytes": 0, "mapped_bytes": 0}
+            for store in self._namespaces.values():
+                for key, value in store.memory_usage().items():
+                    usage[key] += value
+            return usage
+
+def create_backend(name: str, persist_path: str = "./sage_chroma_db", options: Optional[Dict[str, Any]] = None) -> VectorBackend:
+    """
+    options: backend-specific settings (vector_db.memory for the in-memory backend).
+    """
+    options = options or {}
+    if name == "memory":
+        return InMemoryBackend(
+            quantization=options.get("quantization", "none"),
+            rescore_factor=options.get("rescore_factor", 4),
+            full_precision_dir=options.get("full_precision_dir")
+        )
+    if name == "chroma":
+        return ChromaBackend(persist_path)
+    raise ValueError(f"Unknown vector_db backend: {name}")
@@ -1,78 +1,240 @@
-import chromadb
-from chromadb.config import Settings
-from typing import List, Dict, Any
-import uuid
+from typing import List, Dict, Any, Optional
+import json
+import hashlib
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from sage.models.schemas import ProductContext
 from sage.utils.chunking import Chunker
 from sage.utils.embedding_client import EmbeddingClient
+from sage.utils.config import get_section
+from sage.utils.vector_backends import VectorBackend, create_backend
+from sage.utils.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from sage.utils.query_cache import get_query_embedding_cache
+
+def content_fingerprint(context: ProductContext) -> str:
+    """
+    Hash of everything that gets indexed for a product, recorded by mark_indexed().
+    The pipeline and chat both use it, so a changed page is re-indexed instead of
+    served from a stale namespace.
+    """
+    payload = json.dumps({
+        "pdp_html": context.pdp_html[:50000] if context.pdp_html else "",
+        "structured_content": context.structured_content or {},
+        "title": context.metadata.get("title", "") if context.metadata else ""
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 class VectorDBClient:
-    def __init__(self, persist_path: str = "./sage_chroma_db"):
-        self.client = chromadb.PersistentClient(path=persist_path)
-        self.collection = self.client.get_or_create_collection(name="sage_evidence")
+    def __init__(self, persist_path: str = "./sage_chroma_db", namespace_ttl_seconds: Optional[float] = None, backend: Optional[str] = None):
+        config = get_section("vector_db")
+        # "chroma" (persistent) or "memory" (per-process NumPy index)
+        self.backend_name = backend or config.get("backend", "chroma")
+        self.backend: VectorBackend = create_backend(self.backend_name, persist_path, config.get(self.backend_name, {}))
         self.chunker = Chunker()
         self.embedder = EmbeddingClient()
 
+        if namespace_ttl_seconds is None:
+            namespace_ttl_seconds = config.get("namespace_ttl_seconds", 86400)
+        self.namespace_ttl_seconds = namespace_ttl_seconds
+
+        # Hybrid retrieval: BM25 over the same chunks, fused with the dense ranking by RRF
+        self.hybrid = config.get("hybrid", True)
+        self.rrf_k = config.get("rrf_k", 60)
+        self.hybrid_candidates = config.get("hybrid_candidates", 20)
+        self.lexical = LexicalIndex(self.backend)
+
+        # Query embeddings: warm aspect table + in-process LRU, so repeat queries skip the API
+        self.query_cache = get_query_embedding_cache(get_section("query_cache"))
+
+        self._namespace_locks: Dict[str, threading.Lock] = {}
+        self._readers: Dict[str, int] = {}  # In-flight queries per product
+        self._locks_guard = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Product namespaces
+    # ------------------------------------------------------------------
+
+    def _is_expired(self, metadata: Optional[Dict[str, Any]], now: Optional[float] = None) -> bool:
+        if not self.namespace_ttl_seconds or not metadata:
+            return False
+        indexed_at = metadata.get("indexed_at", 0)
+        return ((now or time.time()) - indexed_at) > self.namespace_ttl_seconds
+
+    def product_lock(self, product_id: str) -> threading.Lock:
+        """
+        Per-product lock so concurrent runs for the same product don't index it twice.
+        Runs for different products never contend.
+        """
+        with self._locks_guard:
+            if product_id not in self._namespace_locks:
+                self._namespace_locks[product_id] = threading.Lock()
+            return self._namespace_locks[product_id]
+
+    @contextmanager
+    def product_in_use(self, product_id: Optional[str]):
+        """
+        Marks a product's namespace as being queried, so expire_stale() leaves it alone.
+        """
+        if product_id is None:
+            yield
+            return
+        with self._locks_guard:
+            self._readers[product_id] = self._readers.get(product_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._locks_guard:
+                self._readers[product_id] -= 1
+                if not self._readers[product_id]:
+                    del self._readers[product_id]
+
+    def is_indexed(self, product_id: str, fingerprint: Optional[str] = None) -> bool:
+        """
+        True if the product's namespace holds a completed, unexpired index.
+        If a fingerprint is given, it must match the one recorded by mark_indexed().
+        """
+        metadata = self.backend.namespace_metadata(product_id)
+        if metadata is None:
+            return False
+        if "fingerprint" not in metadata or self._is_expired(metadata):
+            return False
+        if fingerprint is not None and metadata.get("fingerprint") != fingerprint:
+            return False
+        return self.backend.count(product_id) > 0
+
+    def mark_indexed(self, product_id: str, fingerprint: str = ""):
+        """
+        Record that ingestion for a product finished. Resets the namespace TTL.
+        """
+        self.backend.set_namespace_metadata(
+            product_id,
+            {"product_id": product_id, "indexed_at": time.time(), "fingerprint": fingerprint}
+        )
+
+    def drop_product(self, product_id: str):
+        """
+        Drop a product's namespace. O(1) regardless of how many chunks it holds.
+        """
+        # Backend first: a search in between would rebuild BM25 from the namespace
+        dropped = self.backend.drop_namespace(product_id)
+        self.lexical.drop(product_id)
+        if dropped:
+            print(f"[VectorDB] Dropped namespace for product: {product_id}")
+
+    def expire_stale(self) -> int:
+        """
+        Drop every product namespace whose last indexing is older than the TTL.
+        Namespaces that are being indexed (product_lock held) or queried
+        (product_in_use) are skipped; a later call expires them.
+        Returns the number of namespaces dropped.
+        """
+        if not self.namespace_ttl_seconds:
+            return 0
+
+        now = time.time()
+        dropped = 0
+        try:
+            for product_id, metadata in self.backend.list_namespaces():
+                if self._is_expired(metadata, now) and self._drop_if_idle(product_id, now):
+                    dropped += 1
+        except Exception as e:
+            print(f"[VectorDB] Error expiring stale namespaces: {e}")
+
+        if dropped:
+            print(f"[VectorDB] Expired {dropped} stale product namespaces")
+        return dropped
+
+    def _drop_if_idle(self, product_id: str, now: float) -> bool:
+        lock = self.product_lock(product_id)
+        if not lock.acquire(blocking=False):
+            return False
+        try:
+            # Holding the guard keeps new queries from starting until the drop is done
+            with self._locks_guard:
+                if self._readers.get(product_id):
+                    return False
+                # Re-indexed since it was listed
+                if not self._is_expired(self.backend.namespace_metadata(product_id), now):
+                    return False
+                self.backend.drop_namespace(product_id)
+                self.lexical.drop(product_id)
+                return True
+        finally:
+            lock.release()
+
     def clear_product(self, product_id: str):
         """
         Clear all data for a specific product from the vector DB.
         """
+        self.drop_product(product_id)
         try:
-            # Delete all documents with this product_id
-            results = self.collection.get(where={"product_id": product_id})
-            if results and results['ids']:
+            # Delete all documents with this product_id from the shared collection
+            results = self.backend.get(None, where={"product_id": product_id})
+            if results['ids']:
                 print(f"[VectorDB] Clearing {len(results['ids'])} chunks for product: {product_id}")
-                self.collection.delete(ids=results['ids'])
+                self.backend.delete(None, results['ids'])
+                self.lexical.delete(None, results['ids'])
         except Exception as e:
             print(f"[VectorDB] Error clearing product {product_id}: {e}")
-    
+
     def clear_all(self):
         """
         Clear ALL data from the vector DB to ensure complete isolation.
+        Not used by the pipeline; runs are isolated by product namespace instead.
         """
         try:
-            # Get all IDs and delete them
-            results = self.collection.get()
-            if results and results['ids']:
-                print(f"[VectorDB] Clearing ALL {len(results['ids'])} chunks from database")
-                self.collection.delete(ids=results['ids'])
+            shared = self.backend.count(None)
+            self.backend.clear()
+            self.lexical.clear()
+            if shared:
+                print(f"[VectorDB] Clearing ALL {shared} chunks from database")
             else:
                 print(f"[VectorDB] Database is already empty")
         except Exception as e:
             print(f"[VectorDB] Error clearing all data: {e}")
 
-    def add_documents(self, documents: List[Dict[str, Any]]):
+    # ------------------------------------------------------------------
+    # Ingestion / search
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def chunk_id(product_id: Optional[str], source_type: str, text: str) -> str:
         """
-        Adds documents to the store.
-        Documents should have 'text', 'source_type', 'metadata', etc.
-        We chunk them first, then embed, then store.
+        Deterministic chunk ID: the same chunk of the same product always maps to the
+        same ID, so re-ingesting a page is an upsert rather than a duplicate.
+        """
+        payload = f"{product_id or ''}\x1f{source_type}\x1f{text}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def _chunk_documents(self, documents: List[Dict[str, Any]], product_id: Optional[str]):
+        """
+        Chunk documents into (ids, texts, metadatas). Identical chunks within a
+        product and source type collapse to one entry.
         """
         ids = []
-        embeddings = []
         metadatas = []
         documents_text = []
+        seen = set()
 
         for doc in documents:
             raw_text = doc.get("text", "")
             source_type = doc.get("source_type", "unknown")
             base_metadata = doc.get("metadata", {})
-            
+
             # 1. Chunk
             chunks = self.chunker.chunk(raw_text, source_type)
-            
-            # 2. Embed (Batching per doc for simplicity, ideally batch all)
-            if not chunks:
-                continue
-                
-            chunk_embeddings = self.embedder.get_text_embedding(chunks, "primary_retrieval")
-            
+
             for i, chunk in enumerate(chunks):
-                # Generate unique ID
-                chunk_id = str(uuid.uuid4())
-                
+                chunk_id = self.chunk_id(product_id, source_type, chunk)
+                if chunk_id in seen:
+                    continue
+                seen.add(chunk_id)
+
                 ids.append(chunk_id)
-                embeddings.append(chunk_embeddings[i])
                 documents_text.append(chunk)
-                
+
                 # Merge metadata
                 meta = base_metadata.copy()
                 meta.update({
@@ -80,40 +242,218 @@ class VectorDBClient:
                     "chunk_index": i,
                     "parent_id": doc.get("evidence_id", "unknown")
                 })
+                if product_id is not None:
+                    meta["product_id"] = product_id
                 metadatas.append(meta)
 
-        # 3. Add to Chroma
-        if ids:
-            self.collection.add(
-                documents=documents_text,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                ids=ids
-            )
+        return ids, documents_text, metadatas
+
+    def _store_chunks(self, product_id: Optional[str], ids: List[str], documents_text: List[str], metadatas: List[Dict[str, Any]]):
+        if not ids:
+            return
+        # Embed every chunk across all documents in one call
+        embeddings = self.embedder.get_text_embedding(documents_text, "primary_retrieval")
+        # Upsert, then tokenize once for the lexical index
+        self.backend.add(product_id, ids, embeddings, documents_text, metadatas)
+        if self.hybrid:
+            self.lexical.add(product_id, ids, documents_text, metadatas)
 
-    def query(self, query_text: str, top_k: int = 5, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    def add_documents(self, documents: List[Dict[str, Any]], product_id: Optional[str] = None):
         """
-        Semantic search using Chroma.
+        Adds documents to the store.
+        Documents should have 'text', 'source_type', 'metadata', etc.
+        We chunk them first, then embed, then store.
+        If product_id is given, chunks are written to that product's namespace.
+        Chunk IDs are content hashes: chunks already stored are skipped, never duplicated.
+        New chunks from all documents are embedded together (the embedder splits them into
+        token-budgeted batches) and written with a single backend add.
         """
-        # 1. Embed Query
-        query_embedding = self.embedder.get_text_embedding(query_text, "primary_retrieval")[0]
-        
-        # 2. Search
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            where=filters # Chroma filters format
+        ids, documents_text, metadatas = self._chunk_documents(documents, product_id)
+        existing = set(self.backend.get(product_id, ids=ids)["ids"]) if ids else set()
+        new = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing]
+        self._store_chunks(
+            product_id,
+            [ids[i] for i in new],
+            [documents_text[i] for i in new],
+            [metadatas[i] for i in new]
+        )
+
+    def sync_documents(self, documents: List[Dict[str, Any]], product_id: str) -> Dict[str, int]:
+        """
+        Make a product's namespace hold exactly the chunks of `documents`.
+        The incoming chunk set is diffed against what is stored: only new chunks are
+        embedded and upserted, and chunks that no longer exist are deleted, so the work
+        is proportional to what changed on the page. Unchanged chunks whose metadata
+        changed (title, url, chunk_index, ...) get the new metadata without re-embedding.
+        Returns {"added", "deleted", "unchanged", "updated"} chunk counts; "updated"
+        counts the unchanged chunks whose metadata was refreshed.
+        """
+        ids, documents_text, metadatas = self._chunk_documents(documents, product_id)
+        existing = self.backend.get(product_id)
+        stored_metadata = dict(zip(existing["ids"], existing["metadatas"]))
+        stored = set(stored_metadata)
+        incoming = set(ids)
+
+        stale = sorted(stored - incoming)
+        if stale:
+            self.backend.delete(product_id, stale)
+            self.lexical.delete(product_id, stale)
+
+        new = [i for i, chunk_id in enumerate(ids) if chunk_id not in stored]
+        self._store_chunks(
+            product_id,
+            [ids[i] for i in new],
+            [documents_text[i] for i in new],
+            [metadatas[i] for i in new]
         )
-        
+
+        changed = [i for i, chunk_id in enumerate(ids) if chunk_id in stored and stored_metadata[chunk_id] != metadatas[i]]
+        if changed:
+            changed_ids = [ids[i] for i in changed]
+            changed_metadatas = [metadatas[i] for i in changed]
+            self.backend.update_metadata(product_id, changed_ids, changed_metadatas)
+            self.lexical.update_metadata(product_id, changed_ids, changed_metadatas)
+
+        stats = {"added": len(new), "deleted": len(stale), "unchanged": len(incoming & stored), "updated": len(changed)}
+        print(f"[VectorDB] Synced product {product_id}: {stats}")
+        return stats
+
+    def query(self, query_text: str, top_k: int = 5, filters: Dict[str, Any] = None, product_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Search against the configured backend: dense only, or dense + BM25 fused by
+        reciprocal rank fusion when vector_db.hybrid is enabled.
+        If product_id is given, only that product's namespace is searched.
+        """
+        return self.query_many([query_text], top_k, filters, product_id)[0]
+
+    async def aquery(self, query_text: str, top_k: int = 5, filters: Dict[str, Any] = None, product_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Async variant of query.
+        """
+        return (await self.aquery_many([query_text], top_k, filters, product_id))[0]
+
+    def query_many(self, query_texts: List[str], top_k: int = 5, filters: Dict[str, Any] = None, product_id: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Run several queries in one round-trip: all query texts are embedded in a single
+        batch and searched with one multi-vector backend query.
+        Returns one result list per query text, in order.
+        """
+        if not query_texts:
+            return []
+        with self.product_in_use(product_id):
+            if product_id is not None and self.backend.namespace_metadata(product_id) is None:
+                print(f"[VectorDB] No index for product: {product_id}")
+                return [[] for _ in query_texts]
+
+            pool = self._pool_size(top_k)
+            # 1. Embed every query in one call (cached queries are not sent)
+            query_embeddings = self._embed_queries(query_texts)
+
+            # 2. Search
+            dense = self.backend.query(product_id, query_embeddings, pool, where=filters)
+            lexical = self._lexical_many(product_id, query_texts, pool, filters)
+
         # 3. Format Results
+        return [self._format_results(self._fuse(dense[i], lexical[i], top_k)) for i in range(len(query_texts))]
+
+    async def aquery_many(self, query_texts: List[str], top_k: int = 5, filters: Dict[str, Any] = None, product_id: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Async variant of query_many. Queries are embedded via the async SDK; backend and
+        lexical index calls (which are synchronous) run in worker threads.
+        """
+        if not query_texts:
+            return []
+        with self.product_in_use(product_id):
+            if product_id is not None:
+                metadata = await asyncio.to_thread(self.backend.namespace_metadata, product_id)
+                if metadata is None:
+                    print(f"[VectorDB] No index for product: {product_id}")
+                    return [[] for _ in query_texts]
+
+            pool = self._pool_size(top_k)
+            query_embeddings, lexical = await asyncio.gather(
+                self._aembed_queries(query_texts),
+                asyncio.to_thread(self._lexical_many, product_id, query_texts, pool, filters)
+            )
+            dense = await asyncio.to_thread(self.backend.query, product_id, query_embeddings, pool, filters)
+        return [self._format_results(self._fuse(dense[i], lexical[i], top_k)) for i in range(len(query_texts))]
+
+    def _query_model(self) -> str:
+        return self.embedder._model_name("primary_retrieval")
+
+    def _embed_queries(self, query_texts: List[str]) -> List[List[float]]:
+        if self.query_cache is None:
+            return self.embedder.get_text_embedding(query_texts, "primary_retrieval")
+        model = self._query_model()
+        embeddings = self.query_cache.get_many(model, query_texts)
+        missing = [i for i, vector in enumerate(embeddings) if vector is None]
+        if missing:
+            fresh = self.embedder.get_text_embedding([query_texts[i] for i in missing], "primary_retrieval")
+            self._fill_query_misses(model, query_texts, embeddings, missing, fresh)
+        return embeddings
+
+    async def _aembed_queries(self, query_texts: List[str]) -> List[List[float]]:
+        if self.query_cache is None:
+            return await self.embedder.aget_text_embedding(query_texts, "primary_retrieval")
+        model = self._query_model()
+        embeddings = self.query_cache.get_many(model, query_texts)
+        missing = [i for i, vector in enumerate(embeddings) if vector is None]
+        if missing:
+            fresh = await self.embedder.aget_text_embedding([query_texts[i] for i in missing], "primary_retrieval")
+            self._fill_query_misses(model, query_texts, embeddings, missing, fresh)
+        return embeddings
+
+    def _fill_query_misses(self, model: str, query_texts: List[str], embeddings: List[Optional[List[float]]], missing: List[int], fresh: List[List[float]]):
+        for i, vector in zip(missing, fresh):
+            embeddings[i] = vector
+        self.query_cache.put_many(model, [query_texts[i] for i in missing], fresh)
+
+    def _lexical_many(self, product_id: Optional[str], query_texts: List[str], pool: int, filters: Optional[Dict[str, Any]]) -> List[Optional[List[Dict[str, Any]]]]:
+        if not self.hybrid:
+            return [None] * len(query_texts)
+        return [self.lexical.search(product_id, text, pool, filters) for text in query_texts]
+
+    def _pool_size(self, top_k: int) -> int:
+        # Each index contributes a deeper candidate list than the final top_k
+        return max(top_k, self.hybrid_candidates) if self.hybrid else top_k
+
+    def _fuse(self, dense: List[Dict[str, Any]], lexical: Optional[List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+        if lexical is None:
+            return [{**hit, "ranks": {"dense": rank}} for rank, hit in enumerate(dense[:top_k], start=1)]
+        return reciprocal_rank_fusion({"dense": dense, "lexical": lexical}, top_k, k=self.rrf_k)
+
+    def _format_results(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        score is the dense distance (None for hits found only by BM25). retrieved_by lists
+        the indexes that returned the hit, with its rank in each under retrieval_ranks.
+        """
         formatted_results = []
-        if results["ids"]:
-            for i in range(len(results["ids"][0])):
-                formatted_results.append({
-                    "evidence_id": results["ids"][0][i],
-                    "text": results["documents"][0][i],
-                    "metadata": results["metadatas"][0][i],
-                    "score": results["distances"][0][i] if "distances" in results else 0.0
-                })
-                
+        for hit in hits:
+            result = {
+                "evidence_id": hit["id"],
+                "text": hit["document"],
+                "metadata": hit["metadata"],
+                "score": hit.get("distance"),
+                "retrieved_by": sorted(hit["ranks"]),
+                "retrieval_ranks": hit["ranks"]
+            }
+            if "rrf" in hit:
+                result["rrf_score"] = round(hit["rrf"], 6)
+            if "bm25" in hit:
+                result["bm25_score"] = hit["bm25"]
+            formatted_results.append(result)
         return formatted_results
+
+    @staticmethod
+    def describe_hits(hits: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Retrieval diagnostics: how many hits each index contributed.
+        """
+        sources = [tuple(hit.get("retrieved_by", ["dense"])) for hit in hits]
+        return {
+            "hits": len(hits),
+            "dense_only": sum(1 for s in sources if s == ("dense",)),
+            "lexical_only": sum(1 for s in sources if s == ("lexical",)),
+            "both": sum(1 for s in sources if len(s) > 1),
+            "by_hit": {hit["evidence_id"]: hit.get("retrieved_by", ["dense"]) for hit in hits}
+        }
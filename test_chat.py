@@ -0,0 +1,128 @@
+import os
+import asyncio
+import datetime
+from sage.models.schemas import ProductContext
+from sage.utils.vector_db import VectorDBClient
+from sage.agents.chat import ChatAgent
+from sage.utils.chat_sessions import ChatSessionStore, ChatTurn
+
+def make_context(structured):
+    return ProductContext(
+        product_id="chat_product",
+        url="http://test.com",
+        pdp_html="<html><body><p>Acme Headphones</p></body></html>",
+        images=[],
+        source="web_app",
+        timestamp=datetime.datetime.now().isoformat(),
+        structured_content=structured
+    )
+
+def test_chat_retrieval():
+    print("--- Testing Retrieval-Augmented Chat ---")
+    # Offline embeddings, so retrieval ranks for real without an API key
+    os.environ["SAGE_EMBEDDING_MODEL"] = "hashing-ngram-384"
+    try:
+        _run_chat_retrieval()
+    finally:
+        del os.environ["SAGE_EMBEDDING_MODEL"]
+
+def _run_chat_retrieval():
+    db = VectorDBClient(backend="memory")
+    indexed = []
+    def index_product(context):
+        indexed.append(context.product_id)
+        documents = [
+            {"text": f"{name}: {content}", "source_type": "structured_content", "metadata": {"section": name}}
+            for name, content in context.structured_content.items()
+        ]
+        db.sync_documents(documents, context.product_id)
+
+    agent = ChatAgent(db, index_product)
+    agent.top_k = 1
+    prompts = []
+    async def fake_answer(system_prompt, user_content, agent_name, **kwargs):
+        prompts.append(user_content)
+        return "ok"
+    agent.client.agenerate_response = fake_answer
+    try:
+        _ask_chat(agent, indexed, prompts)
+    finally:
+        del agent.client.agenerate_response
+        db.clear_all()
+
+def _ask_chat(agent, indexed, prompts):
+    context = make_context({
+        "battery": "Battery lasts 30 hours with ANC on, USB-C fast charging.",
+        "comfort": "Memory foam ear cushions, 250 g, comfortable for long flights.",
+        "warranty": "Two year limited warranty covering manufacturing defects."
+    })
+    result = asyncio.run(agent.aanswer(context, "How long does the battery last?"))
+    assert result["response"] == "ok" and len(result["sources"]) == 1
+    assert "Battery lasts 30 hours" in prompts[-1] and "warranty" not in prompts[-1].lower()
+    assert result["usage"]["prompt_tokens"] > 0 and result["usage"]["history_tokens"] == 0
+
+    # The session remembers the indexed version; a changed page is re-indexed
+    followup = asyncio.run(agent.aanswer(context, "Is it comfortable?", session_id=result["session_id"]))
+    assert "Memory foam" in prompts[-1]
+    assert "User: How long does the battery last?" in prompts[-1]
+    assert followup["session_id"] == result["session_id"] and followup["usage"]["history_tokens"] > 0
+    assert indexed == ["chat_product"]
+    context.structured_content["battery"] = "Battery lasts 40 hours."
+    asyncio.run(agent.aanswer(context, "battery life?"))
+    assert indexed == ["chat_product", "chat_product"] and "40 hours" in prompts[-1]
+
+def test_session_store():
+    print("--- Testing Chat Session Store ---")
+    store = ChatSessionStore(ttl_seconds=60, max_sessions=2)
+    a = store.get_or_create("p1")
+    assert store.get_or_create("p1", a.session_id) is a
+    # Keyed by product as well as session ID
+    assert store.get_or_create("p2", a.session_id) is not a
+    store.get_or_create("p3")
+    assert store.get("p1", a.session_id) is None  # Evicted beyond max_sessions
+    b = store.get_or_create("p3", "s1")
+    b.last_used -= 120
+    assert store.get("p3", "s1") is None  # Expired
+
+def test_history_folding():
+    print("--- Testing Bounded Chat History ---")
+    agent = ChatAgent(VectorDBClient(backend="memory"), lambda context: None)
+    agent.recent_turns = 2
+    summaries = []
+    async def fake_summary(system_prompt, user_content, agent_name, **kwargs):
+        summaries.append(user_content)
+        return f"summary #{len(summaries)}"
+    agent.client.agenerate_response = fake_summary
+    try:
+        _fold_history(agent, summaries)
+    finally:
+        del agent.client.agenerate_response
+
+def _fold_history(agent, summaries):
+    conversation = agent.conversations.get_or_create("p1", "s1")
+    async def run():
+        for i in range(5):
+            conversation.add_turn(ChatTurn(f"question {i}", f"answer {i}"))
+            agent._schedule_fold(conversation)
+            if conversation.folding:
+                await conversation.folding
+    asyncio.run(run())
+    assert [t.user for t in conversation.turns] == ["question 3", "question 4"]
+    assert conversation.summary == "summary #3" and conversation.summarized_turns == 3
+    # Each fold carries the previous summary forward
+    assert "Earlier summary: summary #2" in summaries[-1] and "question 2" in summaries[-1]
+    history = conversation.history_text()
+    assert history.startswith("Summary of earlier conversation: summary #3") and "question 0" not in history
+
+    # Without a working summarizer, the earlier questions are kept
+    async def failing(*args, **kwargs):
+        raise ValueError("no key")
+    agent.client.agenerate_response = failing
+    conversation.add_turn(ChatTurn("question 5", "answer 5"))
+    asyncio.run(agent.afold_history(conversation))
+    assert conversation.summary == "summary #3 Earlier questions: question 3"
+
+if __name__ == "__main__":
+    test_chat_retrieval()
+    test_session_store()
+    test_history_folding()
@@ -28,5 +28,22 @@ def test_chunking():
     chunks = chunker.chunk(thread, "reddit")
     print(f"Reddit Chunks ({len(chunks)}): {chunks}")
 
+def test_pdp_chunks_are_stable():
+    print("--- Testing Content-Defined PDP Chunks ---")
+    chunker = Chunker()
+    paragraphs = [f"Paragraph {i}: " + "battery sound comfort " * (i % 7 + 2) for i in range(200)]
+    original = chunker.chunk("".join(f"<p>{p}</p>" for p in paragraphs), "pdp")
+    
+    # Insert a review in the middle of the page
+    edited = paragraphs[:100] + ["New review: the hinge cracked after a week."] + paragraphs[100:]
+    updated = chunker.chunk("".join(f"<p>{p}</p>" for p in edited), "pdp")
+    
+    reused = len(set(original) & set(updated))
+    print(f"PDP Chunks: {len(original)} -> {len(updated)}, {reused} unchanged")
+    assert all(len(chunk) <= 2000 for chunk in updated)
+    # Only the chunk(s) around the edit change
+    assert reused >= len(original) - 2
+
 if __name__ == "__main__":
     test_chunking()
+    test_pdp_chunks_are_stable()
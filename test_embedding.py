@@ -24,5 +24,27 @@ def test_embeddings():
     else:
         print("\nSkipping OpenAI (Key not found)")
 
+def test_token_batches():
+    client = EmbeddingClient()
+    client.max_inputs_per_batch = 3
+    client.max_tokens_per_batch = 31
+    client.max_input_tokens = 30
+    
+    print("--- Testing Embedding Batching ---")
+    
+    texts = ["short text"] * 4 + ["word " * 200]
+    batches = client._token_batches(texts, "text-embedding-3-small")
+    print(f"Batch sizes: {[len(b) for b in batches]}")
+    
+    # Input-count limit splits the first four; the over-long text is truncated into its own batch
+    assert [len(b) for b in batches] == [3, 1, 1]
+    assert len(batches[-1][0]) < len(texts[-1])
+    
+    # Batched results come back flattened in input order
+    client._get_openai_embedding = lambda batch, model: [[float(len(t))] for t in batch]
+    vectors = client._get_openai_embedding_batched(["a", "bb", "ccc", "dddd"], "text-embedding-3-small")
+    assert vectors == [[1.0], [2.0], [3.0], [4.0]]
+
 if __name__ == "__main__":
     test_embeddings()
+    test_token_batches()
@@ -0,0 +1,95 @@
+from sage.utils.embedding_cache import EmbeddingCache
+from sage.utils.embedding_client import EmbeddingClient
+import asyncio
+import tempfile
+import numpy as np
+
+def test_embedding_cache():
+    print("--- Testing Embedding Cache ---")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(directory=tmp, max_entries=3, dtype="float16")
+        vectors = np.random.rand(3, 8).astype(np.float32).tolist()
+        cache.put_many("model-a", ["one", "two", "three"], vectors)
+        
+        hits = cache.get_many("model-a", ["two", "missing", "one"])
+        assert hits[1] is None
+        assert np.allclose(hits[0], vectors[1], atol=1e-3)
+        assert np.allclose(hits[2], vectors[0], atol=1e-3)
+        # Keyed by model as well as text
+        assert cache.get_many("model-b", ["one"]) == [None]
+        
+        # "three" is least recently used, so it is evicted when "four" arrives
+        cache.put_many("model-a", ["four"], [[1.0] * 8])
+        assert cache.get_many("model-a", ["three"]) == [None]
+        assert cache.get_many("model-a", ["four"])[0] == [1.0] * 8
+        print(f"Stats: {cache.stats()}")
+        
+        # Survives a restart
+        reopened = EmbeddingCache(directory=tmp, max_entries=3, dtype="float16")
+        assert reopened.get_many("model-a", ["four"])[0] == [1.0] * 8
+
+def test_embedding_client_only_embeds_misses():
+    print("--- Testing Embedding Client Cache Path ---")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        client = EmbeddingClient()
+        client.cache = EmbeddingCache(directory=tmp)
+        calls = []
+        
+        def fake_embed(texts, model_name):
+            calls.append(list(texts))
+            return [[float(len(t)), 1.0] for t in texts]
+        
+        client._embed = fake_embed
+        client._is_cacheable = lambda model_name: True
+        
+        first = client.get_text_embedding(["alpha", "beta"])
+        second = client.get_text_embedding(["beta", "gamma", "alpha"])
+        
+        print(f"Provider calls: {calls}")
+        assert calls == [["alpha", "beta"], ["gamma"]]
+        assert second == [first[1], [5.0, 1.0], first[0]]
+
+def test_async_openai_misses_use_async_client():
+    print("--- Testing Async Embedding Path ---")
+    client = EmbeddingClient()
+    client.cache = None
+    assert client.dispatcher is not None  # Enabled by default
+    async_calls, dispatched = [], []
+
+    async def fake_async_openai(texts, model):
+        async_calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    client._aget_openai_embedding = fake_async_openai
+    client._embed_direct = lambda model_name, texts: dispatched.append(model_name) or [[0.0] for _ in texts]
+    vectors = asyncio.run(client.aget_text_embedding(["alpha", "be"], "redundancy_layer"))
+    # OpenAI misses skip the thread-based dispatcher and go to the async SDK
+    assert vectors == [[5.0], [2.0]] and async_calls == [["alpha", "be"]] and dispatched == []
+    # Local models still go through the dispatcher
+    client.models_config = {**client.models_config, "embedding_models": {"primary_retrieval": "bge-large-en"}}
+    asyncio.run(client.aget_text_embedding(["alpha"]))
+    assert dispatched == ["bge-large-en"]
+
+def test_async_openai_client_per_loop():
+    print("--- Testing Per-Loop Async Client ---")
+    client = EmbeddingClient()
+    client.openai_api_key = "sk-test"
+
+    async def current():
+        return client.async_openai_client
+
+    async def twice():
+        return await current(), await current()
+
+    first, again = asyncio.run(twice())
+    # Reused within a loop, never shared with the next one
+    assert first is again
+    assert asyncio.run(current()) is not first
+
+if __name__ == "__main__":
+    test_embedding_cache()
+    test_embedding_client_only_embeds_misses()
+    test_async_openai_misses_use_async_client()
+    test_async_openai_client_per_loop()
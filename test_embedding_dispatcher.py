@@ -0,0 +1,80 @@
+from sage.utils.embedding_dispatcher import EmbeddingDispatcher
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+def test_coalesces_concurrent_requests():
+    print("--- Testing Embedding Dispatcher ---")
+    calls = []
+    def embed(model_name, texts):
+        calls.append((model_name, len(texts)))
+        return [[float(len(t)), float(model_name == "b")] for t in texts]
+    
+    dispatcher = EmbeddingDispatcher(embed, max_batch_size=64, max_wait_ms=50)
+    start = threading.Barrier(16)
+    def caller(i):
+        start.wait()
+        model = "b" if i % 4 == 0 else "a"
+        return dispatcher.embed(model, ["x" * i, "y" * (i + 1)])
+    
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(caller, range(16)))
+    
+    # Every caller gets its own vectors back, in order
+    for i, vectors in enumerate(results):
+        assert vectors == [[float(i), float(i % 4 == 0)], [float(i + 1), float(i % 4 == 0)]]
+    stats = dispatcher.stats()
+    print(f"Calls: {calls}\nStats: {stats}")
+    # 16 requests were served by far fewer embed calls, grouped by model
+    assert len(calls) < 16 and stats["requests"] == 16 and stats["texts"] == 32
+    assert stats["max_batch_size"] <= 64
+    dispatcher.shutdown()
+
+def test_errors_and_size_bound():
+    print("--- Testing Dispatcher Errors and Batch Bound ---")
+    def embed(model_name, texts):
+        if model_name == "broken":
+            raise ValueError("OpenAI API key not found for embeddings.")
+        return [[1.0] for _ in texts]
+    
+    dispatcher = EmbeddingDispatcher(embed, max_batch_size=4, max_wait_ms=20)
+    big = dispatcher.submit("a", ["t"] * 10)     # Larger than a batch: runs alone, unsplit
+    small = dispatcher.submit("a", ["t"] * 3)
+    broken = dispatcher.submit("broken", ["t"])
+    assert len(big.result()) == 10 and len(small.result()) == 3
+    try:
+        broken.result()
+        assert False, "expected the embed error to reach the caller"
+    except ValueError:
+        pass
+    assert dispatcher.embed("a", []) == []
+    dispatcher.shutdown()
+
+def test_routes_by_embed_fn():
+    print("--- Testing Dispatcher Routing Per Client ---")
+    from sage.utils.embedding_client import EmbeddingClient
+    # Shared dispatcher without a default function, as get_embedding_dispatcher builds it
+    dispatcher = EmbeddingDispatcher(max_batch_size=64, max_wait_ms=50)
+    first = lambda model_name, texts: [[1.0] for _ in texts]
+    second = lambda model_name, texts: [[2.0] for _ in texts]
+    a = dispatcher.submit("m", ["x", "y"], first)
+    b = dispatcher.submit("m", ["z"], second)
+    # Same batch, same model, but each request is embedded by its own function
+    assert a.result() == [[1.0], [1.0]] and b.result() == [[2.0]]
+    try:
+        dispatcher.submit("m", ["x"])
+        assert False, "expected a missing embed_fn to be rejected"
+    except ValueError:
+        pass
+    dispatcher.shutdown()
+
+    # Clients share the process-wide dispatcher; a later client's patch is still honored
+    client_a, client_b = EmbeddingClient(), EmbeddingClient()
+    assert client_a.dispatcher is client_b.dispatcher
+    client_b._embed_direct = lambda model_name, texts: [[9.0] for _ in texts]
+    assert client_b._embed(["q"], "text-embedding-3-small") == [[9.0]]
+    assert client_a._embed(["q"], "hashing-ngram-8") != [[9.0]]
+
+if __name__ == "__main__":
+    test_coalesces_concurrent_requests()
+    test_errors_and_size_bound()
+    test_routes_by_embed_fn()
@@ -0,0 +1,45 @@
+from sage.engine.evidence_ranker import EvidenceRanker
+import time
+
+def hit(evidence_id, text, distance, source_type="pdp", **metadata):
+    return {"evidence_id": evidence_id, "text": text, "score": distance, "metadata": {"source_type": source_type, **metadata}, "aspects": ["battery"]}
+
+def test_trust_and_relevance():
+    print("--- Testing Evidence Ranker ---")
+    ranker = EvidenceRanker()
+    hits = [
+        hit("r1", "Battery died after a month of use", 0.30, "reddit"),
+        hit("s1", "Battery Life: up to 30 hours with ANC", 0.32, "structured_content", priority="high"),
+        hit("p1", "Free shipping on orders over $50", 1.60, "pdp"),
+    ]
+    result = ranker.rank(hits, top_k=2)
+    ids = [e["evidence_id"] for e in result["evidence"]]
+    print(f"Ranked: {ids}\nDiagnostics: {result['diagnostics']}")
+    # High-priority structured content wins a near-tie on relevance; boilerplate is cut
+    assert ids == ["s1", "r1"]
+    assert result["evidence"][0]["source_type"] == "structured_content"
+    assert result["evidence"][0]["aspect_tags"] == ["battery"]
+    assert result["diagnostics"]["ranking_mode"] == "local"
+    assert set(result["diagnostics"]["scores"]) == {"s1", "r1"}
+
+def test_diversity_and_recency():
+    print("--- Testing MMR Diversity and Recency ---")
+    ranker = EvidenceRanker()
+    now = time.time()
+    hits = [
+        hit("a", "Battery lasts 30 hours on a single charge", 0.20),
+        hit("b", "Battery lasts 30 hours on a single charge", 0.21),
+        hit("c", "Sound is warm with deep bass", 0.50),
+    ]
+    result = ranker.rank(hits, top_k=3)
+    assert [e["evidence_id"] for e in result["evidence"]] == ["a", "c"]
+    assert result["diagnostics"]["dropped_duplicates"] == ["b"]
+    
+    old = hit("old", "Firmware update fixed pairing", 0.4, "reddit", published_at=now - 5 * 365 * 86400)
+    new = hit("new", "Pairing drops after latest firmware", 0.4, "reddit", published_at=now - 86400)
+    ranked = ranker.rank([old, new], top_k=2, now=now)["evidence"]
+    assert ranked[0]["evidence_id"] == "new"
+
+if __name__ == "__main__":
+    test_trust_and_relevance()
+    test_diversity_and_recency()
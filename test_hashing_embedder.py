@@ -0,0 +1,49 @@
+import os
+import numpy as np
+from sage.utils.hashing_embedder import HashingEmbedder
+
+def test_deterministic():
+    print("--- Testing Hashing Embedder Determinism ---")
+    embedder = HashingEmbedder(dim=384)
+    a = embedder.embed_matrix(["Battery lasts 30 hours", "Great ANC"])
+    b = embedder.embed_matrix(["Battery lasts 30 hours", "Great ANC"])
+    assert a.shape == (2, 384)
+    assert np.array_equal(a, b)
+    assert np.allclose(np.linalg.norm(a, axis=1), 1.0, atol=1e-5)
+    # Case and whitespace don't change the vector
+    assert np.array_equal(embedder.embed_matrix(["battery  LASTS 30 hours"])[0], a[0])
+    assert HashingEmbedder.model_dim("hashing-ngram-384") == 384
+    assert HashingEmbedder.model_dim("hashing") == 768
+    assert not embedder.embed_matrix([""]).any()
+
+def test_ranking():
+    print("--- Testing Hashing Embedder Ranking ---")
+    embedder = HashingEmbedder()
+    docs = embedder.embed_matrix([
+        "The battery lasts about 30 hours and charges over USB-C.",
+        "Ear cups are comfortable on long flights, but clamp on glasses.",
+        "The microphone picks up wind noise on calls.",
+        "Bluetooth multipoint pairing switches between laptop and phone.",
+    ])
+    queries = embedder.embed_matrix(["battery life hours", "comfort on flights", "mic wind noise", "multipoint bluetooth"])
+    best = (queries @ docs.T).argmax(axis=1)
+    print(f"Best match per query: {best.tolist()}")
+    assert best.tolist() == [0, 1, 2, 3]
+
+def test_embedding_client_routing():
+    print("--- Testing Hashing Model Routing ---")
+    os.environ["SAGE_EMBEDDING_MODEL"] = "hashing-ngram-256"
+    try:
+        from sage.utils.embedding_client import EmbeddingClient
+        client = EmbeddingClient()
+        vectors = client.get_text_embedding(["Great ANC", "Weak mic"])
+        assert len(vectors) == 2 and len(vectors[0]) == 256
+        assert vectors[0] != vectors[1]
+        assert not client._is_cacheable("hashing-ngram-256")
+    finally:
+        del os.environ["SAGE_EMBEDDING_MODEL"]
+
+if __name__ == "__main__":
+    test_deterministic()
+    test_ranking()
+    test_embedding_client_routing()
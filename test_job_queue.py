@@ -0,0 +1,117 @@
+from sage.engine.job_queue import JobQueue, JobStatus, QueueFullError
+from sage.engine.scheduler import StageCancelled
+import threading
+import time
+
+def wait_for(job, timeout=2.0):
+    deadline = time.time() + timeout
+    while job.status not in JobStatus.FINISHED and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+def test_job_queue():
+    print("--- Testing Job Queue ---")
+    
+    order = []
+    release = threading.Event()
+    
+    def handler(job):
+        if job.payload == "blocker":
+            release.wait()
+        order.append(job.payload)
+        return f"done:{job.payload}"
+    
+    queue = JobQueue(handler, workers=1, max_queued=2)
+    blocker = queue.submit("blocker")
+    time.sleep(0.05)  # Let the single worker pick up the blocker
+    assert blocker.status == JobStatus.RUNNING
+    
+    low = queue.submit("low", priority=0)
+    high = queue.submit("high", priority=5)
+    
+    # Backpressure: two jobs already waiting
+    try:
+        queue.submit("overflow")
+        assert False, "Queue accepted more than max_queued jobs"
+    except QueueFullError as e:
+        print(f"Rejected: {e}")
+    
+    release.set()
+    wait_for(low)
+    
+    print(f"Order: {order}")
+    print(f"Stats: {queue.stats()}")
+    assert order == ["blocker", "high", "low"]
+    assert high.to_dict()["result"] == "done:high"
+    queue.shutdown()
+
+def test_job_cancellation():
+    print("--- Testing Job Cancellation ---")
+    
+    started = threading.Event()
+    
+    def handler(job):
+        started.set()
+        # Stands in for the scheduler checking cancel_event between stages
+        while not job.cancel_event.is_set():
+            time.sleep(0.01)
+        raise StageCancelled("Run cancelled")
+    
+    queue = JobQueue(handler, workers=1)
+    running = queue.submit("running")
+    queued = queue.submit("queued")
+    started.wait(1.0)
+    
+    assert queue.cancel(queued.job_id)
+    assert queued.status == JobStatus.CANCELLED
+    assert queue.cancel(running.job_id)
+    
+    wait_for(running)
+    print(f"Running job: {running.to_dict()}")
+    assert running.status == JobStatus.CANCELLED
+    assert not queue.cancel(running.job_id)
+    queue.shutdown()
+
+def test_job_failure():
+    def handler(job):
+        raise RuntimeError("boom")
+    
+    queue = JobQueue(handler, workers=1)
+    job = wait_for(queue.submit("x"))
+    print(f"Failed job: {job.to_dict()}")
+    assert job.status == JobStatus.FAILED and job.error == "boom"
+    queue.shutdown()
+
+def test_late_cancel_keeps_result():
+    print("--- Testing Cancel After Completion ---")
+    
+    def handler(job):
+        # The cancel lands after the last stage, when the result is already computed
+        job.cancel_event.set()
+        return "result"
+    
+    queue = JobQueue(handler, workers=1)
+    job = wait_for(queue.submit("x"))
+    assert job.status == JobStatus.SUCCEEDED and job.to_dict()["result"] == "result"
+    queue.shutdown()
+
+def test_retention_without_traffic():
+    print("--- Testing Finished Job Retention ---")
+    
+    queue = JobQueue(lambda job: "x" * 1000, workers=1, retention_seconds=0.1)
+    job = wait_for(queue.submit("x"))
+    assert job.status == JobStatus.SUCCEEDED
+    # No further submit/get/stats calls: the idle worker purges it
+    deadline = time.time() + 2.0
+    while queue.jobs and time.time() < deadline:
+        time.sleep(0.02)
+    assert not queue.jobs
+    assert queue.get(job.job_id) is None
+    queue.shutdown()
+
+if __name__ == "__main__":
+    test_job_queue()
+    test_job_cancellation()
+    test_job_failure()
+    test_late_cancel_keeps_result()
+    test_retention_without_traffic()
@@ -0,0 +1,46 @@
+from sage.utils.lexical_index import tokenize, BM25Index, reciprocal_rank_fusion
+
+def test_tokenize():
+    print("--- Testing Lexical Tokenizer ---")
+    tokens = tokenize("Sony WH-1000XM5 is rated IP68, Bluetooth 5.3 with LDAC")
+    print(f"Tokens: {tokens}")
+    assert "wh-1000xm5" in tokens and "1000xm5" in tokens
+    assert "ip68" in tokens and "5.3" in tokens and "ldac" in tokens
+    assert "is" not in tokens
+
+def test_bm25_incremental():
+    print("--- Testing BM25 Index ---")
+    index = BM25Index()
+    index.add(
+        ["c1", "c2", "c3"],
+        ["Great sound and comfort for long flights.",
+         "The WH-1000XM5 supports LDAC over Bluetooth 5.3.",
+         "Battery lasts about 30 hours with noise cancelling on."],
+        [{"source_type": "pdp"}, {"source_type": "pdp"}, {"source_type": "reddit"}]
+    )
+    hits = index.search("does the wh-1000xm5 support ldac", top_k=3)
+    assert hits[0][0] == "c2" and len(hits) == 1
+    assert index.search("battery hours", top_k=3, where={"source_type": "pdp"}) == []
+    
+    # Re-adding an ID replaces it; deleting removes its postings
+    index.add(["c2"], ["Now about battery life"], [{"source_type": "pdp"}])
+    assert index.search("ldac", top_k=3) == []
+    index.delete(["c3"])
+    assert [doc_id for doc_id, _ in index.search("battery", top_k=3)] == ["c2"]
+    assert len(index) == 2 and "ldac" not in index.postings
+
+def test_rrf():
+    print("--- Testing Reciprocal Rank Fusion ---")
+    dense = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    lexical = [{"id": "c"}, {"id": "d"}]
+    fused = reciprocal_rank_fusion({"dense": dense, "lexical": lexical}, top_k=3)
+    print(f"Fused: {[(h['id'], h['ranks']) for h in fused]}")
+    # "c" is found by both indexes, so it outranks single-index hits
+    assert fused[0]["id"] == "c" and fused[0]["ranks"] == {"dense": 3, "lexical": 1}
+    # "b" and "d" tie on rank 2; ties break by ID
+    assert [h["id"] for h in fused] == ["c", "a", "b"]
+
+if __name__ == "__main__":
+    test_tokenize()
+    test_bm25_incremental()
+    test_rrf()
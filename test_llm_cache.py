@@ -0,0 +1,61 @@
+import os
+import asyncio
+import tempfile
+from sage.utils.cache import SQLiteCache
+from sage.utils.llm_cache import LLMResponseCache
+from sage.utils.llm_client import LLMClient
+
+def test_cache_key():
+    print("--- Testing LLM Cache Key ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMResponseCache(path=os.path.join(tmp, "llm.sqlite3"))
+        base = ("openai", "gpt-4o", "You are the judge.", "Evidence: ...", "json", 0.0)
+        assert cache.lookup_key(*base) == cache.key_for(*base)
+        assert cache.key_for(*base) != cache.key_for("openai", "gpt-4o-mini", *base[2:])
+        assert cache.key_for(*base) != cache.key_for(*base[:3], "Evidence: other", *base[4:])
+        assert cache.key_for(*base) != cache.key_for(*base[:4], None, 0.0)
+        # Sampled and bypassed calls are never cached
+        assert cache.lookup_key(*base[:5], 0.7) is None
+        assert cache.lookup_key(*base, use_cache=False) is None
+        assert cache.stats()["uncacheable"] == 1 and cache.stats()["bypassed"] == 1
+
+def test_size_eviction():
+    print("--- Testing Size-Based Eviction ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteCache(os.path.join(tmp, "c.sqlite3"), max_bytes=300)
+        for i in range(5):
+            store.set(f"k{i}", "x" * 100)
+        print(f"Stats: {store.stats()}")
+        assert store.size_bytes() <= 300
+        assert store.get("k0") is None and store.get("k4") is not None
+
+def test_client_cache():
+    print("--- Testing Cached LLM Responses ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        client = LLMClient()
+        client.response_cache = LLMResponseCache(path=os.path.join(tmp, "llm.sqlite3"))
+        calls = []
+        def fake_openai(model, system_prompt, user_content, response_format=None, temperature=0.0):
+            calls.append(user_content)
+            return f"answer to {user_content}"
+        async def afake_openai(*args, **kwargs):
+            return fake_openai(*args, **kwargs)
+        client._call_openai = fake_openai
+        client._acall_openai = afake_openai
+
+        first = client.generate_response("sys", "q1", "planner")
+        assert client.generate_response("sys", "q1", "planner") == first
+        assert asyncio.run(client.agenerate_response("sys", "q1", "planner")) == first
+        assert calls == ["q1"]
+        # Bypass and sampled calls go to the provider
+        client.generate_response("sys", "q1", "planner", use_cache=False)
+        client.generate_response("sys", "q1", "planner", temperature=0.7)
+        assert calls == ["q1", "q1", "q1"]
+        stats = client.stats()["response_cache"]
+        print(f"Stats: {stats}")
+        assert stats["hits"] == 2 and stats["misses"] == 1 and stats["bypassed"] == 1
+
+if __name__ == "__main__":
+    test_cache_key()
+    test_size_eviction()
+    test_client_cache()
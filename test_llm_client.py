@@ -0,0 +1,82 @@
+import time
+import asyncio
+import threading
+from sage.utils.llm_client import LLMClient, get_llm_client
+
+def test_shared_client():
+    print("--- Testing Shared LLM Client ---")
+    assert get_llm_client() is get_llm_client()
+    from sage.agents.planner import PlannerAgent
+    from sage.agents.judge import JudgeAgent
+    assert PlannerAgent().client is JudgeAgent().client is get_llm_client()
+    client = get_llm_client()
+    assert client._gemini_model("gemini-1.5-flash") is client._gemini_model("gemini-1.5-flash")
+
+def test_sync_concurrency_limit():
+    print("--- Testing Per-Provider Concurrency Limit ---")
+    client = LLMClient({"concurrency": {"openai": 2}})
+    peak = []
+    def call():
+        with client._slot("openai"):
+            peak.append(client.stats()["providers"]["openai"]["in_flight"])
+            time.sleep(0.05)
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = client.stats()["providers"]["openai"]
+    print(f"Peak in flight: {max(peak)}, stats: {stats}")
+    assert max(peak) == 2
+    assert stats["calls"] == 6 and stats["in_flight"] == 0 and stats["waiting"] == 0
+
+def test_async_concurrency_limit():
+    print("--- Testing Async Concurrency Limit ---")
+    client = LLMClient({"concurrency": {"anthropic": 3}})
+    peak = []
+    async def call():
+        async with client._aslot("anthropic"):
+            peak.append(client.stats()["providers"]["anthropic"]["in_flight"])
+            await asyncio.sleep(0.02)
+    async def main():
+        await asyncio.gather(*(call() for _ in range(9)))
+        return client._async_state()
+    first = asyncio.run(main())
+    assert max(peak) == 3
+    # A new event loop gets its own semaphores (and async SDK clients)
+    second = asyncio.run(main())
+    assert first is not second
+    assert client.stats()["providers"]["anthropic"]["calls"] == 18
+
+def test_streaming():
+    print("--- Testing Streamed Responses ---")
+    client = LLMClient()
+    def fake_stream(model, system_prompt, user_content, temperature=0.0):
+        time.sleep(0.02)
+        for word in ["Battery ", "lasts ", None, "30h."]:
+            yield word
+    async def afake_stream(*args, **kwargs):
+        for word in fake_stream(*args, **kwargs):
+            yield word
+    client._stream_openai = fake_stream
+    client._astream_openai = afake_stream
+
+    stats = {}
+    chunks = list(client.stream_response("sys", "q", "chat", stats=stats))
+    assert chunks == ["Battery ", "lasts ", "30h."]
+    print(f"Stream stats: {stats}")
+    assert stats["chunks"] == 3 and stats["provider"] == "openai" and not stats["cached"]
+    assert 0 < stats["ttft_ms"] <= stats["total_ms"]
+
+    async def consume():
+        stats = {}
+        return [c async for c in client.astream_response("sys", "q", "chat", stats=stats)], stats
+    chunks, stats = asyncio.run(consume())
+    assert "".join(chunks) == "Battery lasts 30h." and stats["chunks"] == 3
+    assert client.stats()["streams"]["recent"] == 2
+
+if __name__ == "__main__":
+    test_shared_client()
+    test_sync_concurrency_limit()
+    test_async_concurrency_limit()
+    test_streaming()
@@ -0,0 +1,29 @@
+from sage.utils.model_registry import ModelRegistry, ModelStatus, local_embedding_models, HAS_SENTENCE_TRANSFORMERS
+
+def test_local_model_selection():
+    print("--- Testing Local Model Selection ---")
+    config = {"embedding_models": {
+        "primary_retrieval": "BAAI/bge-large-en",
+        "redundancy_layer": "text-embedding-3-large",
+        "image_embeddings": "openclip"
+    }}
+    assert local_embedding_models(config) == ["BAAI/bge-large-en"]
+    config["model_registry"] = {"preload": ["all-MiniLM-L6-v2"]}
+    assert local_embedding_models(config) == ["all-MiniLM-L6-v2"]
+
+def test_readiness():
+    print("--- Testing Model Registry Readiness ---")
+    registry = ModelRegistry()
+    assert registry.is_ready()  # Nothing to load
+    if HAS_SENTENCE_TRANSFORMERS:
+        print("sentence-transformers installed; skipping the fallback check")
+        return
+    # Without sentence-transformers the model can never load; callers fall back, so it is not a blocker
+    registry.warm_up(["BAAI/bge-large-en"], background=False)
+    assert registry.get("BAAI/bge-large-en") is None
+    assert registry.describe()["models"]["BAAI/bge-large-en"]["status"] == ModelStatus.UNAVAILABLE
+    assert registry.is_ready()
+
+if __name__ == "__main__":
+    test_local_model_selection()
+    test_readiness()
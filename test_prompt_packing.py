@@ -0,0 +1,125 @@
+import json
+from sage.utils.prompt_packing import EvidencePack, EvidencePacker
+from sage.agents.summarizer import SummarizerAgent
+from sage.agents.judge import JudgeAgent
+
+def make_evidence(n=12, words=120):
+    return [
+        {
+            "evidence_id": f"chunk-{i:04d}-9f3a2c",
+            "source_type": "review" if i % 2 else "pdp",
+            "text": f"Unit {i} says the battery   lasts long.\n\n" + " ".join(["detail"] * words),
+            "metadata": {"section": "Reviews", "priority": "high", "url": "https://example.com/p/" + "x" * 40, "chunk_index": i},
+            "aspect_tags": ["Battery Life"],
+            "rank_score": 1.0 - i / 100
+        }
+        for i in range(n)
+    ]
+
+def test_compact_format():
+    print("--- Testing Compact Evidence Format ---")
+    evidence = make_evidence(3, words=5)
+    pack = EvidencePack(evidence, model="gpt-4o")
+    print(pack.text)
+    lines = pack.text.split("\n")
+    assert len(lines) == 3
+    assert lines[0].startswith("[e1] pdp (section=Reviews, priority=high, aspects=Battery Life): Unit 0 says the battery lasts long.")
+    # Real IDs, URLs and scores stay out of the prompt
+    assert "chunk-0000" not in pack.text and "https://" not in pack.text and "rank_score" not in pack.text
+    # The JSON baseline is only counted on request (prompt_packing.debug)
+    assert "json_tokens" not in pack.describe()
+    stats = pack.describe(include_json_tokens=True)
+    print(f"Stats: {stats}")
+    assert stats["tokens"] < stats["json_tokens"]
+
+def test_budget_and_truncation():
+    print("--- Testing Token Budget ---")
+    evidence = make_evidence(12, words=400)
+    pack = EvidencePack(evidence, model="gpt-4o", budget_tokens=1200, max_item_tokens=200)
+    stats = pack.describe()
+    print(f"Stats: {stats}")
+    assert pack.tokens <= 1200
+    assert stats["truncated"] == 12
+    # Lowest-ranked units go first
+    assert stats["dropped"] and stats["dropped"][0] == "e12"
+    assert "[e1]" in pack.text and "[e12]" not in pack.text
+    # Aliases stay stable for dropped units, so every agent maps the same way
+    assert pack.resolve_ids(["e12"]) == ["chunk-0011-9f3a2c"]
+
+def test_budget_keeps_appended_sources():
+    print("--- Testing Budget With VLM/External Evidence ---")
+    # Ranked retrieval hits first, then VLM and external evidence appended at the end
+    evidence = make_evidence(10, words=100)
+    for unit in evidence:
+        unit["source_type"] = "review"
+    evidence.append({"evidence_id": "vlm_1", "text": "Specs from image: IP68", "source_type": "vlm_image"})
+    evidence.append({"evidence_id": "reddit_1", "text": "Battery is fine after a year", "source_type": "reddit"})
+    pack = EvidencePack(evidence, model="gpt-4o", budget_tokens=500)
+    print(f"Stats: {pack.describe()}")
+    assert pack.tokens <= 500 and pack.dropped
+    assert "[e11] vlm_image" in pack.text and "[e12] reddit" in pack.text
+    # The lowest-ranked review hits are dropped instead, kept units stay in bundle order
+    assert pack.dropped[0] == "e10" and "[e1] review" in pack.text
+
+def test_alias_round_trip():
+    print("--- Testing Alias Mapping ---")
+    evidence = make_evidence(12, words=5)
+    pack = EvidencePack(evidence)
+    assert pack.resolve_ids(["e1", "e10", "unknown"]) == ["chunk-0000-9f3a2c", "chunk-0009-9f3a2c", "unknown"]
+    claim = "Battery lasts 30 hours [e1, e10]"
+    assert pack.expand({"claims": [claim]}) == {"claims": ["Battery lasts 30 hours [chunk-0000-9f3a2c, chunk-0009-9f3a2c]"]}
+    assert pack.alias_text(pack.expand(claim)) == claim
+    # e99 is not an alias of this bundle
+    assert pack.expand("see [e99]") == "see [e99]"
+    # Alias-looking words outside citations are product text, not evidence references
+    verdict = "Moto e7 style phone, good [e1]"
+    assert pack.expand({"overall_verdict": verdict}) == {"overall_verdict": "Moto e7 style phone, good [chunk-0000-9f3a2c]"}
+    assert pack.expand({"reasoning": "e2 and e7 agree"}) == {"reasoning": "e2 and e7 agree"}
+    assert pack.expand({"evidence_ids": ["e2", "e7"]}) == {"evidence_ids": ["chunk-0001-9f3a2c", "chunk-0006-9f3a2c"]}
+    # Real IDs are only aliased inside citations too
+    assert pack.alias_text("chunk-0000-9f3a2c is cited as [chunk-0000-9f3a2c]") == "chunk-0000-9f3a2c is cited as [e1]"
+    # The JSON format keeps real IDs and maps nothing
+    legacy = EvidencePack(evidence, compact=False)
+    assert json.loads(legacy.text) == evidence and legacy.expand(claim) == claim
+
+def test_agents_map_aliases_back():
+    print("--- Testing Summarizer/Judge Alias Mapping ---")
+    evidence = make_evidence(4, words=5)
+    summarizer = SummarizerAgent()
+    summarizer.packer = EvidencePacker("summarizer_trust", {"budgets": {}})
+    prompts = []
+    def fake_summary(system_prompt, user_content, agent_name, **kwargs):
+        prompts.append(user_content)
+        return json.dumps({
+            "product_id": "p1", "overall_verdict": "Good", "aspects": [],
+            "claims": ["Battery lasts long [e1][e2]"], "conflicts": [], "uncertainties": []
+        })
+    summarizer.client.generate_response = fake_summary
+    try:
+        summary = summarizer.summarize("p1", evidence)
+        assert summary.claims == ["Battery lasts long [chunk-0000-9f3a2c][chunk-0001-9f3a2c]"]
+        assert "[e1] pdp" in prompts[0]
+
+        judge = JudgeAgent()
+        def fake_judge(system_prompt, user_content, agent_name, **kwargs):
+            prompts.append(user_content)
+            return json.dumps({
+                "claims_judgement": [{"claim_text": "Battery lasts long [e1][e2]", "evidence_ids": ["e1", "e2"], "judge_label": "Supported", "reasoning": "e2 agrees"}],
+                "conflicts": [], "uncertainty_aspects": []
+            })
+        judge.client.generate_response = fake_judge
+        output = judge.judge(summary, evidence)
+        # Claims are quoted to the judge with aliases, judgements come back with real IDs
+        assert "Battery lasts long [e1][e2]" in prompts[1] and "chunk-0000" not in prompts[1]
+        judgement = output.claims_judgement[0]
+        assert judgement.evidence_ids == ["chunk-0000-9f3a2c", "chunk-0001-9f3a2c"]
+        assert judgement.claim_text == summary.claims[0]
+    finally:
+        del summarizer.client.generate_response
+
+if __name__ == "__main__":
+    test_compact_format()
+    test_budget_and_truncation()
+    test_budget_keeps_appended_sources()
+    test_alias_round_trip()
+    test_agents_map_aliases_back()
@@ -0,0 +1,46 @@
+from sage.utils.query_cache import QueryEmbeddingCache, WarmEmbeddingTable
+import os
+import time
+import tempfile
+import numpy as np
+
+def test_lru_and_ttl():
+    print("--- Testing Query Embedding LRU ---")
+    cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=60)
+    cache.put_many("m", ["Battery", "sound"], [[1.0, 0.0], [0.0, 1.0]])
+    
+    # Case and whitespace do not change the key
+    assert cache.get_many("m", ["  battery ", "SOUND", "comfort"]) == [[1.0, 0.0], [0.0, 1.0], None]
+    assert cache.get_many("other-model", ["battery"]) == [None]
+    
+    # "battery" was used least recently, so it is evicted first
+    cache.get_many("m", ["sound"])
+    cache.put_many("m", ["comfort"], [[0.5, 0.5]])
+    assert cache.get_many("m", ["battery"]) == [None]
+    
+    # Expired entries are misses
+    cache.ttl_seconds = 0.01
+    time.sleep(0.02)
+    assert cache.get_many("m", ["sound"]) == [None]
+    print(f"Stats: {cache.stats()}")
+
+def test_warm_table():
+    print("--- Testing Warm Aspect Table ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "aspects.npz")
+        vectors = np.random.rand(2, 8).tolist()
+        WarmEmbeddingTable.save(path, "m", ["Battery Life", "ANC"], vectors)
+        table = WarmEmbeddingTable.load(path)
+        # The table is optional; without it there are simply no warm hits
+        assert WarmEmbeddingTable.load(os.path.join(tmp, "missing.npz")) is None
+    
+    cache = QueryEmbeddingCache(max_entries=10, warm_table=table)
+    hits = cache.get_many("m", ["battery life", "anc", "bass"])
+    assert np.allclose(hits[0], vectors[0], atol=1e-3) and hits[2] is None
+    # Warm vectors only apply to the model they were computed with
+    assert cache.get_many("other-model", ["anc"]) == [None]
+    assert cache.stats()["warm_hits"] == 2
+
+if __name__ == "__main__":
+    test_lru_and_ttl()
+    test_warm_table()
@@ -0,0 +1,66 @@
+from sage.utils.cache import SQLiteCache
+from sage.utils.result_cache import AnalysisCache
+from sage.models.schemas import ProductContext
+import datetime
+import tempfile
+import time
+import os
+
+def make_context(html, structured=None, images=None, question=None, product_id="test_product"):
+    return ProductContext(
+        product_id=product_id,
+        url="http://test.com",
+        pdp_html=html,
+        images=images or [],
+        source="web_app",
+        timestamp=datetime.datetime.now().isoformat(),
+        user_question=question,
+        structured_content=structured
+    )
+
+def test_analysis_cache_key():
+    print("--- Testing Analysis Cache Key ---")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = AnalysisCache(path=os.path.join(tmp, "cache.sqlite3"), enabled=True)
+        
+        a = make_context("<html><body><p>Battery lasts 30 hours</p></body></html>",
+                         structured={"specs": "IP68", "reviews": "Great"}, images=["http://img/1.jpg", "http://img/2.jpg"])
+        # Same content: different markup, whitespace, dict order, image order and product ID
+        b = make_context("<html><body><script>track()</script><div>Battery lasts 30 hours</div></body></html>",
+                         structured={"reviews": " Great ", "specs": "IP68"}, images=["http://img/2.jpg", "http://img/1.jpg"],
+                         product_id="other_id")
+        c = make_context("<html><body><p>Battery lasts 20 hours</p></body></html>",
+                         structured={"specs": "IP68", "reviews": "Great"}, images=["http://img/1.jpg", "http://img/2.jpg"])
+        
+        assert cache.key_for(a) == cache.key_for(b)
+        assert cache.key_for(a) != cache.key_for(c)
+        assert cache.key_for(a) != cache.key_for(make_context(a.pdp_html, a.structured_content, a.images, question="Is it loud?"))
+        
+        cache.set(a, {"product_id": "test_product", "tcs_score": 0.8})
+        hit = cache.get(b)
+        print(f"Hit for equivalent context: {hit}")
+        assert hit == {"product_id": "other_id", "tcs_score": 0.8}
+        assert cache.get(c) is None
+        print(f"Stats: {cache.stats()}")
+
+def test_sqlite_cache_ttl_and_eviction():
+    print("--- Testing SQLite Cache TTL / Eviction ---")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SQLiteCache(os.path.join(tmp, "cache.sqlite3"), ttl_seconds=0.2, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", 3)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        
+        time.sleep(0.3)
+        assert cache.get("a") is None
+        print(f"Stats: {cache.stats()}")
+
+if __name__ == "__main__":
+    test_analysis_cache_key()
+    test_sqlite_cache_ttl_and_eviction()
@@ -39,5 +39,25 @@ def test_retriever():
     import json
     print(json.dumps(result, indent=2))
 
+def test_merge_results():
+    print("--- Testing Per-Aspect Merge ---")
+    agent = RetrieverAgent(vector_db=None)
+    agent.max_evidence = 4
+    
+    def hits(*ids):
+        return [{"evidence_id": i, "text": i, "metadata": {}, "score": 0.1} for i in ids]
+    
+    sub_queries = [("battery", "battery"), ("sound", "sound"), ("hinge", "hinge")]
+    results = [hits("b1", "b2", "b3", "s1"), hits("s1", "s2", "s3"), hits("h1")]
+    merged = agent._merge_results(sub_queries, results)
+    
+    ids = [hit["evidence_id"] for hit in merged]
+    print(f"Merged: {ids}")
+    # Each aspect gets its quota before the top aspect fills the rest; no duplicates
+    assert ids == ["b1", "s1", "h1", "b2"]
+    assert merged[1]["aspects"] == ["sound"]
+    assert agent._aspect_coverage(merged) == {"battery": 2, "sound": 1, "hinge": 1}
+
 if __name__ == "__main__":
     test_retriever()
+    test_merge_results()
@@ -0,0 +1,70 @@
+from sage.engine.scheduler import StageScheduler
+import time
+import asyncio
+
+def test_scheduler():
+    print("--- Testing Stage Scheduler ---")
+    
+    scheduler = StageScheduler(max_workers=4)
+    scheduler.add_stage("plan", lambda r: time.sleep(0.2) or "plan")
+    scheduler.add_stage("vlm", lambda r: time.sleep(0.3) or "vlm")
+    scheduler.add_stage("retrieve", lambda r: r["plan"] + "+retrieve", deps=["plan"])
+    scheduler.add_stage("summarize", lambda r: [r["retrieve"], r["vlm"]], deps=["retrieve", "vlm"])
+    
+    results = scheduler.run()
+    print(f"Results: {results}")
+    print(f"Timings: {scheduler.timings}")
+    
+    assert results["summarize"] == ["plan+retrieve", "vlm"]
+    # plan and vlm overlap, so the whole graph takes ~0.3s, not 0.5s
+    assert scheduler.timings["total"]["duration"] < 0.45
+    assert scheduler.timings["vlm"]["start"] < scheduler.timings["plan"]["duration"]
+
+def test_scheduler_async():
+    print("--- Testing Stage Scheduler (async) ---")
+    
+    async def stage(name, delay, value):
+        await asyncio.sleep(delay)
+        return value
+    
+    scheduler = StageScheduler()
+    scheduler.add_stage("plan", lambda r: stage("plan", 0.2, "plan"))
+    scheduler.add_stage("vlm", lambda r: stage("vlm", 0.3, "vlm"))
+    scheduler.add_stage("retrieve", lambda r: r["plan"] + "+retrieve", deps=["plan"])
+    scheduler.add_stage("summarize", lambda r: [r["retrieve"], r["vlm"]], deps=["retrieve", "vlm"])
+    
+    results = asyncio.run(scheduler.arun())
+    print(f"Timings: {scheduler.timings}")
+    
+    assert results["summarize"] == ["plan+retrieve", "vlm"]
+    assert scheduler.timings["total"]["duration"] < 0.45
+
+def test_scheduler_rejects_cycles():
+    scheduler = StageScheduler()
+    scheduler.add_stage("a", lambda r: 1, deps=["b"])
+    scheduler.add_stage("b", lambda r: 2, deps=["a"])
+    try:
+        scheduler.run()
+        assert False, "Cycle was not detected"
+    except ValueError as e:
+        print(f"Cycle detected: {e}")
+
+def test_scheduler_propagates_errors():
+    def fail(r):
+        raise RuntimeError("stage failed")
+    
+    scheduler = StageScheduler()
+    scheduler.add_stage("ok", lambda r: 1)
+    scheduler.add_stage("bad", fail)
+    scheduler.add_stage("after", lambda r: 2, deps=["bad"])
+    try:
+        scheduler.run()
+        assert False, "Error was swallowed"
+    except RuntimeError as e:
+        print(f"Error propagated: {e}")
+
+if __name__ == "__main__":
+    test_scheduler()
+    test_scheduler_async()
+    test_scheduler_rejects_cycles()
+    test_scheduler_propagates_errors()
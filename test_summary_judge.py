@@ -0,0 +1,118 @@
+import json
+import asyncio
+import datetime
+import pytest
+from sage.models.schemas import ProductContext, PlannerOutput, TrustSummary, JudgeOutput, SummaryJudgeOutput
+from sage.agents.summary_judge import SummaryJudgeAgent
+from sage.pipeline import SagePipeline
+
+EVIDENCE = [
+    {"evidence_id": "chunk-a1", "text": "Battery lasts 30 hours.", "source_type": "structured_content", "metadata": {"section": "specs"}},
+    {"evidence_id": "chunk-b2", "text": "My battery died after 20 hours.", "source_type": "review", "metadata": {}}
+]
+
+SUMMARY = {
+    "product_id": "p1", "overall_verdict": "Good battery",
+    "aspects": [{"name": "Battery Life", "score_0_10": 7, "pros": ["30h rated [e1]"], "cons": ["20h in use [e2]"], "dealbreakers": []}],
+    "claims": ["Battery lasts up to 30 hours [e1]"], "conflicts": ["Rated 30h vs 20h in use [e1][e2]"], "uncertainties": []
+}
+JUDGEMENT = {
+    "claims_judgement": [{"claim_text": "Battery lasts up to 30 hours [e1]", "evidence_ids": ["e1", "e2"], "judge_label": "PartiallySupported", "reasoning": "e2 reports less"}],
+    "conflicts": ["Rated vs observed battery life"], "uncertainty_aspects": []
+}
+
+def make_context():
+    return ProductContext(
+        product_id="p1",
+        url="http://test.com",
+        pdp_html="<html><body><p>Acme Headphones</p></body></html>",
+        images=[],
+        source="web_app",
+        timestamp=datetime.datetime.now().isoformat(),
+        structured_content={}
+    )
+
+def test_fused_agent():
+    print("--- Testing Fused Summary+Judge Agent ---")
+    agent = SummaryJudgeAgent()
+    prompts = []
+    def fake_call(system_prompt, user_content, agent_name, response_format=None, **kwargs):
+        prompts.append(user_content)
+        assert agent_name == "summarize_judge" and response_format is SummaryJudgeOutput
+        return json.dumps({"trust_summary": SUMMARY, "judge_output": JUDGEMENT})
+    agent.client.generate_response = fake_call
+    try:
+        output = agent.analyze("p1", EVIDENCE)
+    finally:
+        del agent.client.generate_response
+    # Evidence is sent once, with aliases that are mapped back in both halves
+    assert len(prompts) == 1 and "[e2] review" in prompts[0]
+    assert isinstance(output.trust_summary, TrustSummary) and isinstance(output.judge_output, JudgeOutput)
+    assert output.trust_summary.claims == ["Battery lasts up to 30 hours [chunk-a1]"]
+    judgement = output.judge_output.claims_judgement[0]
+    assert judgement.evidence_ids == ["chunk-a1", "chunk-b2"]
+    assert judgement.claim_text == output.trust_summary.claims[0]
+
+def test_fused_agent_validates_both_schemas():
+    print("--- Testing Fused Output Validation ---")
+    agent = SummaryJudgeAgent()
+    bad_judgement = {**JUDGEMENT, "claims_judgement": [{**JUDGEMENT["claims_judgement"][0], "judge_label": "Maybe"}]}
+    with pytest.raises(ValueError):
+        agent._parse_response(json.dumps({"trust_summary": SUMMARY, "judge_output": bad_judgement}), agent.packer.pack(EVIDENCE))
+    with pytest.raises(ValueError):
+        agent._parse_response(json.dumps({"trust_summary": SUMMARY}), agent.packer.pack(EVIDENCE))
+
+def _stub_stages(pipeline, calls):
+    plan = PlannerOutput(mode="cold", product_ids=["p1"], aspects=["Battery Life"], sources_to_use=["pdp"], retrieval_config={}, notes_for_summarizer="")
+    summary = TrustSummary(**{**SUMMARY, "claims": ["Battery lasts up to 30 hours [chunk-a1]"]})
+    judgement = JudgeOutput(**{**JUDGEMENT, "claims_judgement": [{**JUDGEMENT["claims_judgement"][0], "claim_text": summary.claims[0], "evidence_ids": ["chunk-a1", "chunk-b2"]}]})
+
+    async def aresult(name, value):
+        calls.append(name)
+        return value
+
+    def result(name, value):
+        calls.append(name)
+        return value
+
+    pipeline._stage_index = lambda context: True
+    pipeline._stage_plan = lambda context: plan
+    pipeline._stage_vlm = lambda context: []
+    pipeline._stage_retrieve = lambda context, plan: {"evidence": EVIDENCE, "diagnostics": {}}
+    pipeline._stage_summarize = lambda context, evidence: result("summarize", summary)
+    pipeline._stage_judge = lambda trust_summary, evidence: result("judge", judgement)
+    pipeline._stage_summarize_judge = lambda context, evidence: result("summarize_judge", SummaryJudgeOutput(trust_summary=summary, judge_output=judgement))
+    pipeline._astage_plan = lambda context: aresult("plan", plan)
+    pipeline._astage_vlm = lambda context: aresult("vlm", [])
+    pipeline._astage_retrieve = lambda context, plan: aresult("retrieve", {"evidence": EVIDENCE, "diagnostics": {}})
+    pipeline._astage_summarize = lambda context, evidence: aresult("summarize", summary)
+    pipeline._astage_judge = lambda trust_summary, evidence: aresult("judge", judgement)
+    pipeline._astage_summarize_judge = lambda context, evidence: aresult("summarize_judge", SummaryJudgeOutput(trust_summary=summary, judge_output=judgement))
+
+def test_pipeline_modes():
+    print("--- Testing Pipeline Analysis Modes ---")
+    pipeline = SagePipeline()
+    results = {}
+    for mode in ("two_stage", "fused"):
+        calls = []
+        pipeline.analysis_mode = mode
+        _stub_stages(pipeline, calls)
+        results[mode] = pipeline.run(make_context(), use_cache=False)
+        print(f"{mode}: calls={calls} tcs={results[mode]['tcs_score']}")
+        assert results[mode]["analysis_mode"] == mode
+        assert calls == (["summarize_judge"] if mode == "fused" else ["summarize", "judge"])
+
+        calls.clear()
+        async_result = asyncio.run(pipeline.arun(make_context(), use_cache=False))
+        assert async_result["analysis_mode"] == mode
+        assert [c for c in calls if c in ("summarize", "judge", "summarize_judge")] == (["summarize_judge"] if mode == "fused" else ["summarize", "judge"])
+        assert ("summarize_judge" in async_result["stage_timings"]) == (mode == "fused")
+
+    # Same summary and judgement give the same TCS, whichever mode produced them
+    assert results["fused"]["tcs_components"] == results["two_stage"]["tcs_components"]
+    assert results["fused"]["trust_summary"] == results["two_stage"]["trust_summary"]
+
+if __name__ == "__main__":
+    test_fused_agent()
+    test_fused_agent_validates_both_schemas()
+    test_pipeline_modes()
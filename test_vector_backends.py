@@ -0,0 +1,188 @@
+from sage.utils.vector_backends import InMemoryBackend, ChromaBackend, matches_where
+from sage.utils.vector_db import VectorDBClient
+import hashlib
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+def test_memory_backend():
+    print("--- Testing In-Memory Vector Backend ---")
+    
+    backend = InMemoryBackend()
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(10, 16)).astype(np.float32)
+    ids = [f"c{i}" for i in range(10)]
+    metadatas = [{"source_type": "pdp" if i % 2 else "reddit", "chunk_index": i} for i in range(10)]
+    backend.add("p1", ids, vectors.tolist(), [f"doc {i}" for i in range(10)], metadatas)
+    
+    # Exact nearest neighbour: querying with a stored vector returns it first
+    hits = backend.query("p1", [vectors[3].tolist(), vectors[7].tolist()], top_k=3)[0:2]
+    assert hits[0][0]["id"] == "c3" and abs(hits[0][0]["distance"]) < 1e-5
+    assert hits[1][0]["id"] == "c7"
+    assert len(hits[0]) == 3
+    
+    # Metadata filters
+    hits = backend.query("p1", [vectors[3].tolist()], top_k=10, where={"source_type": "reddit"})[0]
+    assert len(hits) == 5 and all(h["metadata"]["source_type"] == "reddit" for h in hits)
+    
+    # Delete keeps the remaining rows addressable
+    backend.delete("p1", ["c0", "c3"])
+    assert backend.count("p1") == 8
+    hits = backend.query("p1", [vectors[9].tolist()], top_k=1)[0]
+    assert hits[0]["id"] == "c9"
+    assert "c3" not in backend.get("p1")["ids"]
+    
+    # Namespaces are isolated
+    assert backend.query("p2", [vectors[0].tolist()], top_k=3) == [[]]
+    assert backend.drop_namespace("p1") and backend.namespace_metadata("p1") is None
+
+def test_quantized_backend():
+    print("--- Testing Quantized Storage ---")
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(200, 32)).astype(np.float32)
+    ids = [f"c{i}" for i in range(200)]
+    docs = [f"doc {i}" for i in range(200)]
+    metas = [{"chunk_index": i} for i in range(200)]
+    queries = (vectors[:20] + rng.normal(scale=0.3, size=(20, 32))).tolist()
+    
+    exact = InMemoryBackend()
+    exact.add("p1", ids, vectors.tolist(), docs, metas)
+    expected = [[h["id"] for h in hits] for hits in exact.query("p1", queries, top_k=5)]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for quantization in ("float16", "int8"):
+            backend = InMemoryBackend(quantization=quantization, rescore_factor=4, full_precision_dir=tmp)
+            backend.add("p1", ids, vectors.tolist(), docs, metas)
+            results = backend.query("p1", queries, top_k=5)
+            # Rescoring from full precision restores the exact ranking and distances
+            assert [[h["id"] for h in hits] for hits in results] == expected
+            assert abs(results[0][0]["distance"] - exact.query("p1", queries[:1], top_k=1)[0][0]["distance"]) < 1e-5
+            usage = backend.memory_usage()
+            print(f"{quantization}: {usage}")
+            assert usage["resident_bytes"] < exact.memory_usage()["resident_bytes"]
+            backend.delete("p1", ["c0"])
+            assert backend.query("p1", [vectors[199].tolist()], top_k=1)[0][0]["id"] == "c199"
+            backend.clear()
+
+def test_where_filters():
+    print("--- Testing Metadata Filters ---")
+    meta = {"source_type": "pdp", "chunk_index": 4}
+    assert matches_where(meta, {"source_type": {"$in": ["pdp", "reddit"]}})
+    assert matches_where(meta, {"$and": [{"chunk_index": {"$gte": 4}}, {"source_type": {"$ne": "reddit"}}]})
+    assert not matches_where(meta, {"$or": [{"chunk_index": {"$lt": 4}}, {"source_type": "reddit"}]})
+
+def test_backends_agree():
+    print("--- Testing Chroma vs In-Memory Ranking ---")
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(20, 8))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).tolist()
+    ids = [f"c{i}" for i in range(20)]
+    docs = [f"doc {i}" for i in range(20)]
+    metas = [{"chunk_index": i} for i in range(20)]
+    query = rng.normal(size=8).tolist()
+    
+    memory = InMemoryBackend()
+    memory.add("p1", ids, vectors, docs, metas)
+    with tempfile.TemporaryDirectory() as tmp:
+        chroma = ChromaBackend(tmp)
+        chroma.add("p1", ids, vectors, docs, metas)
+        expected = [h["id"] for h in chroma.query("p1", [query], top_k=5)[0]]
+    actual = [h["id"] for h in memory.query("p1", [query], top_k=5)[0]]
+    print(f"Chroma: {expected}\nMemory: {actual}")
+    assert actual == expected
+
+def test_sync_documents():
+    print("--- Testing Incremental Ingestion ---")
+    db = VectorDBClient(backend="memory")
+    embedded = []
+    def fake_embedding(texts, model_usage="primary_retrieval"):
+        texts = [texts] if isinstance(texts, str) else texts
+        embedded.extend(texts)
+        return [[b / 255.0 for b in hashlib.sha256(t.encode()).digest()[:16]] for t in texts]
+    db.embedder.get_text_embedding = fake_embedding
+    
+    page = [
+        {"text": "Specs: 30h battery, LDAC", "source_type": "structured_content"},
+        {"text": "Reviews: Great sound", "source_type": "structured_content"},
+    ]
+    assert db.sync_documents(page, "p1") == {"added": 2, "deleted": 0, "unchanged": 0, "updated": 0}
+    # Re-ingesting the same page embeds nothing and creates no duplicates
+    embedded.clear()
+    db.add_documents(page, product_id="p1")
+    assert db.sync_documents(page, "p1") == {"added": 0, "deleted": 0, "unchanged": 2, "updated": 0}
+    assert embedded == [] and db.backend.count("p1") == 2
+    
+    # Only the changed section is re-embedded; the old version is removed
+    page[1] = {"text": "Reviews: Great sound, weak mic", "source_type": "structured_content"}
+    assert db.sync_documents(page, "p1") == {"added": 1, "deleted": 1, "unchanged": 1, "updated": 0}
+    assert embedded == ["Reviews: Great sound, weak mic"]
+    texts = db.backend.get("p1")["documents"]
+    assert sorted(texts) == ["Reviews: Great sound, weak mic", "Specs: 30h battery, LDAC"]
+    assert [h["text"] for h in db.query("weak mic", top_k=1, product_id="p1")] == ["Reviews: Great sound, weak mic"]
+
+    # Same text, new metadata (e.g. a retitled page): metadata is refreshed, nothing re-embedded
+    embedded.clear()
+    page[0] = {**page[0], "metadata": {"title": "Acme X2 (2025)", "url": "http://x/new"}}
+    assert db.sync_documents(page, "p1") == {"added": 0, "deleted": 0, "unchanged": 2, "updated": 1}
+    assert embedded == []
+    stored = db.backend.get("p1", where={"title": "Acme X2 (2025)"})
+    assert stored["documents"] == ["Specs: 30h battery, LDAC"] and stored["metadatas"][0]["url"] == "http://x/new"
+    hit = db.query("30h battery LDAC", top_k=1, product_id="p1")[0]
+    assert hit["metadata"]["title"] == "Acme X2 (2025)"
+    assert db.sync_documents(page, "p1")["updated"] == 0
+
+def test_chroma_update_metadata():
+    print("--- Testing Chroma Metadata Update ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        chroma = ChromaBackend(tmp)
+        chroma.add("p1", ["a"], [[1.0, 0.0]], ["doc"], [{"title": "old"}])
+        chroma.update_metadata("p1", ["a"], [{"title": "new"}])
+        stored = chroma.get("p1")
+        assert stored["documents"] == ["doc"] and stored["metadatas"] == [{"title": "new"}]
+
+def test_expire_skips_namespaces_in_use():
+    print("--- Testing Namespace Expiry Under Concurrency ---")
+    db = VectorDBClient(backend="memory", namespace_ttl_seconds=0.05)
+    db.embedder.get_text_embedding = lambda texts, model_usage="primary_retrieval": [
+        [b / 255.0 for b in hashlib.sha256(t.encode()).digest()[:16]] for t in ([texts] if isinstance(texts, str) else texts)
+    ]
+    for product_id in ("indexing", "querying", "idle"):
+        db.sync_documents([{"text": f"Specs: {product_id} battery", "source_type": "structured_content"}], product_id)
+        db.mark_indexed(product_id, "fp")
+    time.sleep(0.1)
+
+    # A query that is mid-flight when expiry runs
+    in_query, release = threading.Event(), threading.Event()
+    backend_query = db.backend.query
+    def slow_query(namespace, *args, **kwargs):
+        if namespace == "querying":
+            in_query.set()
+            release.wait(2.0)
+        return backend_query(namespace, *args, **kwargs)
+    db.backend.query = slow_query
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(db.query, "battery", 1, None, "querying")
+        assert in_query.wait(2.0)
+        # Indexing holds the product lock
+        with db.product_lock("indexing"):
+            assert db.expire_stale() == 1
+        release.set()
+        assert pending.result()[0]["text"] == "Specs: querying battery"
+    assert db.backend.namespace_metadata("idle") is None
+    assert db.backend.namespace_metadata("indexing") is not None
+    assert db.backend.namespace_metadata("querying") is not None
+
+    # Once nothing holds them, they expire as usual
+    assert db.expire_stale() == 2
+    assert db.backend.list_namespaces() == []
+
+if __name__ == "__main__":
+    test_memory_backend()
+    test_quantized_backend()
+    test_where_filters()
+    test_backends_agree()
+    test_sync_documents()
+    test_chroma_update_metadata()
+    test_expire_skips_namespaces_in_use()